@@ -0,0 +1,294 @@
+"""
+Runs the reference and the fast compute engines on the same video set and diffs what each stage produces:
+TF-IDF matrices, similarity pairs, redundancy clusters, their chronological order, selected keyframes,
+the segments chosen by Redundancy and the final summary plan. Reports the speedup of the fast engine and every divergence
+beyond the tolerances, exiting with an error when there is one.
+"""
+
+import sys
+import json
+import argparse
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from dataclasses import dataclass, field, asdict
+from os.path import abspath, basename, dirname, join, normpath
+from typing import Any, Callable
+
+from run import ROOT, BenchmarkContext
+from generate import generate_video_set
+from processing.utils import log
+
+ENGINES = ("reference", "fast")
+
+
+@dataclass
+class StageComparison:
+    stage: str
+    reference: float = 0.0
+    fast: float = 0.0
+    divergences: list[str] = field(default_factory=list)
+    details: dict = field(default_factory=dict)
+
+    def get_speedup(self) -> float:
+        return self.reference / self.fast if self.fast else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "speedup": self.get_speedup(), "equivalent": not self.divergences}
+
+
+def timed(function: Callable[[], Any]) -> tuple[Any, float]:
+    start = perf_counter()
+    result = function()
+    return result, perf_counter() - start
+
+
+def compare_stage(
+    stage: str, run: Callable[[str], Any], diff: Callable[[Any, Any, StageComparison], None]
+) -> tuple[StageComparison, dict[str, Any]]:
+    """Runs a stage with each engine, returning how their results compare along with the results"""
+    comparison = StageComparison(stage)
+    results = {}
+    for engine in ENGINES:
+        results[engine], seconds = timed(lambda: run(engine))
+        setattr(comparison, engine, seconds)
+    diff(results["reference"], results["fast"], comparison)
+    return comparison, results
+
+
+def diff_tfidf(reference: Any, fast: Any, comparison: StageComparison, atol: float) -> None:
+    if list(reference.columns) != list(fast.columns):
+        comparison.divergences.append(
+            f"words differ: {sorted(set(reference.columns) ^ set(fast.columns))[:10]}"
+        )
+        return
+    if not reference.index.equals(fast.index):
+        comparison.divergences.append("segments differ")
+        return
+
+    max_diff = float(abs(reference.to_numpy() - fast.to_numpy()).max()) if reference.size else 0.0
+    comparison.details = {"shape": list(reference.shape), "max_abs_diff": max_diff}
+    if max_diff > atol:
+        comparison.divergences.append(f"weights differ by up to {max_diff:.3g}")
+
+
+def diff_pairs(reference: Any, fast: Any, comparison: StageComparison, atol: float) -> None:
+    def pairs(correlations: Any) -> dict:
+        return {
+            (row.video_index, row.segment_index, row.video_index_col, row.segment_index_col): row.value
+            for row in correlations.itertuples()
+        }
+
+    reference_pairs, fast_pairs = pairs(reference), pairs(fast)
+    common = reference_pairs.keys() & fast_pairs.keys()
+    max_diff = max((abs(reference_pairs[pair] - fast_pairs[pair]) for pair in common), default=0.0)
+    comparison.details = {
+        "pairs": len(reference_pairs),
+        "only_reference": sorted(reference_pairs.keys() - common)[:10],
+        "only_fast": sorted(fast_pairs.keys() - common)[:10],
+        "max_abs_diff": max_diff,
+    }
+    if len(common) != len(reference_pairs) or len(common) != len(fast_pairs):
+        comparison.divergences.append(
+            f"{len(reference_pairs) - len(common)} pairs only in reference, "
+            f"{len(fast_pairs) - len(common)} only in fast"
+        )
+    if max_diff > atol:
+        comparison.divergences.append(f"similarities differ by up to {max_diff:.3g}")
+    if list(reference_pairs) != list(fast_pairs) and not comparison.divergences:
+        comparison.divergences.append("same pairs in a different order")
+
+
+def diff_clusters(reference: list[set], fast: list[set], comparison: StageComparison) -> None:
+    comparison.details = {"clusters": len(reference)}
+    if reference != fast:
+        different = [i for i, (a, b) in enumerate(zip(reference, fast)) if a != b]
+        comparison.divergences.append(
+            f"{len(reference)} reference and {len(fast)} fast clusters, first different at {different[:5]}"
+        )
+
+
+def diff_keyframes(reference: list, fast: list, comparison: StageComparison) -> None:
+    different = [
+        i for i, (a, b) in enumerate(zip(reference, fast)) if a.shape != b.shape or (a != b).any()
+    ]
+    comparison.details = {"segments": len(reference), "descriptors": sum(len(a) for a in reference)}
+    if different:
+        comparison.divergences.append(f"keyframes of {len(different)} segments differ, e.g. {different[:5]}")
+
+
+def diff_entries(reference: list, fast: list, comparison: StageComparison) -> None:
+    comparison.details = {"entries": len(reference)}
+    if reference != fast:
+        different = [i for i, (a, b) in enumerate(zip(reference, fast)) if a != b]
+        comparison.divergences.append(
+            f"{len(reference)} reference and {len(fast)} fast entries, first different at {different[:5]}"
+        )
+
+
+def check_equivalence(
+    context: BenchmarkContext, atol: float = 1e-9, keyframe_segments: int = 10, plan: bool = True
+) -> list[StageComparison]:
+    from processing.text import BagOfWords
+    from processing.image import ImageProcessing
+    from modules.chronology import Chronology
+    from modules.redundancy import (
+        Redundancy,
+        bow_correlations,
+        bow_correlations_chunked,
+        cluster_redundancies,
+        find_redundancies,
+        minimum_threshold,
+    )
+    from summarizers.base_summarizer import BaseSummarizer
+    from summarizers.hsmvideosumm import HSMVideoSumm
+
+    comparisons = []
+
+    # Both engines weigh the same preprocessed texts
+    bow = BagOfWords(context.get_segment_texts())
+    bow.items_preprocessing()
+    texts = bow.get_bag()
+
+    def tfidf(engine: str) -> Any:
+        bow = BagOfWords(dict(texts))
+        if engine == "fast":
+            return bow.generate_bow_dataframe_fast(["video_index", "segment_index"])
+        return bow.generate_bow_dataframe(["video_index", "segment_index"])
+
+    comparison, bow_dfs = compare_stage(
+        "tfidf", tfidf, lambda a, b, c: diff_tfidf(a, b, c, atol)
+    )
+    comparisons.append(comparison)
+
+    threshold = minimum_threshold(context.videos)
+
+    def similarity_pairs(engine: str) -> Any:
+        if engine == "fast":
+            return bow_correlations_chunked(bow_dfs[engine], threshold, len(bow_dfs[engine]))
+        return bow_correlations(bow_dfs[engine], threshold)
+
+    comparison, pairs = compare_stage(
+        "similarity_pairs", similarity_pairs, lambda a, b, c: diff_pairs(a, b, c, atol)
+    )
+    comparisons.append(comparison)
+
+    comparison, clusters = compare_stage(
+        "clusters",
+        lambda engine: cluster_redundancies(find_redundancies(pairs[engine])),
+        diff_clusters,
+    )
+    comparisons.append(comparison)
+
+    # Both engines order the same clusters, each standing for its first segment
+    items_cluster = {min(cluster): cluster for cluster in clusters["reference"]}
+    comparison, _ = compare_stage(
+        "chronology",
+        lambda engine: Chronology.order_by_similarity_cluster(items_cluster, engine=engine),
+        diff_entries,
+    )
+    comparisons.append(comparison)
+
+    segments = [
+        segment
+        for video in context.videos
+        for segment in video.get_segments()
+        if segment.get_duration() > 2
+    ][:keyframe_segments]
+    comparison, _ = compare_stage(
+        "keyframes",
+        lambda engine: [
+            ImageProcessing.ks_sift(segment, context.frames_path, None, engine) for segment in segments
+        ],
+        diff_keyframes,
+    )
+    comparisons.append(comparison)
+
+    def chosen_segments(engine: str) -> list:
+        summarizer = BaseSummarizer(videos=context.load_videos(), frames_path=context.frames_path)
+        summarizer.start_summary_video()
+        Redundancy(summarizer, engine=engine).include()
+        return summarizer.get_summary_plan().to_dict()["segments"]
+
+    comparison, _ = compare_stage("chosen_segments", chosen_segments, diff_entries)
+    comparisons.append(comparison)
+
+    if plan:
+
+        def summary_plan(engine: str) -> list:
+            summarizer = HSMVideoSumm(
+                videos=context.load_videos(),
+                summary_name=basename(context.dataset_path),
+                frames_path=context.frames_path,
+                compute_engine=engine,
+            )
+            summarizer.summarize()
+            return summarizer.get_summary_plan().to_dict()["segments"]
+
+        comparison, _ = compare_stage("plan", summary_plan, diff_entries)
+        comparisons.append(comparison)
+
+    return comparisons
+
+
+def format_table(comparisons: list[StageComparison]) -> str:
+    lines = [f"{'stage':18} {'reference s':>12} {'fast s':>9} {'speedup':>8}  result"]
+    for comparison in comparisons:
+        result = "; ".join(comparison.divergences) if comparison.divergences else "equivalent"
+        lines.append(
+            f"{comparison.stage:18} {comparison.reference:>12.3f} {comparison.fast:>9.3f} "
+            f"{comparison.get_speedup():>7.1f}x  {result}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Checks the fast compute engine against the reference one, stage by stage"
+    )
+    parser.add_argument(
+        "-vp",
+        "--videos-path",
+        default="",
+        help="Video set to check on, its frames are extracted to the frames cache when needed. "
+        "Default is a synthetic video set",
+    )
+    parser.add_argument("-f", "--frames-root", default="video_frames", help="Frames cache. Default is video_frames")
+    parser.add_argument("--videos", type=int, default=3, help="Videos of the synthetic set. Default is 3")
+    parser.add_argument("--duration", type=int, default=60, help="Seconds of each synthetic video. Default is 60")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic set. Default is 0")
+    parser.add_argument("--atol", type=float, default=1e-9, help="Tolerance of weights and similarities")
+    parser.add_argument(
+        "--keyframe-segments", type=int, default=10, help="Segments keyframes are compared on. Default is 10"
+    )
+    parser.add_argument("--no-plan", action="store_true", help="Skips comparing the whole summary plans")
+    parser.add_argument("-o", "--output", default="", help="Saves the comparisons as JSON")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp_dir:
+        if args.videos_path:
+            from processing.dataset import Dataset, DatasetLoader
+            from processing.frame_cache import FrameCache
+            from processing.utils import list_dataset_videos
+
+            dataset_path = normpath(args.videos_path)
+            dataset = Dataset(basename(dataset_path), dataset_path, list_dataset_videos(dataset_path))
+            frames_path = DatasetLoader(dataset).save_video_frames(FrameCache(args.frames_root))
+        else:
+            dataset_path = generate_video_set(
+                tmp_dir, videos=args.videos, duration=args.duration, seed=args.seed, encode=False
+            )
+            frames_path = join(tmp_dir, "video_frames", "synthetic")
+
+        comparisons = check_equivalence(
+            BenchmarkContext(dataset_path, frames_path, tmp_dir),
+            atol=args.atol,
+            keyframe_segments=args.keyframe_segments,
+            plan=not args.no_plan,
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([comparison.to_dict() for comparison in comparisons], f, indent=4, default=str)
+
+    log(f"Reference and fast engines compared on {dataset_path}\n{format_table(comparisons)}")
+    sys.exit(1 if any(comparison.divergences for comparison in comparisons) else 0)
@@ -0,0 +1,220 @@
+"""
+Synthetic video sets for the benchmarks, in the layout `DatasetLoader` reads:
+`<root>/<name>/<video>/<video>.json` transcripts, `<video>.mp4` videos when ffmpeg is available,
+and their frames already extracted in the frames cache, `<root>/video_frames/<name>/<video>`.
+
+Videos report the same stories with different wording and order, so redundancy clustering finds matches,
+and every story is filmed as its own textured scene, so SIFT finds keyframes within it.
+"""
+
+import sys
+import json
+import argparse
+from os import makedirs, stat
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), "multi_summarizer"))
+
+import numpy as np
+
+from processing.utils import log
+from processing.frame_cache import FrameCache, FrameManifest, count_frames, sample_hash
+from processing.ffmpeg import get_ffmpeg_binary, run_ffmpeg
+from components.frame import FRAME_MANIFEST_FILE, ExtractionSettings
+
+SUBJECTS = [
+    "O presidente", "A ministra", "O governador", "A prefeitura", "O tribunal", "A polícia federal",
+    "O príncipe", "A duquesa", "O time", "A seleção", "Os médicos", "Os moradores",
+]
+VERBS = [
+    "anunciou", "apresentou", "investigou", "confirmou", "criticou", "aprovou",
+    "visitou", "recebeu", "defendeu", "negou", "comemorou", "suspendeu",
+]
+OBJECTS = [
+    "o novo projeto", "a reforma da previdência", "o bebê recém-nascido", "as obras do metrô",
+    "o orçamento do próximo ano", "a campanha de vacinação", "o acordo comercial", "a final do campeonato",
+    "as denúncias de corrupção", "o aumento dos combustíveis", "a chuva forte", "o hospital da cidade",
+]
+COMPLEMENTS = [
+    "nesta manhã", "em frente ao palácio", "durante a entrevista coletiva", "depois de muita polêmica",
+    "para milhares de pessoas", "no centro da capital", "em uma reunião fechada", "segundo os jornalistas",
+    "apesar das críticas", "com apoio da oposição", "na noite de ontem", "diante das câmeras",
+]
+
+
+def make_story(rng: np.random.Generator, sentences: int) -> list[list[str]]:
+    """Sentences of a story, as the words of their subject, verb, object and complement"""
+    return [
+        [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(COMPLEMENTS)]
+        for _ in range(sentences)
+    ]
+
+
+def tell_story(rng: np.random.Generator, story: list[list[str]]) -> str:
+    """One video's wording of a story: some sentences left out and some parts reworded"""
+    sentences = []
+    for parts in story:
+        if rng.random() < 0.2:
+            continue
+        parts = [
+            rng.choice(options) if rng.random() < 0.15 else part
+            for part, options in zip(parts, [SUBJECTS, VERBS, OBJECTS, COMPLEMENTS])
+        ]
+        sentences.append(" ".join(parts) + ".")
+    return " ".join(sentences) or " ".join(story[0]) + "."
+
+
+def timestamp(second: int) -> str:
+    return f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+
+
+def make_scene(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    """
+    Grayscale scene with smooth gradients and sharp shapes, where SIFT finds keypoints,
+    in its own range of tones so cuts between scenes are found by their histograms
+    """
+    from cv2 import INTER_CUBIC, circle, rectangle, resize
+
+    low = int(rng.integers(0, 156))
+    scene = resize(rng.random((height // 16, width // 16)), (width, height), interpolation=INTER_CUBIC)
+    scene = (np.clip(scene, 0, 1) * 100 + low).astype(np.uint8)
+    for _ in range(80):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size, color = int(rng.integers(height // 40, height // 6)), int(rng.integers(low, low + 101))
+        if rng.random() < 0.5:
+            rectangle(scene, (x, y), (x + size, y + size // 2), color, -1)
+        else:
+            circle(scene, (x, y), size // 2, color, -1)
+    return scene
+
+
+def film_frame(rng: np.random.Generator, scene: np.ndarray, shift: int) -> np.ndarray:
+    """Frame of a scene with the camera panned `shift` pixels and some sensor noise"""
+    frame = np.roll(scene, (shift // 3, shift), axis=(0, 1)).astype(np.int16)
+    frame += rng.integers(-6, 7, frame.shape, dtype=np.int16)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def has_ffmpeg() -> bool:
+    try:
+        get_ffmpeg_binary()
+    except Exception:
+        return False
+    return True
+
+
+def encode_video(frames_dir: str, video_file: str, fps: float, duration: int) -> None:
+    """Encodes the frames as an H.264 video with a tone as audio, the format the renderer stream-copies"""
+    run_ffmpeg(
+        ["-loglevel", "error", "-framerate", f"{fps:g}", "-start_number", "0"]
+        + ["-i", join(frames_dir, "image-%d.jpg")]
+        + ["-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}"]
+        + ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-r", "25", "-g", "50"]
+        + ["-c:a", "aac", "-shortest", video_file]
+    )
+
+
+def generate_video_set(
+    root: str,
+    name: str = "synthetic",
+    videos: int = 3,
+    duration: int = 120,
+    fps: float = 1.0,
+    height: int = 240,
+    seed: int = 0,
+    encode: bool = None,
+) -> str:
+    """
+    Writes a synthetic video set of `videos` videos of about `duration` seconds and returns its path.
+    Frames are sampled `fps` times per second at `height` pixels, videos are encoded from them
+    when `encode` is set, by default when ffmpeg is available.
+    """
+    from cv2 import imwrite
+
+    rng = np.random.default_rng(seed)
+    width = height * 4 // 3 // 2 * 2
+    encode = has_ffmpeg() if encode is None else encode
+    stories = [make_story(rng, int(rng.integers(2, 6))) for _ in range(max(videos * 2, 4))]
+    scenes = [make_scene(rng, width, height) for _ in stories]
+    frame_cache = FrameCache(join(root, "video_frames"))
+    settings = ExtractionSettings(fps=fps)
+
+    dataset_path = join(root, name)
+    for video_index in range(videos):
+        video = f"video_{video_index:02d}"
+        video_dir = join(dataset_path, video)
+        frames_dir = frame_cache.get_frames_dir(name, video)
+        makedirs(video_dir, exist_ok=True)
+        makedirs(frames_dir, exist_ok=True)
+
+        # Telling random stories in random order, one segment each, until the video is long enough
+        transcript, second, frame_number = [], 0, 0
+        while second < duration:
+            story = int(rng.integers(len(stories)))
+            segment_duration = int(rng.integers(4, 21))
+            transcript.append(
+                {
+                    "content": tell_story(rng, stories[story]),
+                    "begin": timestamp(second),
+                    "end": timestamp(second + segment_duration),
+                }
+            )
+
+            shift = int(rng.integers(0, width))
+            while frame_number < (second + segment_duration) * fps:
+                shift += int(rng.integers(4, 13))
+                imwrite(
+                    join(frames_dir, f"image-{frame_number}.jpg"),
+                    film_frame(rng, scenes[story], shift),
+                )
+                frame_number += 1
+            second += segment_duration
+
+        with open(join(video_dir, f"{video}.json"), "w") as f:
+            json.dump(transcript, f, ensure_ascii=False, indent=4)
+
+        # Recording the frames as extracted from the video, so the pipeline reuses them
+        if encode:
+            video_file = join(video_dir, f"{video}.mp4")
+            encode_video(frames_dir, video_file, fps, second)
+            frame_count, size = count_frames(frames_dir)
+            info = stat(video_file)
+            FrameManifest(
+                settings=settings,
+                source=video_file,
+                source_size=info.st_size,
+                source_mtime=info.st_mtime_ns,
+                source_hash=sample_hash(video_file),
+                frame_count=frame_count,
+                size=size,
+            ).save(frames_dir)
+        else:
+            with open(join(frames_dir, FRAME_MANIFEST_FILE), "w") as f:
+                json.dump({"settings": settings.to_dict()}, f)
+
+    log(f"Generated {videos} synthetic videos of {duration}s in {dataset_path}")
+    return dataset_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates a synthetic video set for the benchmarks")
+    parser.add_argument("root", help="Directory the video set and its frames cache are written to")
+    parser.add_argument("-n", "--name", default="synthetic", help="Name of the video set")
+    parser.add_argument("--videos", type=int, default=3, help="Number of videos. Default is 3")
+    parser.add_argument("--duration", type=int, default=120, help="Seconds of each video. Default is 120")
+    parser.add_argument("--fps", type=float, default=1.0, help="Frames sampled per second. Default is 1")
+    parser.add_argument("--height", type=int, default=240, help="Frames height. Default is 240")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed. Default is 0")
+    parser.add_argument("--no-video", action="store_true", help="Only writes the transcripts and frames")
+    args = parser.parse_args()
+
+    generate_video_set(
+        args.root,
+        name=args.name,
+        videos=args.videos,
+        duration=args.duration,
+        fps=args.fps,
+        height=args.height,
+        seed=args.seed,
+        encode=False if args.no_video else None,
+    )
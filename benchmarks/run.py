@@ -0,0 +1,382 @@
+"""
+Times every hot path of the summarizer on a synthetic video set and saves the results as JSON,
+named after the commit, to compare them across commits with `--baseline`.
+"""
+
+import sys
+import json
+import argparse
+import platform
+from os import cpu_count, listdir, makedirs
+from subprocess import run
+from functools import cached_property
+from tempfile import TemporaryDirectory
+from time import perf_counter, strftime
+from dataclasses import dataclass, field, asdict
+from statistics import mean, median
+from os.path import abspath, basename, dirname, exists, join
+from typing import Any, Callable
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(ROOT, "multi_summarizer"))
+
+from generate import generate_video_set
+from processing.utils import log
+
+# Benchmarks by name, each one a setup that returns the timed function and the number of items it processes
+BENCHMARKS: dict[str, Callable[["BenchmarkContext"], tuple[Callable[[], Any], int]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    def register(setup: Callable) -> Callable:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    items: int = 0
+    times: list[float] = field(default_factory=list)
+    setup: float = 0.0
+    error: str = ""
+
+    def to_dict(self) -> dict:
+        if not self.times:
+            return asdict(self)
+        return {
+            **asdict(self),
+            "min": min(self.times),
+            "median": median(self.times),
+            "mean": mean(self.times),
+            "per_item": min(self.times) / self.items if self.items else None,
+        }
+
+
+class BenchmarkContext:
+    """Video set shared by the benchmarks, with the inputs several of them need built once"""
+
+    def __init__(self, dataset_path: str, frames_path: str, output_dir: str) -> None:
+        self.dataset_path = dataset_path
+        self.frames_path = frames_path
+        self.output_dir = output_dir
+
+    def load_videos(self) -> list:
+        from processing.dataset import Dataset, DatasetLoader
+
+        # Synthetic sets may have no video files, only transcripts and frames
+        videos = sorted(video for video in listdir(self.dataset_path) if not video.startswith("."))
+        return DatasetLoader(Dataset(basename(self.dataset_path), self.dataset_path, videos)).load_videos()
+
+    @cached_property
+    def videos(self) -> list:
+        return self.load_videos()
+
+    @cached_property
+    def images(self) -> list:
+        return [
+            frame.load_image()
+            for video in self.videos
+            for frame in video.load_frames(self.frames_path)
+        ]
+
+    @cached_property
+    def segments(self) -> list:
+        """Segments with frames between their first and last one, the ones keyframes are selected from"""
+        return [segment for segment in self.videos[0].get_segments() if segment.get_duration() > 2]
+
+    @cached_property
+    def segment_descriptors(self) -> dict:
+        from processing.image import ImageProcessing
+
+        return {segment: ImageProcessing.ks_sift(segment, self.frames_path) for segment in self.segments}
+
+    def get_segment_texts(self) -> dict:
+        return {
+            (video_index, segment_index): segment.get_content()
+            for video_index, video in enumerate(self.videos)
+            for segment_index, segment in enumerate(video.get_segments())
+        }
+
+    @cached_property
+    def bow_df(self) -> Any:
+        from processing.text import BagOfWords
+
+        bow = BagOfWords(self.get_segment_texts())
+        bow.items_preprocessing()
+        return bow.generate_bow_dataframe(["video_index", "segment_index"])
+
+
+@benchmark("frame_loading")
+def frame_loading(context: BenchmarkContext) -> tuple[Callable, int]:
+    from components.frame import FrameSequence
+
+    frames_dirs = [join(context.frames_path, video.get_name()) for video in context.videos]
+
+    def load() -> list:
+        return [frame.load_image() for frames_dir in frames_dirs for frame in FrameSequence(frames_dir).frames()]
+
+    return load, len(context.images)
+
+
+@benchmark("histograms")
+def histograms(context: BenchmarkContext) -> tuple[Callable, int]:
+    from processing.image import ImageProcessing
+
+    def compare() -> list[float]:
+        histograms = [ImageProcessing.get_image_histogram(image) for image in context.images]
+        return [ImageProcessing.compare_histograms(a, b) for a, b in zip(histograms, histograms[1:])]
+
+    return compare, len(context.images)
+
+
+@benchmark("shot_boundaries")
+def shot_boundaries(context: BenchmarkContext) -> tuple[Callable, int]:
+    from numpy import arange, stack
+    from processing.image import ImageProcessing
+    from processing.shots import ShotBoundaries
+
+    histograms = stack([ImageProcessing.get_image_histogram(image).ravel() for image in context.images])
+    seconds = arange(len(histograms))
+
+    def detect() -> list:
+        return ShotBoundaries(seconds, histograms).get_cut_seconds()
+
+    return detect, len(context.images)
+
+
+@benchmark("ks_sift")
+def ks_sift(context: BenchmarkContext) -> tuple[Callable, int]:
+    from processing.image import ImageProcessing
+
+    def select() -> list:
+        return [ImageProcessing.ks_sift(segment, context.frames_path) for segment in context.segments]
+
+    return select, len(context.segments)
+
+
+@benchmark("keyframe_matches")
+def keyframe_matches(context: BenchmarkContext, pairs: int = 20) -> tuple[Callable, int]:
+    from processing.image import ImageProcessing, Keyframe
+
+    keyframes = [
+        Keyframe(descriptor=descriptors)
+        for descriptors in map(ImageProcessing.get_image_descriptors, context.images[: pairs + 1])
+        if descriptors is not None
+    ]
+
+    def match() -> list[int]:
+        return [a.num_matches(b) for a, b in zip(keyframes, keyframes[1:])]
+
+    return match, len(keyframes) - 1
+
+
+@benchmark("bow_tfidf")
+def bow_tfidf(context: BenchmarkContext) -> tuple[Callable, int]:
+    from processing.text import BagOfWords
+
+    texts = context.get_segment_texts()
+
+    def weigh() -> Any:
+        bow = BagOfWords(dict(texts))
+        bow.items_preprocessing()
+        return bow.generate_bow_dataframe(["video_index", "segment_index"])
+
+    return weigh, len(texts)
+
+
+@benchmark("correlation")
+def correlation(context: BenchmarkContext) -> tuple[Callable, int]:
+    from modules.redundancy import bow_correlations
+
+    bow_df = context.bow_df
+    return lambda: bow_correlations(bow_df, 0.17), len(bow_df) * (len(bow_df) - 1) // 2
+
+
+@benchmark("bovw_kmeans")
+def bovw_kmeans(context: BenchmarkContext) -> tuple[Callable, int]:
+    from processing.image import BagOfVisualWords
+
+    descriptors = context.segment_descriptors
+    n_descriptors = sum(len(segment_descriptors) for segment_descriptors in descriptors.values())
+
+    def cluster() -> Any:
+        bovw = BagOfVisualWords(descriptors, dict_size=min(300, n_descriptors // 2))
+        bovw.fit_kmeans(random_state=0)
+        return bovw.generate_bovw_dataframe()
+
+    return cluster, n_descriptors
+
+
+@benchmark("redundancy")
+def redundancy(context: BenchmarkContext) -> tuple[Callable, int]:
+    from modules.redundancy import Redundancy
+    from summarizers.base_summarizer import BaseSummarizer
+
+    # Clustering the redundant segments and keeping the best quality one of each cluster
+    def include() -> Any:
+        summarizer = BaseSummarizer(videos=context.videos, frames_path=context.frames_path)
+        summarizer.start_summary_video()
+        return Redundancy(summarizer).include()
+
+    return include, sum(len(video.get_segments()) for video in context.videos)
+
+
+@benchmark("subjectivity")
+def subjectivity(context: BenchmarkContext) -> tuple[Callable, int]:
+    from modules.subjectivity import find_subjective_segments
+
+    videos_segments = [
+        (
+            [(segment.get_begin(), segment.get_end(), segment.get_content()) for segment in video.get_segments()],
+            join(context.frames_path, video.get_name()),
+        )
+        for video in context.videos
+    ]
+
+    def classify() -> list:
+        return [find_subjective_segments(segments, frames_dir) for segments, frames_dir in videos_segments]
+
+    return classify, sum(len(segments) for segments, _ in videos_segments)
+
+
+@benchmark("rendering")
+def rendering(context: BenchmarkContext, segments_per_video: int = 2) -> tuple[Callable, int]:
+    from processing.render import SummaryRenderer
+
+    segments = [
+        segment for video in context.videos for segment in video.get_segments()[:segments_per_video]
+    ]
+    if not all(exists(segment.get_video().get_video_path()) for segment in segments):
+        raise Exception("skipped, the video set has no videos (ffmpeg unavailable)")
+
+    renderer = SummaryRenderer(join(context.output_dir, "summary.mp4"))
+    return lambda: renderer.render(segments), len(segments)
+
+
+def run_benchmark(name: str, context: BenchmarkContext, repeat: int, warmup: int) -> BenchmarkResult:
+    result = BenchmarkResult(name)
+    try:
+        start = perf_counter()
+        function, result.items = BENCHMARKS[name](context)
+        result.setup = perf_counter() - start
+
+        for _ in range(warmup):
+            function()
+        for _ in range(repeat):
+            start = perf_counter()
+            function()
+            result.times.append(perf_counter() - start)
+    except Exception as e:
+        result.error = str(e)
+        log(f"Benchmark {name} failed: {e}", log_type="WARNING")
+    return result
+
+
+def get_commit() -> str:
+    """Current commit, marked as dirty when the tree has uncommitted changes"""
+    def git(*args: str) -> str:
+        return run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    return f"{commit}-dirty" if git("status", "--porcelain", "--untracked-files=no") else commit
+
+
+def format_table(results: dict[str, dict], baseline: dict[str, dict] = None) -> str:
+    lines = [f"{'benchmark':22} {'items':>7} {'min s':>9} {'median s':>9} {'per item ms':>12}" + (
+        f" {'baseline s':>11} {'speedup':>8}" if baseline else ""
+    )]
+    for name, result in results.items():
+        if result["error"]:
+            lines.append(f"{name:22} {result['error']}")
+            continue
+        line = (
+            f"{name:22} {result['items']:>7} {result['min']:>9.4f} {result['median']:>9.4f} "
+            f"{(result['per_item'] or 0) * 1000:>12.3f}"
+        )
+        previous = (baseline or {}).get(name, {})
+        if previous.get("min"):
+            line += f" {previous['min']:>11.4f} {previous['min'] / result['min']:>7.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run_benchmarks(
+    names: list[str],
+    videos: int = 3,
+    duration: int = 60,
+    fps: float = 1.0,
+    height: int = 240,
+    seed: int = 0,
+    repeat: int = 3,
+    warmup: int = 1,
+    data_dir: str = "",
+) -> dict:
+    """Runs the benchmarks on a synthetic video set, generated in `data_dir` or in a temporary directory"""
+    with TemporaryDirectory() as tmp_dir:
+        root = data_dir or tmp_dir
+        dataset_path = join(root, "synthetic")
+        if not exists(dataset_path):
+            generate_video_set(root, "synthetic", videos, duration, fps, height, seed)
+        output_dir = join(tmp_dir, "output")
+        makedirs(output_dir)
+        context = BenchmarkContext(dataset_path, join(root, "video_frames", "synthetic"), output_dir)
+
+        results = {}
+        for name in names:
+            log(f"Running benchmark {name}")
+            results[name] = run_benchmark(name, context, repeat, warmup).to_dict()
+
+    return {
+        "commit": get_commit(),
+        "date": strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": cpu_count(),
+        "dataset": {"videos": videos, "duration": duration, "fps": fps, "height": height, "seed": seed},
+        "repeat": repeat,
+        "benchmarks": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the summarizer hot paths on a synthetic video set")
+    parser.add_argument("benchmarks", nargs="*", help="Benchmarks to run. Default is all")
+    parser.add_argument("-o", "--output", default="", help="Results JSON. Default is results/benchmarks/<commit>.json")
+    parser.add_argument("-b", "--baseline", default="", help="Results JSON of another commit to compare to")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Timed runs of each benchmark. Default is 3")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before them. Default is 1")
+    parser.add_argument("--videos", type=int, default=3, help="Videos in the synthetic set. Default is 3")
+    parser.add_argument("--duration", type=int, default=60, help="Seconds of each video. Default is 60")
+    parser.add_argument("--fps", type=float, default=1.0, help="Frames sampled per second. Default is 1")
+    parser.add_argument("--height", type=int, default=240, help="Frames height. Default is 240")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the video set. Default is 0")
+    parser.add_argument(
+        "-d", "--data-dir", default="", help="Directory the video set is generated in, or reused from when it exists"
+    )
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.benchmarks or list(BENCHMARKS),
+        videos=args.videos,
+        duration=args.duration,
+        fps=args.fps,
+        height=args.height,
+        seed=args.seed,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        data_dir=args.data_dir,
+    )
+
+    output = args.output or join(ROOT, "results", "benchmarks", f"{report['commit']}.json")
+    makedirs(dirname(abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["benchmarks"]
+    log(f"Benchmark results saved to {output}\n{format_table(report['benchmarks'], baseline)}")
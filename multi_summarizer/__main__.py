@@ -1,40 +1,13 @@
 from processing.utils import log, process_arguments
-from processing.dataset import Dataset, DatasetLoader
-from summarizers.hsmvideosumm import HSMVideoSumm
 
-import pickle
 
+def main(trace: str = "", memory_budget: int = None, memory_report: bool = False, **kwargs):
+    from processing.tracing import tracing
+    from processing.pipeline import run_pipeline
+    from processing.memory import memory_monitoring
 
-def main(**kwargs):
-    output = kwargs.pop("output")
-    dataset = Dataset(**kwargs)
-    log(
-        f"""Running for:
-    - Dataset: {dataset.name}
-    - Path: {dataset.path}
-    - Videos: {dataset.videos}\n"""
-    )
-
-    # Loading data to summarize
-    dataset_loader = DatasetLoader(dataset)
-
-    # Saving frames as images
-    frames_dir = dataset_loader.save_video_frames()
-
-    # Loading videos
-    videos = dataset_loader.load_videos()
-
-    # Creating HSMVideoSumm summarizer object
-    summarizer = HSMVideoSumm(
-        videos=videos,
-        summary_name=dataset.name,
-        frames_path=frames_dir,
-        output_path=output,
-    )
-
-    # Running summarization
-    video_summary = summarizer.summarize()
-    video_summary.save()
+    with tracing(trace), memory_monitoring(memory_budget, memory_report):
+        run_pipeline(**kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+import json
+from time import perf_counter
+
+from processing.utils import log, process_batch_arguments
+
+# Pipeline stages in the order they run, as reported by `run_pipeline`
+STAGES = (
+    "workers", "frames", "transcripts", "frame_analysis", "summarization", "snapping", "plan", "render"
+)
+
+
+def summarize_dataset(dataset: dict, cpus: int):
+    """Summarizes one video set, a failure is recorded in its report instead of stopping the batch"""
+    from processing.pipeline import PipelineReport, run_pipeline
+
+    report = PipelineReport(dataset["name"])
+    try:
+        return run_pipeline(**dataset, cpus=cpus, report=report)
+    except Exception as e:
+        log(f"Summarizing '{dataset['name']}' failed: {e}", log_type="ERROR")
+        report.status, report.error = "failed", str(e)
+        return report
+
+
+def aggregate_reports(reports: list, wall_time: float, jobs: int, cpus: int) -> dict:
+    """Sums the stage timings of every video set run"""
+    stages = {
+        stage: sum(report.timings.get(stage, 0.0) for report in reports)
+        for stage in STAGES
+    }
+    return {
+        "wall_time": wall_time,
+        "jobs": jobs,
+        "cpus": cpus,
+        "datasets": [report.to_dict() for report in reports],
+        "stages": stages,
+        "total": sum(stages.values()),
+        "failed": [report.name for report in reports if report.status != "done"],
+    }
+
+
+def format_batch_table(summary: dict) -> str:
+    """Seconds spent by each video set in each stage"""
+    lines = [f"{'video set':24}" + "".join(f"{stage:>15}" for stage in STAGES) + f"{'total':>10}  status"]
+    for dataset in summary["datasets"]:
+        lines.append(
+            f"{dataset['name'][:24]:24}"
+            + "".join(f"{dataset['timings'].get(stage, 0.0):>15.1f}" for stage in STAGES)
+            + f"{dataset['total']:>10.1f}  {dataset['status']}"
+        )
+    return "\n".join(lines)
+
+
+def batch(datasets: list[dict], jobs: int = 1, cpus: int = None, report: str = "") -> dict:
+    """
+    Summarizes many video sets on a pool of `jobs` worker processes, splitting the CPUs between them.
+    Each worker loads the models once and keeps them for all the video sets it summarizes.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from processing.models import warm_up_models
+    from processing.scheduler import ResourceScheduler
+
+    jobs = min(jobs, len(datasets))
+    total_cpus = ResourceScheduler(cpus).get_cpus()
+    job_cpus = max(total_cpus // jobs, 1)
+    log(f"Summarizing {len(datasets)} video sets, {jobs} at a time with {job_cpus} CPUs each")
+
+    start = perf_counter()
+    if jobs == 1:
+        warm_up_models()
+        reports = [summarize_dataset(dataset, job_cpus) for dataset in datasets]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=warm_up_models) as pool:
+            reports = list(pool.map(summarize_dataset, datasets, [job_cpus] * len(datasets)))
+    summary = aggregate_reports(reports, perf_counter() - start, jobs, total_cpus)
+
+    if report:
+        with open(report, "w") as f:
+            json.dump(summary, f, indent=4)
+
+    log(f"Seconds by stage:\n{format_batch_table(summary)}")
+    log(
+        f"Summarized {len(datasets) - len(summary['failed'])}/{len(datasets)} video sets "
+        f"in {summary['wall_time']:.1f}s" + (f", timing report saved to {report}" if report else "")
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    try:
+        batch_args = process_batch_arguments()
+    except Exception as e:
+        log(str(e), log_type="ERROR")
+    else:
+        batch(**batch_args)
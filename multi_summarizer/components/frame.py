@@ -1,24 +1,145 @@
-from re import search
-from os.path import basename
-from cv2 import imread, IMREAD_GRAYSCALE
+from __future__ import annotations
+
+import json
+from re import search, fullmatch
+from os import listdir
+from dataclasses import dataclass
+from os.path import basename, dirname, exists, join
+from numpy import array, argsort, searchsorted, float64, int32
+
+from processing.tracing import count, span
+
+FRAME_FILE_PATTERN = r"image-(\d+)\.jpg"
+
+# Manifest stored with the frames of a video, holding the settings they were extracted with
+FRAME_MANIFEST_FILE = "manifest.json"
+
+
+@dataclass
+class ExtractionSettings:
+    """
+    How frames are extracted from a video: `fps` frames per second, scaled to `height` pixels
+    (source height if None) after cropping the optional `roi` region, as (x, y, width, height)
+    """
+
+    fps: float = 1.0
+    height: int = None
+    roi: tuple[int, int, int, int] = None
+
+    def to_filter(self) -> str:
+        """ffmpeg video filter graph doing the extraction"""
+        filters = [f"fps={self.fps:g}"]
+        if self.roi is not None:
+            x, y, width, height = self.roi
+            filters.append(f"crop={width}:{height}:{x}:{y}")
+        if self.height is not None:
+            filters.append(f"scale=-2:{self.height}")
+        return ",".join(filters)
+
+    def to_dict(self) -> dict:
+        return {
+            "fps": float(self.fps),
+            "height": self.height,
+            "roi": list(self.roi) if self.roi is not None else None,
+        }
+
+    @staticmethod
+    def from_dict(settings: dict) -> ExtractionSettings:
+        roi = settings.get("roi")
+        return ExtractionSettings(
+            fps=settings.get("fps", 1.0),
+            height=settings.get("height"),
+            roi=tuple(roi) if roi is not None else None,
+        )
+
+    @staticmethod
+    def load(frames_dir: str) -> ExtractionSettings:
+        """Reads the settings stored in the frames manifest, frames without one use the default settings"""
+        path = join(frames_dir, FRAME_MANIFEST_FILE)
+        if not exists(path):
+            return ExtractionSettings()
+
+        with open(path) as f:
+            return ExtractionSettings.from_dict(json.load(f).get("settings", {}))
 
 
 class Frame:
-    def __init__(self, path: str) -> None:
+    __slots__ = ("__path", "__video_second")
+
+    def __init__(self, path: str, video_second: float = None) -> None:
         self.__path = path
-        self.__video_second = self.__process_frame_second()
+        self.__video_second = (
+            self.__process_frame_second() if video_second is None else video_second
+        )
 
-    def get_video_second(self) -> int:
+    def get_video_second(self) -> float:
         return self.__video_second
 
     def get_path(self) -> str:
         return self.__path
 
-    def __process_frame_second(self) -> int:
-        """Gets the correspondeing video second for the frame based on the file name"""
+    def __process_frame_second(self) -> float:
+        """
+        Gets the correspondeing video second for the frame based on the file name,
+        which holds the frame number at the extraction sampling rate
+        """
         filename = basename(self.__path)
-        return int(search("image-(\d+)\.jpg", filename).groups()[0])
+        fps = ExtractionSettings.load(dirname(self.__path)).fps
+        return int(search(FRAME_FILE_PATTERN, filename).groups()[0]) / fps
 
     def load_image(self) -> None:
         """Executes OpenCV imread function and loads to object `image` attribute"""
-        return imread(self.__path, IMREAD_GRAYSCALE)
+        from cv2 import imread, IMREAD_GRAYSCALE
+
+        with span("imread", "io"):
+            image = imread(self.__path, IMREAD_GRAYSCALE)
+        count("frames.decoded")
+        return image
+
+
+class FrameSequence:
+    """
+    Compact, second-sorted index of the frames extracted for one video.
+    Frame objects are only built as lightweight views when they are requested.
+    """
+
+    __slots__ = ("__frames_dir", "__filenames", "__seconds", "__settings")
+
+    def __init__(self, frames_dir: str) -> None:
+        self.__frames_dir = frames_dir
+        self.__settings = ExtractionSettings.load(frames_dir)
+
+        filenames, seconds = [], []
+        for filename in listdir(frames_dir):
+            match = fullmatch(FRAME_FILE_PATTERN, filename)
+            if match:
+                filenames.append(filename)
+                seconds.append(int(match.groups()[0]))
+
+        # Frame numbers are converted to video seconds with the extraction sampling rate
+        order = argsort(array(seconds, dtype=int32), kind="stable")
+        self.__filenames = [filenames[i] for i in order]
+        self.__seconds = array(seconds, dtype=float64)[order] / self.__settings.fps
+
+    def __len__(self) -> int:
+        return len(self.__filenames)
+
+    def __getitem__(self, index: int) -> Frame:
+        return Frame(
+            join(self.__frames_dir, self.__filenames[index]),
+            float(self.__seconds[index]),
+        )
+
+    def get_seconds(self):
+        return self.__seconds
+
+    def get_settings(self) -> ExtractionSettings:
+        return self.__settings
+
+    def frames(self) -> list[Frame]:
+        return [self[i] for i in range(len(self))]
+
+    def between(self, begin: int, end: int) -> list[Frame]:
+        """Gets the frames whose video second is in the [begin, end) range"""
+        first, last = searchsorted(self.__seconds, [begin, end], side="left")
+        return [self[i] for i in range(first, last)]
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+from os.path import basename, splitext
+from datetime import timedelta
+from dataclasses import dataclass, asdict
+
+from components.video import Video
+from components.segment import Segment
+
+
+@dataclass
+class PlanEntry:
+    video: str
+    video_path: str
+    begin: int
+    end: int
+    content: str = ""
+    reason: str = ""
+    cluster: int = None
+
+    @staticmethod
+    def from_segment(segment: Segment, reason: str = "", cluster: int = None) -> PlanEntry:
+        video = segment.get_video()
+        return PlanEntry(
+            video=video.get_name(),
+            video_path=video.get_video_path(),
+            begin=segment.get_begin(),
+            end=segment.get_end(),
+            content=segment.get_content(),
+            reason=reason,
+            cluster=cluster,
+        )
+
+
+class SummaryPlan:
+    """
+    Edit decision list of a summary: the source segments selected for it, in order,
+    with the reason each one was selected. Plans can be saved and rendered later.
+    """
+
+    def __init__(self, name: str = "", entries: list[PlanEntry] = None) -> None:
+        self.__name = name
+        self.__entries = entries if entries is not None else []
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_entries(self) -> list[PlanEntry]:
+        return self.__entries
+
+    def append(self, entry: PlanEntry) -> None:
+        self.__entries.append(entry)
+
+    def get_duration(self) -> int:
+        return sum(entry.end - entry.begin for entry in self.__entries)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.__name,
+            "duration": self.get_duration(),
+            "segments": [asdict(entry) for entry in self.__entries],
+        }
+
+    def save(self, path: str) -> None:
+        """Saves the plan as JSON, or as a CMX 3600 EDL when the path ends with `.edl`"""
+        with open(path, "w", encoding="utf-8") as f:
+            if splitext(path)[1].lower() == ".edl":
+                f.write(self.to_edl())
+            else:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def load(path: str) -> SummaryPlan:
+        with open(path, encoding="utf-8") as f:
+            plan = json.load(f)
+        return SummaryPlan(
+            name=plan.get("name", ""),
+            entries=[PlanEntry(**entry) for entry in plan.get("segments", [])],
+        )
+
+    def to_edl(self, fps: int = 30) -> str:
+        """CMX 3600 EDL of the plan, with timecodes counting `fps` frames per second"""
+
+        def timecode(seconds: float) -> str:
+            total_seconds, frames = divmod(round(seconds * fps), fps)
+            hours, remainder = divmod(total_seconds, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            return f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
+
+        lines = [f"TITLE: {self.__name}", "FCM: NON-DROP FRAME", ""]
+        record_in = 0
+        for i, entry in enumerate(self.__entries, start=1):
+            record_out = record_in + entry.end - entry.begin
+            lines += [
+                f"{i:03d}  AX       V     C        "
+                f"{timecode(entry.begin)} {timecode(entry.end)} "
+                f"{timecode(record_in)} {timecode(record_out)}",
+                f"* FROM CLIP NAME: {basename(entry.video_path)}",
+                f"* COMMENT: {entry.reason}"
+                + (f" (cluster {entry.cluster})" if entry.cluster is not None else ""),
+                "",
+            ]
+            record_in = record_out
+
+        return "\n".join(lines)
+
+    def to_video(self, output_path: str) -> Video:
+        """Builds the summary video object, with its segments pointing to the source videos"""
+        sources, segments = {}, []
+        for entry in self.__entries:
+            if entry.video_path not in sources:
+                sources[entry.video_path] = Video(
+                    name=entry.video, path=entry.video_path, segments=[]
+                )
+            segment = Segment(entry.begin, entry.end, entry.content)
+            sources[entry.video_path].append_segment(segment)
+            segment.set_video(sources[entry.video_path])
+            segments.append(segment)
+
+        return Video(
+            name=self.__name,
+            path=output_path,
+            segments=segments,
+            assign_to_segments=False,
+        )
+
+    def __str__(self) -> str:
+        return "\n".join(
+            "[{begin} - {end}] {video} ({reason}): {content}".format(
+                begin=timedelta(seconds=entry.begin),
+                end=timedelta(seconds=entry.end),
+                video=entry.video,
+                reason=entry.reason,
+                content=entry.content,
+            )
+            for entry in self.__entries
+        )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from abc import abstractmethod
 from datetime import timedelta
 
 from components.frame import Frame
@@ -10,25 +11,61 @@ if TYPE_CHECKING:
     from components.video import Video
 
 
-class Segment:
-    def __init__(
-        self, begin: int, end: int, content: str = "", video: Video = None
-    ) -> None:
-        self.__begin = begin
-        self.__end = end
-        self.__content = content
-        self.__video: video
+class BaseSegment:
+    """Behaviour shared by segments, whatever stores their values"""
+
+    __slots__ = ()
 
     def get_duration(self) -> int:
         """Gets segment's duration in seconds"""
-        return self.__end - self.__begin
+        return self.get_end() - self.get_begin()
 
-    def __ge__(self, other: Segment) -> bool:
+    def __ge__(self, other: BaseSegment) -> bool:
         return self.get_duration() >= other.get_duration()
 
-    def __gt__(self, other: Segment) -> bool:
+    def __gt__(self, other: BaseSegment) -> bool:
         return self.get_duration() > other.get_duration()
 
+    @abstractmethod
+    def get_begin(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_end(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_video(self) -> Video:
+        pass
+
+    @abstractmethod
+    def get_content(self) -> str:
+        pass
+
+    def load_frames(self, frames_path: str, sort: bool = False) -> list[Frame]:
+        return self.get_video().load_frames_between(
+            frames_path, self.get_begin(), self.get_end()
+        )
+
+    def __str__(self) -> str:
+        return "[{begin} - {end}] {content}".format(
+            begin=timedelta(seconds=self.get_begin()),
+            end=timedelta(seconds=self.get_end()),
+            content=self.get_content(),
+        )
+
+
+class Segment(BaseSegment):
+    __slots__ = ("__begin", "__end", "__content", "__video")
+
+    def __init__(
+        self, begin: int, end: int, content: str = "", video: Video = None
+    ) -> None:
+        self.__begin = begin
+        self.__end = end
+        self.__content = content
+        self.__video = video
+
     def get_begin(self) -> int:
         return self.__begin
 
@@ -49,15 +86,3 @@ class Segment:
 
     def get_content(self) -> str:
         return self.__content
-
-    def load_frames(self, frames_path: str, sort: bool = False) -> list[Frame]:
-        frames = self.__video.load_frames(frames_path, sort=sort)
-        segment_range = range(self.__begin, self.__end)
-        return list(filter(lambda f: f.get_video_second() in segment_range, frames))
-
-    def __str__(self) -> str:
-        return "[{begin} - {end}] {content}".format(
-            begin=timedelta(seconds=self.get_begin()),
-            end=timedelta(seconds=self.get_end()),
-            content=self.get_content(),
-        )
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from numpy import dtype, empty, flatnonzero, int32, ndarray
+
+from components.segment import BaseSegment
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from components.video import Video
+
+SEGMENT_DTYPE = dtype(
+    [("begin", int32), ("end", int32), ("video", int32), ("content", int32)]
+)
+
+
+class SegmentTable:
+    """
+    Columnar storage for transcript segments.
+    Begin, end and video id live in a NumPy structured array and contents are kept
+    in a separate string pool, so identical lines are stored only once.
+    """
+
+    __slots__ = ("__rows", "__size", "__contents", "__content_ids")
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.__rows = empty(max(capacity, 1), dtype=SEGMENT_DTYPE)
+        self.__size = 0
+        self.__contents = []
+        self.__content_ids = {}
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __grow(self) -> None:
+        rows = empty(len(self.__rows) * 2, dtype=SEGMENT_DTYPE)
+        rows[: self.__size] = self.__rows[: self.__size]
+        self.__rows = rows
+
+    def __intern_content(self, content: str) -> int:
+        content_id = self.__content_ids.get(content)
+        if content_id is None:
+            content_id = len(self.__contents)
+            self.__contents.append(content)
+            self.__content_ids[content] = content_id
+        return content_id
+
+    def append(self, begin: int, end: int, content: str = "", video_id: int = 0) -> int:
+        """Appends a segment to the table and returns its row index"""
+        if self.__size == len(self.__rows):
+            self.__grow()
+
+        row = self.__size
+        self.__rows[row] = (begin, end, video_id, self.__intern_content(content))
+        self.__size += 1
+        return row
+
+    def get_rows(self) -> ndarray:
+        return self.__rows[: self.__size]
+
+    def get_begin(self, row: int) -> int:
+        return int(self.__rows["begin"][row])
+
+    def get_end(self, row: int) -> int:
+        return int(self.__rows["end"][row])
+
+    def set_begin(self, row: int, begin: int) -> None:
+        self.__rows["begin"][row] = begin
+
+    def set_end(self, row: int, end: int) -> None:
+        self.__rows["end"][row] = end
+
+    def get_video_id(self, row: int) -> int:
+        return int(self.__rows["video"][row])
+
+    def get_content(self, row: int) -> str:
+        return self.__contents[self.__rows["content"][row]]
+
+    def get_video_rows(self, video_id: int) -> ndarray:
+        return flatnonzero(self.get_rows()["video"] == video_id)
+
+    def segments(self, video_id: int) -> list[SegmentRow]:
+        return [SegmentRow(self, row) for row in self.get_video_rows(video_id)]
+
+
+class SegmentRow(BaseSegment):
+    """
+    Segment view whose values are read from and written to a `SegmentTable` row. It only holds the table,
+    the row and the video, as the other values stay in the table.
+    """
+
+    __slots__ = ("__table", "__row", "__video")
+
+    def __init__(self, table: SegmentTable, row: int, video: Video = None) -> None:
+        self.__table = table
+        self.__row = int(row)
+        self.__video = video
+
+    def get_row(self) -> int:
+        return self.__row
+
+    def get_begin(self) -> int:
+        return self.__table.get_begin(self.__row)
+
+    def get_end(self) -> int:
+        return self.__table.get_end(self.__row)
+
+    def set_begin(self, begin: int) -> None:
+        self.__table.set_begin(self.__row, begin)
+
+    def set_end(self, end: int) -> None:
+        self.__table.set_end(self.__row, end)
+
+    def get_video(self) -> Video:
+        return self.__video
+
+    def set_video(self, video: Video) -> None:
+        self.__video = video
+
+    def get_content(self) -> str:
+        return self.__table.get_content(self.__row)
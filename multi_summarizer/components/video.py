@@ -1,8 +1,6 @@
-from os import listdir
 from os.path import join
-from moviepy.editor import VideoFileClip, vfx, concatenate_videoclips
 
-from components.frame import Frame
+from components.frame import Frame, FrameSequence
 from components.segment import Segment
 
 
@@ -17,6 +15,7 @@ class Video:
         self.__name = name
         self.__path = path
         self.__segments = segments
+        self.__frame_sequences = {}
 
         if assign_to_segments:
             self.__assign_to_segments()
@@ -28,12 +27,38 @@ class Video:
     def append_segment(self, new_segment: Segment) -> None:
         self.__segments.append(new_segment)
 
-    def save(self, fadein: float = 0.5, fadeout: float = 0.5) -> None:
-        clips_list = []
+    def save(
+        self,
+        fadein: float = 0.5,
+        fadeout: float = 0.5,
+        engine: str = "ffmpeg",
+        workers: int = None,
+        cpus: int = None,
+    ) -> None:
+        """
+        Renders the video segments to the video path.
+        The `ffmpeg` engine stream copies segments where possible and encodes the rest as
+        independent chunks on `workers` concurrent encoders sharing `cpus` threads,
+        `moviepy` re-encodes everything.
+        """
+        if engine == "ffmpeg":
+            from processing.render import SummaryRenderer
+
+            SummaryRenderer(
+                self.__path, fadein, fadeout, workers=workers, cpus=cpus
+            ).render(self.__segments)
+            return
+
+        from moviepy.editor import VideoFileClip, vfx, concatenate_videoclips
+
+        # Opening a single reader for each source video
+        readers, clips_list = {}, []
         for segment in self.__segments:
-            clip = VideoFileClip(segment.get_video().get_video_path()).subclip(
-                segment.get_begin(), segment.get_end()
-            )
+            source = segment.get_video().get_video_path()
+            if source not in readers:
+                readers[source] = VideoFileClip(source)
+
+            clip = readers[source].subclip(segment.get_begin(), segment.get_end())
             clip = vfx.fadein(clip, fadein)
             clip = vfx.fadeout(clip, fadeout)
             clips_list.append(clip)
@@ -41,6 +66,24 @@ class Video:
         final_clip = concatenate_videoclips(clips_list)
         final_clip.write_videofile(self.__path)
 
+        for reader in readers.values():
+            reader.close()
+
+    def save_stream(
+        self,
+        playlist_path: str,
+        fadein: float = 0.5,
+        fadeout: float = 0.5,
+        workers: int = None,
+        cpus: int = None,
+    ) -> None:
+        """Renders the video segments as a HLS playlist that is playable while it is rendered"""
+        from processing.render import SummaryRenderer
+
+        SummaryRenderer(
+            self.__path, fadein, fadeout, workers=workers, cpus=cpus
+        ).render_stream(self.__segments, playlist_path)
+
     def get_name(self) -> str:
         return self.__name
 
@@ -53,6 +96,9 @@ class Video:
     def get_segments(self) -> list[Segment]:
         return self.__segments
 
+    def set_segments(self, segments: list[Segment]) -> None:
+        self.__segments = segments
+
     def get_content(self, separator: str = " ") -> str:
         return separator.join(seg.get_content() for seg in self.__segments)
 
@@ -69,12 +115,16 @@ class Video:
 
         return segments
 
+    def get_frame_sequence(self, frames_path: str) -> FrameSequence:
+        """Indexes the video frames directory once and reuses it for later calls"""
+        if frames_path not in self.__frame_sequences:
+            self.__frame_sequences[frames_path] = FrameSequence(
+                join(frames_path, self.__name)
+            )
+        return self.__frame_sequences[frames_path]
+
     def load_frames(self, frames_path: str, sort=False) -> list[Frame]:
-        frames = [
-            Frame(join(frames_path, self.__name, frame_path))
-            for frame_path in listdir(join(frames_path, self.__name))
-        ]
-        if sort:
-            frames.sort(key=lambda frame: frame.get_video_second())
-
-        return frames
+        return self.get_frame_sequence(frames_path).frames()
+
+    def load_frames_between(self, frames_path: str, begin: int, end: int) -> list[Frame]:
+        return self.get_frame_sequence(frames_path).between(begin, end)
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from processing.utils import log, process_frames_arguments
+
+
+def frames(
+    command: str,
+    root: str = "video_frames",
+    budget: int = None,
+    incomplete: bool = False,
+    dataset: str = None,
+) -> None:
+    """Lists the videos in the extracted frames cache, or evicts them by budget, completeness or dataset"""
+    from processing.frame_cache import FrameCache
+
+    frame_cache = FrameCache(root)
+
+    if command == "prune":
+        if budget is None and not incomplete and dataset is None:
+            raise Exception("Nothing to prune, pass a budget, --incomplete or a dataset")
+        frame_cache.prune(budget=budget, incomplete=incomplete, dataset=dataset)
+
+    entries = frame_cache.get_entries()
+    lines = []
+    for entry in reversed(entries):
+        manifest = entry.manifest
+        lines.append(
+            "{status:10} {size:>9.1f} MiB {frames:>7} frames  {used:16}  {settings:28} {path}".format(
+                status="ok" if entry.is_complete() else "incomplete",
+                size=entry.size / 2**20,
+                frames=manifest.frame_count if manifest else "-",
+                used=(
+                    datetime.fromtimestamp(manifest.last_used).strftime("%Y-%m-%d %H:%M")
+                    if manifest
+                    else "-"
+                ),
+                settings=manifest.settings.to_filter() if manifest else "-",
+                path=entry.path,
+            )
+        )
+    log(
+        f"{len(entries)} videos, {sum(entry.size for entry in entries) / 2**20:.1f} MiB in {root}"
+        + "".join(f"\n{line}" for line in lines)
+    )
+
+
+if __name__ == "__main__":
+    try:
+        frames_args = process_frames_arguments()
+        frames(**frames_args)
+    except Exception as e:
+        log(str(e), log_type="ERROR")
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from operator import le
+
 from modules.modules_base import SelectionCriteria
 
 from typing import TYPE_CHECKING
@@ -8,6 +10,75 @@ if TYPE_CHECKING:
     from summarizers.base_summarizer import BaseSummarizer
 
 
+def first_segments_by_video(cluster: set[tuple[int, int]]) -> dict[int, int]:
+    """Segment index of the first item of each video in the cluster, in the order `find_same_video_in_cluster` scans it"""
+    segments = {}
+    for video_index, segment_index in cluster:
+        segments.setdefault(video_index, segment_index)
+    return segments
+
+
+class OrderBlocks:
+    """
+    Sequence of (video index, segment index) items split in blocks of up to twice `block_size` items, each one
+    with the largest segment index of every video in it. Finding the first item whose segment reaches the
+    threshold of its video skips the blocks that cannot hold it, and inserting an item only moves its block.
+    """
+
+    def __init__(self, videos: int, block_size: int = 64) -> None:
+        self.__videos = videos
+        self.__block_size = block_size
+        self.__blocks = [[]]
+        self.__maxima = [[-1] * videos]
+
+    def first_reaching(self, thresholds: list[int]) -> tuple[int, int]:
+        """Block and offset of the first item whose segment index is at least the threshold of its video, the end if none"""
+        for block_index, maxima in enumerate(self.__maxima):
+            if any(map(le, thresholds, maxima)):
+                for offset, (video_index, segment_index) in enumerate(self.__blocks[block_index]):
+                    if segment_index >= thresholds[video_index]:
+                        return block_index, offset
+        return len(self.__blocks) - 1, len(self.__blocks[-1])
+
+    def insert(self, block_index: int, offset: int, item: tuple[int, int]) -> None:
+        block, maxima = self.__blocks[block_index], self.__maxima[block_index]
+        block.insert(offset, item)
+        maxima[item[0]] = max(maxima[item[0]], item[1])
+
+        # Splitting full blocks in halves
+        if len(block) > 2 * self.__block_size:
+            halves = [block[: self.__block_size], block[self.__block_size :]]
+            self.__blocks[block_index : block_index + 1] = halves
+            self.__maxima[block_index : block_index + 1] = [self.__get_maxima(half) for half in halves]
+
+    def items(self) -> list[tuple[int, int]]:
+        return [item for block in self.__blocks for item in block]
+
+    def __get_maxima(self, block: list[tuple[int, int]]) -> list[int]:
+        maxima = [-1] * self.__videos
+        for video_index, segment_index in block:
+            maxima[video_index] = max(maxima[video_index], segment_index)
+        return maxima
+
+
+def order_by_similarity_cluster_fast(
+    items_cluster: dict[tuple[int, int], set[tuple[int, int]]], block_size: int = 64
+) -> list[tuple[int, int]]:
+    """
+    Same order as `Chronology.order_by_similarity_cluster`, without rescanning every cluster for each placed item.
+    Each item is still inserted before the first placed item that its cluster segment of the same video, or its
+    own segment, does not come after, as that relation is not transitive and no sort reproduces it. Clusters are
+    turned into lookup tables of their segment of each video and positions are found in `OrderBlocks`.
+    """
+    videos = max((video_index for video_index, _ in items_cluster), default=-1) + 1
+    order = OrderBlocks(videos, block_size)
+    for item, cluster in items_cluster.items():
+        segments = first_segments_by_video(cluster)
+        thresholds = [segments.get(video_index, item[1]) for video_index in range(videos)]
+        order.insert(*order.first_reaching(thresholds), item)
+    return order.items()
+
+
 class Chronology(SelectionCriteria):
     def __init__(self, summarizer: BaseSummarizer) -> None:
         self.__summarizer = summarizer
@@ -22,8 +93,16 @@ class Chronology(SelectionCriteria):
 
     @staticmethod
     def order_by_similarity_cluster(
-        items_cluster: dict[tuple[int, int], set[tuple[int, int]]]
+        items_cluster: dict[tuple[int, int], set[tuple[int, int]]],
+        engine: str = "reference",
     ) -> list[int, int]:
+        """
+        Orders the items so each one comes after the items of every video its cluster has a later segment of.
+        The `fast` engine gives the same order with `order_by_similarity_cluster_fast`.
+        """
+        if engine == "fast":
+            return order_by_similarity_cluster_fast(items_cluster)
+
         result = []
 
         for item, cluster in items_cluster.items():
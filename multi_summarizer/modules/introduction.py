@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+from os.path import join
+from numpy import ndarray
+
 from processing.utils import log
 from components.video import Video
 from components.segment import Segment
+from components.frame import FrameSequence
 from processing.image import ImageProcessing
+from processing.shots import ShotBoundaries
 
 from modules.modules_base import SelectionCriteria
 
@@ -13,15 +18,53 @@ if TYPE_CHECKING:
     from summarizers.base_summarizer import BaseSummarizer
 
 
+def find_introduction_end_second(
+    frames_dir: str,
+    threshold: float = 0.7,
+    seconds: ndarray = None,
+    histograms: ndarray = None,
+) -> float:
+    """
+    Finds and returns the end second of a video's introduction.
+    Introduction's end is detected by calculating the histogram intersection betweeen consecutive frames,
+    taken from the precomputed frame `histograms` when given.
+    """
+    if histograms is not None:
+        return ShotBoundaries(seconds, histograms).get_first_shot_end(threshold)
+
+    # Flattened list of frames in video
+    all_frames = FrameSequence(frames_dir).frames()
+
+    curr_frame = all_frames.pop(0)
+    hist_curr = ImageProcessing.get_frame_histogram(curr_frame)
+
+    for next_frame in all_frames:
+        # Calculating histogram intersection between frames
+        hist_next = ImageProcessing.get_frame_histogram(next_frame)
+        hist_intersec = ImageProcessing.compare_histograms(hist_curr, hist_next)
+
+        # If matches threshold rule, returns the frame second
+        if hist_intersec < threshold:
+            return curr_frame.get_video_second()
+
+        curr_frame, hist_curr = next_frame, hist_next
+
+    return curr_frame.get_video_second()
+
+
 class Introduction(SelectionCriteria):
-    def __init__(self, summarizer: BaseSummarizer) -> None:
+    def __init__(self, summarizer: BaseSummarizer, threshold: float = 0.7) -> None:
         self.__summarizer = summarizer
+        self.__threshold = threshold
+        self.__intro_end_seconds = None
 
     def include(self) -> BaseSummarizer:
         log("Including introduction in summarized video")
         shortest_intro = self.__get_shortest_introduction()
         if shortest_intro:
-            self.__summarizer.append_segments_to_summary(shortest_intro)
+            self.__summarizer.append_segments_to_summary(
+                shortest_intro, reason="shortest introduction"
+            )
         return self.__summarizer
 
     def exclude(self) -> BaseSummarizer:
@@ -29,9 +72,40 @@ class Introduction(SelectionCriteria):
         self.__remove_introductions()
         return self.__summarizer
 
+    def get_parameters(self) -> dict:
+        return {"threshold": self.__threshold}
+
+    def __get_introduction_end_second(self, video: Video) -> float:
+        # Detecting the introductions of all videos at once, so they can be cached together
+        if self.__intro_end_seconds is None:
+            self.__intro_end_seconds = self.__summarizer.cached_artifact(
+                "introduction-ends", self.__find_introduction_end_seconds
+            )
+        return self.__intro_end_seconds[video.get_name()]
+
+    def __find_introduction_end_seconds(self) -> dict[str, float]:
+        videos = self.__summarizer.get_videos()
+        boundaries = [self.__summarizer.get_shot_boundaries(video.get_name()) for video in videos]
+
+        # The introduction ends with the first shot, on the cuts detected from the frame histograms when computed
+        if all(video_boundaries is not None for video_boundaries in boundaries):
+            end_seconds = [
+                video_boundaries.get_first_shot_end(self.__threshold)
+                for video_boundaries in boundaries
+            ]
+        else:
+            end_seconds = self.__summarizer.run_video_tasks(
+                find_introduction_end_second,
+                [
+                    (join(self.__summarizer.get_frames_path(), video.get_name()), self.__threshold)
+                    for video in videos
+                ],
+            )
+        return {video.get_name(): end for video, end in zip(videos, end_seconds)}
+
     def __remove_introductions(self) -> None:
         for video in self.__summarizer.get_videos():
-            intro_end_sec = self.__find_introduction_end_second(video)
+            intro_end_sec = self.__get_introduction_end_second(video)
             intro_segments = video.get_segments_until(intro_end_sec)
             for _ in intro_segments:
                 video.delete_segment_at(0)
@@ -40,7 +114,7 @@ class Introduction(SelectionCriteria):
         min_end_sec, min_intro_segments = None, None
         for video in self.__summarizer.get_videos():
             # Detecting introduction in video and keeping the smallest one
-            intro_end_sec = self.__find_introduction_end_second(video)
+            intro_end_sec = self.__get_introduction_end_second(video)
             intro_segments = video.get_segments_until(intro_end_sec)
 
             if intro_segments and (min_end_sec is None or intro_end_sec < min_end_sec):
@@ -52,29 +126,3 @@ class Introduction(SelectionCriteria):
                 video.delete_segment_at(0)
 
         return min_intro_segments
-
-    def __find_introduction_end_second(
-        self, video: Video, threshold: float = 0.7
-    ) -> int:
-        """
-        Finds and returns the end second of the video's introduction.
-        Introduction's end is detected by calculating the histogram intersection betweeen consecutive frames.
-        """
-        # Flattened list of frames in video
-        all_frames = video.load_frames(self.__summarizer.get_frames_path(), sort=True)
-
-        curr_frame = all_frames.pop(0)
-        hist_curr = ImageProcessing.get_frame_histogram(curr_frame)
-
-        for next_frame in all_frames:
-            # Calculating histogram intersection between frames
-            hist_next = ImageProcessing.get_frame_histogram(next_frame)
-            hist_intersec = ImageProcessing.compare_histograms(hist_curr, hist_next)
-
-            # If matches threshold rule, returns the frame second
-            if hist_intersec < threshold:
-                return curr_frame.get_video_second()
-
-            curr_frame, hist_curr = next_frame, hist_next
-
-        return curr_frame.get_video_second()
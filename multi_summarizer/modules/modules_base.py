@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from functools import wraps
 from abc import ABC, abstractmethod
 
+from processing.tracing import span
+
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -9,6 +12,22 @@ if TYPE_CHECKING:
 
 
 class SelectionCriteria(ABC):
+    def __init_subclass__(cls, **kwargs) -> None:
+        # Tracing every criteria run as a span named after the criteria
+        super().__init_subclass__(**kwargs)
+        for method in ("include", "exclude"):
+            if method in cls.__dict__:
+                setattr(cls, method, SelectionCriteria.__traced(cls.__name__, cls.__dict__[method]))
+
+    @staticmethod
+    def __traced(criteria: str, method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with span(f"{criteria}.{method.__name__}", "criteria"):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
     @abstractmethod
     def include(self) -> BaseSummarizer:
         pass
@@ -16,3 +35,7 @@ class SelectionCriteria(ABC):
     @abstractmethod
     def exclude(self) -> BaseSummarizer:
         pass
+
+    def get_parameters(self) -> dict:
+        """Parameters the criteria results depend on, part of the stage cache key"""
+        return {}
@@ -1,20 +1,135 @@
 from __future__ import annotations
 
+from os.path import join
 from itertools import chain
+from numpy import array, ndarray
 
+from components.video import Video
 from components.segment import Segment
+from components.frame import FrameSequence
 from modules.modules_base import SelectionCriteria
+from processing.memory import fits_memory, require_memory, track_memory
 from processing.image import BagOfVisualWords, ImageProcessing
+from processing.frame_quality import frame_measures, segments_quality_scores, stack_frame_measures
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from summarizers.base_summarizer import BaseSummarizer
+    from processing.frame_stream import FrameFeatureTable
+
+
+# Copies of the descriptors k-means holds: the segments ones, their concatenation and its working buffers
+KMEANS_COPIES = 3
+
+
+def to_segments(segments: list[tuple[str, int, int]]) -> list[Segment]:
+    videos = {name: Video(name=name, segments=[]) for name, _, _ in segments}
+    return [Segment(begin, end, video=videos[name]) for name, begin, end in segments]
+
+
+def select_keyframes(
+    segments: list[tuple[str, int, int]],
+    frames_path: str,
+    features: FrameFeatureTable = None,
+    engine: str = "reference",
+    keyframe_ratios: tuple[float, float] = (0.6, 0.1),
+) -> list[ndarray]:
+    """Descriptors of the keyframes of each (video name, begin, end) segment"""
+    return [
+        ImageProcessing.ks_sift(segment, frames_path, features, engine, keyframe_ratios)
+        for segment in to_segments(segments)
+    ]
+
+
+def rank_segments_by_quality(
+    segments: list[tuple[str, int, int]],
+    frames_path: str,
+    features: FrameFeatureTable = None,
+    n_segments: int = 1,
+    dict_size: int = 300,
+    random_state: int = 0,
+    streaming: bool = False,
+    engine: str = "reference",
+    keyframe_ratios: tuple[float, float] = (0.6, 0.1),
+    keyframes: list[ndarray] = None,
+) -> list[int]:
+    """
+    Returns the indexes of the `n_segments` (video name, begin, end) segments with the
+    largest Bag of Visual Words histograms, best first. `streaming` fits the dictionary with
+    mini-batch k-means, for descriptors too large to cluster at once. `engine` and `keyframe_ratios`
+    select the keyframes of the segments, unless their descriptors are given as `keyframes`.
+    """
+    segment_objs = to_segments(segments)
+    if keyframes is None:
+        keyframes = select_keyframes(segments, frames_path, features, engine, keyframe_ratios)
+
+    # Getting Bag of Visual Words for the segments
+    bovw = BagOfVisualWords(items=dict(zip(segment_objs, keyframes)), dict_size=dict_size)
+    bovw.fit_kmeans(streaming=streaming, random_state=random_state)
+    df = bovw.generate_bovw_dataframe()
+
+    # Summing the histogram features for each segment
+    df["histogram_sum"] = df.sum(axis=1)
+
+    segment_index = {segment: i for i, segment in enumerate(segment_objs)}
+    return [
+        segment_index[segment]
+        for segment in df.nlargest(n_segments, columns="histogram_sum").index
+    ]
+
+
+def score_video_segments(
+    video_name: str,
+    spans: list[tuple[int, int]],
+    frames_path: str,
+    features: FrameFeatureTable = None,
+) -> list[float]:
+    """
+    Frame quality scores of segments of a video given as (begin, end) seconds, from the `quality` frame
+    features of the video. Without them, its frames are decoded once, in order, keeping only their measures.
+    Needs no descriptors, so it scores segments much faster than their Bag of Visual Words.
+    """
+    if features is not None and features.has(video_name, "quality"):
+        seconds, qualities = features.get_seconds(video_name), features.get(video_name, "quality")
+        return segments_quality_scores(seconds, qualities, spans)
+
+    sequence = FrameSequence(join(frames_path, video_name))
+    seconds, measures = [], []
+    for i, second in enumerate(sequence.get_seconds()):
+        image = sequence[i].load_image()
+        if image is not None:
+            seconds.append(second)
+            measures.append(frame_measures(image))
+    return segments_quality_scores(array(seconds), stack_frame_measures(measures), spans)
+
+
+def best_score_indexes(scores: list[float], n_segments: int = 1) -> list[int]:
+    """Indexes of the `n_segments` best scores, best first and in order among equal ones"""
+    return sorted(range(len(scores)), key=lambda i: -scores[i])[:n_segments]
 
 
 class Quality(SelectionCriteria):
-    def __init__(self, summarizer: BaseSummarizer) -> None:
+    """
+    Ranks segments by the Bag of Visual Words of their SIFT keyframes with the `bovw` mode,
+    and by the sharpness, exposure and motion of their frames with the `frames` one
+    """
+
+    def __init__(
+        self,
+        summarizer: BaseSummarizer,
+        dict_size: int = 300,
+        random_state: int = 0,
+        engine: str = "reference",
+        keyframe_ratios: tuple[float, float] = (0.6, 0.1),
+        mode: str = "bovw",
+    ) -> None:
         self.__summarizer = summarizer
+        self.__dict_size = dict_size
+        self.__random_state = random_state
+        self.__engine = engine
+        self.__keyframe_ratios = keyframe_ratios
+        self.__mode = mode
 
     def include(self) -> BaseSummarizer:
         # TODO
@@ -24,34 +139,156 @@ class Quality(SelectionCriteria):
         # TODO
         return self.__summarizer
 
+    def get_parameters(self) -> dict:
+        return {
+            "dict_size": self.__dict_size,
+            "random_state": self.__random_state,
+            "engine": self.__engine,
+            "keyframe_ratios": list(self.__keyframe_ratios),
+            "mode": self.__mode,
+        }
+
     def best_segments_for_videos(
         self, n_segments: int, flatten: bool = False
     ) -> list[Segment] | list[list[Segment]]:
-        videos_best_segs = []
-        for video in self.__summarizer.get_videos():
-            # Getting Bag of Visual Words for the segments in the video
-            bovw = BagOfVisualWords(
-                items={
-                    segment: ImageProcessing.ks_sift(
-                        segment, self.__summarizer.get_frames_path()
-                    )
-                    for segment in video.get_segments()
-                },
-                dict_size=300,
-            )
-            bovw.fit_kmeans()
-            df = bovw.generate_bovw_dataframe()
-
-            # Summing the histogram features for each segment
-            df["histogram_sum"] = df.sum(axis=1)
-
-            videos_best_segs.append(
-                df.nlargest(n_segments, columns="histogram_sum").index.to_list()
-            )
+        videos = self.__summarizer.get_videos()
+        segments = [
+            [
+                (segment.get_video().get_name(), segment.get_begin(), segment.get_end())
+                for segment in video.get_segments()
+            ]
+            for video in videos
+        ]
+
+        if self.__mode == "frames":
+            best_indexes = self.__rank_by_frames(segments, n_segments)
+        else:
+            best_indexes = self.__rank_by_bovw(segments, n_segments)
+
+        videos_best_segs = [
+            [video.get_segment(i) for i in indexes]
+            for video, indexes in zip(videos, best_indexes)
+        ]
         if flatten:
             videos_best_segs = list(chain.from_iterable(videos_best_segs))
 
         return videos_best_segs
 
+    def __rank_by_frames(
+        self, segments: list[list[tuple[str, int, int]]], n_segments: int
+    ) -> list[list[int]]:
+        # Scoring each segment once, with a task per source video, as the videos ranked may be clusters of
+        # segments from all of them
+        spans = {}
+        for name, begin, end in chain.from_iterable(segments):
+            spans.setdefault(name, {})[(begin, end)] = None
+        names = list(spans)
+        videos_scores = self.__summarizer.run_cached_video_tasks(
+            "quality-frames",
+            score_video_segments,
+            [self.__frames_task(name, list(spans[name])) for name in names],
+            [(name, list(spans[name])) for name in names],
+        )
+
+        scores = {
+            (name, *span): score
+            for name, video_scores in zip(names, videos_scores)
+            for span, score in zip(spans[name], video_scores)
+        }
+        return [
+            best_score_indexes([scores[segment] for segment in video_segments], n_segments)
+            for video_segments in segments
+        ]
+
+    def __frames_task(self, name: str, spans: list[tuple[int, int]]) -> tuple:
+        # Sending only the frame qualities of the video
+        features = self.__summarizer.get_frame_features()
+        if features is not None:
+            features = features.select([name], ["quality"])
+        return name, spans, self.__summarizer.get_frames_path(), features
+
+    def __rank_by_bovw(
+        self, segments: list[list[tuple[str, int, int]]], n_segments: int
+    ) -> list[list[int]]:
+        # Keyframes do not depend on the dictionary, so runs with other dictionary sizes reuse them
+        keyframes = self.__summarizer.run_cached_video_tasks(
+            "quality-keyframes",
+            select_keyframes,
+            [self.__keyframes_task(video_segments) for video_segments in segments],
+            [(video_segments, self.__engine, self.__keyframe_ratios) for video_segments in segments],
+        )
+        streaming = [self.__needs_streaming(video_keyframes) for video_keyframes in keyframes]
+        return self.__summarizer.run_cached_video_tasks(
+            "quality-ranking",
+            rank_segments_by_quality,
+            [
+                self.__quality_task(*task, n_segments)
+                for task in zip(segments, keyframes, streaming)
+            ],
+            [
+                (video_segments, self.get_parameters(), n_segments, video_streaming)
+                for video_segments, video_streaming in zip(segments, streaming)
+            ],
+        )
+
+    def __keyframes_task(self, segments: list[tuple[str, int, int]]) -> tuple:
+        # Sending only the descriptors of the videos the segments come from
+        features = self.__summarizer.get_frame_features()
+        if features is not None:
+            features = features.select([name for name, _, _ in segments], ["descriptors"])
+
+        return (
+            segments,
+            self.__summarizer.get_frames_path(),
+            features,
+            self.__engine,
+            self.__keyframe_ratios,
+        )
+
+    def __needs_streaming(self, keyframes: list[ndarray]) -> bool:
+        # Clustering streams the descriptors when their concatenated copies would not fit in the memory budget
+        descriptors_size = sum(descriptors.nbytes for descriptors in keyframes)
+        track_memory("bovw_descriptors", descriptors_size)
+        streaming = not fits_memory("bovw_descriptors", descriptors_size * KMEANS_COPIES)
+        if streaming:
+            require_memory("bovw_descriptors", descriptors_size)
+        return streaming
+
+    def __quality_task(
+        self,
+        segments: list[tuple[str, int, int]],
+        keyframes: list[ndarray],
+        streaming: bool,
+        n_segments: int,
+    ) -> tuple:
+        return (
+            segments,
+            self.__summarizer.get_frames_path(),
+            None,
+            n_segments,
+            self.__dict_size,
+            self.__random_state,
+            streaming,
+            self.__engine,
+            self.__keyframe_ratios,
+            keyframes,
+        )
+
     def get_segment_quality(self, segment: Segment) -> float:
-        return ImageProcessing.ks_sift(segment, self.__summarizer.__frames_path)
+        """Frame quality score of the segment with the `frames` mode, its keyframe descriptors count otherwise"""
+        if self.__mode == "frames":
+            return score_video_segments(
+                segment.get_video().get_name(),
+                [(segment.get_begin(), segment.get_end())],
+                self.__summarizer.get_frames_path(),
+                self.__summarizer.get_frame_features(),
+            )[0]
+
+        keyframes = ImageProcessing.ks_sift(
+            segment,
+            self.__summarizer.get_frames_path(),
+            self.__summarizer.get_frame_features(),
+            self.__engine,
+            self.__keyframe_ratios,
+        )
+        return float(len(keyframes))
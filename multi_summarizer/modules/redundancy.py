@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from pandas import DataFrame
 from numpy import equal, tril
+from pandas import DataFrame
 from itertools import chain
 
 from processing.utils import log
@@ -9,15 +9,182 @@ from components.video import Video
 from components.segment import Segment
 from processing.text import BagOfWords
 from processing.utils import custom_cosine
+from processing.tracing import count, span
+from processing.memory import fits_memory, get_available_memory, require_memory, track_memory
 from modules.quality import Quality
 from modules.chronology import Chronology
 from modules.modules_base import SelectionCriteria
 from summarizers.base_summarizer import BaseSummarizer
 
+# Bytes per segment pair of the dense correlations matrix along with its masks and melted copy
+DENSE_CORRELATION_BYTES = 32
+# Bytes per segment pair of a chunk of correlations rows along with its masks
+CHUNK_CORRELATION_BYTES = 16
+
+
+def is_sparse_dataframe(df: DataFrame) -> bool:
+    try:
+        df.sparse
+    except AttributeError:
+        return False
+    # The accessor also accepts frames without columns
+    return len(df.columns) > 0
+
+
+def bow_correlations(bow_df: DataFrame, threshold: float) -> DataFrame:
+    """
+    Similarity of every pair of segments of different videos above `threshold`, as rows of
+    (video_index, segment_index, video_index_col, segment_index_col, value)
+    """
+    # Generating BoW correlations matrix
+    correlations = bow_df.T.corr(custom_cosine)
+
+    # Disregarding same-video comparisons
+    is_same_video = equal.outer(
+        correlations.index.get_level_values("video_index"),
+        correlations.columns.get_level_values("video_index"),
+    )
+    # Keeping only the upper diagonal of the pairwise comparisons
+    is_upper_diagonal = tril(correlations) > 0
+    # Keeping only similarities greater than treshold
+    is_gt_threshold = correlations.gt(threshold)
+
+    # Masking correlations matrix
+    correlations = (
+        correlations.mask(is_same_video | is_upper_diagonal | ~is_gt_threshold)
+        .dropna(axis="index", how="all")
+        .dropna(axis="columns", how="all")
+    )
+
+    # Finding text-pair matches
+    correlations = correlations.melt(ignore_index=False).dropna(
+        "index", subset=["value"]
+    )
+    correlations.columns = ["video_index_col", "segment_index_col", "value"]
+    correlations.reset_index(inplace=True)
+    return correlations
+
+
+def bow_correlations_chunked(
+    bow_df: DataFrame, threshold: float, rows_per_chunk: int
+) -> DataFrame:
+    """
+    Same pairs as `bow_correlations`, in the same order, computing `rows_per_chunk` rows of the
+    similarity matrix at a time and keeping only the pairs above `threshold`, so memory grows with
+    the matches instead of with the squared number of segments. Also takes sparse DataFrames.
+    """
+    from numpy import arange, concatenate, empty, lexsort
+
+    if is_sparse_dataframe(bow_df):
+        vectors = bow_df.sparse.to_coo().tocsr()
+    else:
+        vectors = bow_df.to_numpy(dtype=float)
+    video_indexes = bow_df.index.get_level_values("video_index").to_numpy()
+    segment_indexes = bow_df.index.get_level_values("segment_index").to_numpy()
+    n_segments = len(bow_df)
+
+    rows, columns, values = [empty(0, int)], [empty(0, int)], [empty(0)]
+    for start in range(0, n_segments, max(1, rows_per_chunk)):
+        stop = min(start + rows_per_chunk, n_segments)
+        chunk = vectors[start:stop] @ vectors.T
+        chunk = chunk.toarray() if hasattr(chunk, "toarray") else chunk
+
+        # Same masks as the whole matrix, where the diagonal is always 1 as DataFrame.corr sets it
+        row = arange(start, stop)[:, None]
+        column = arange(n_segments)[None, :]
+        chunk[row == column] = 1.0
+        is_kept = (
+            (video_indexes[row] != video_indexes[column])
+            & (chunk > threshold)
+            & ~((row >= column) & (chunk > 0))
+        )
+        chunk_rows, chunk_columns = is_kept.nonzero()
+        rows.append(chunk_rows + start)
+        columns.append(chunk_columns)
+        values.append(chunk[chunk_rows, chunk_columns])
+
+    rows, columns, values = concatenate(rows), concatenate(columns), concatenate(values)
+
+    # Melting goes through the matrix column by column
+    order = lexsort((rows, columns))
+    rows, columns = rows[order], columns[order]
+    return DataFrame(
+        {
+            "video_index": video_indexes[rows],
+            "segment_index": segment_indexes[rows],
+            "video_index_col": video_indexes[columns],
+            "segment_index_col": segment_indexes[columns],
+            "value": values[order],
+        }
+    )
+
+
+def minimum_threshold(
+    videos: list[Video], base_threshold: float = 0.17, reference_duration: int = 785
+) -> float:
+    """Similarity threshold of redundant segments, raised with the total duration of the videos"""
+    # Videos left without segments by the previous criteria add nothing to the set duration
+    set_time = sum(
+        video.get_segments()[-1].get_end() for video in videos if video.get_segments()
+    )
+    dif = (set_time - reference_duration) / reference_duration
+    return base_threshold + base_threshold * dif
+
+
+def find_redundancies(correlations: DataFrame) -> DataFrame:
+    """Most similar pairs of segments between each two videos, with their (video index, segment index) tuples"""
+    redundancies = correlations[
+        correlations.groupby(["video_index", "video_index_col"])["value"].transform(
+            max
+        )
+        == correlations["value"]
+    ]
+
+    # Setting video index and segment index as one tuple object
+    redundancies["video"] = tuple(
+        zip(redundancies["video_index"], redundancies["segment_index"])
+    )
+    redundancies["match"] = tuple(
+        zip(redundancies["video_index_col"], redundancies["segment_index_col"])
+    )
+    return redundancies
+
+
+def cluster_redundancies(redundancies: DataFrame) -> list[set[tuple[int, int]]]:
+    # Retrieving all matches from DataFrame and clustering where elements intersect
+    clusters, locations = [], {}  # hashtable of which cluster each element is in
+
+    for item_a, item_b in redundancies[["video", "match"]].values.tolist():
+        if item_a in locations:
+            clusters[locations.get(item_a)].add(item_b)
+        elif item_b in locations:
+            clusters[locations.get(item_b)].add(item_a)
+        else:
+            clusters.append({item_a, item_b})
+            locations[item_a] = len(clusters) - 1
+            locations[item_b] = len(clusters) - 1
+
+    return clusters
+
 
 class Redundancy(SelectionCriteria):
-    def __init__(self, summarizer: BaseSummarizer) -> None:
+    def __init__(
+        self,
+        summarizer: BaseSummarizer,
+        base_threshold: float = 0.17,
+        reference_duration: int = 785,
+        quality_dict_size: int = 300,
+        keyframe_ratios: tuple[float, float] = (0.6, 0.1),
+        engine: str = "reference",
+        quality_mode: str = "bovw",
+    ) -> None:
         self.__summarizer = summarizer
+        self.__base_threshold = base_threshold
+        self.__reference_duration = reference_duration
+        self.__quality_dict_size = quality_dict_size
+        self.__keyframe_ratios = keyframe_ratios
+        self.__engine = engine
+        self.__quality_mode = quality_mode
 
     def include(self) -> BaseSummarizer:
         log("Including redundant segments in summarized video")
@@ -31,6 +198,11 @@ class Redundancy(SelectionCriteria):
 
         # Applying Quality selection criteria to retrieve the 1 segment with best quality for each cluster
         quality = Quality(
+            dict_size=self.__quality_dict_size,
+            engine=self.__engine,
+            keyframe_ratios=self.__keyframe_ratios,
+            mode=self.__quality_mode,
+            # Sharing the keyframes and rankings of the clusters with runs of other parameters
             summarizer=BaseSummarizer(
                 videos=[
                     Video(
@@ -40,7 +212,12 @@ class Redundancy(SelectionCriteria):
                     for cluster in cluster_redundancies
                 ],
                 frames_path=self.__summarizer.get_frames_path(),
-            )
+                frame_features=self.__summarizer.get_frame_features(),
+                stage_cache=self.__summarizer.get_stage_cache(),
+                stage_key=self.__summarizer.get_input_key(),
+                # Ranking the clusters on the worker processes of the pipeline
+                executor=self.__summarizer.get_executor(),
+            ),
         )
 
         # Retrieving best segments as their corresponding (video index, segment index) tuple
@@ -50,18 +227,25 @@ class Redundancy(SelectionCriteria):
         ]
 
         # Ordering by chronology strategy and mapping (video index, segment index) tuple back to segment object
+        items_order = Chronology.order_by_similarity_cluster(
+            items_cluster={
+                item: cluster
+                for item, cluster in zip(best_segments, cluster_redundancies)
+            },
+            engine=self.__engine,
+        )
         segments_to_include = [
             self.__segment_from_indexes(seg_item[0], seg_item[1])
-            for seg_item in Chronology.order_by_similarity_cluster(
-                items_cluster={
-                    item: cluster
-                    for item, cluster in zip(best_segments, cluster_redundancies)
-                }
-            )
+            for seg_item in items_order
         ]
 
-        # Including segments in video summary
-        self.__summarizer.append_segments_to_summary(segments_to_include)
+        # Including segments in video summary, along with the cluster each one represents
+        cluster_ids = {item: i for i, item in enumerate(best_segments)}
+        self.__summarizer.append_segments_to_summary(
+            segments_to_include,
+            reason="best quality in redundancy cluster",
+            clusters=[cluster_ids.get(item) for item in items_order],
+        )
 
         return self.__summarizer
 
@@ -76,13 +260,37 @@ class Redundancy(SelectionCriteria):
 
         return self.__summarizer
 
+    def get_parameters(self) -> dict:
+        return {
+            "base_threshold": self.__base_threshold,
+            "reference_duration": self.__reference_duration,
+            "quality_dict_size": self.__quality_dict_size,
+            "keyframe_ratios": list(self.__keyframe_ratios),
+            "engine": self.__engine,
+            "quality_mode": self.__quality_mode,
+        }
+
     def __get_redundancy_clusters(self) -> list[set[tuple[int, int]]]:
-        bow_df = self.__generate_bow_df()
-        correlations = self.__calculate_bow_correlations(bow_df)
-        redundancies = self.__find_redundancies(correlations)
-        cluster_redundancies = self.__cluster_redundancies(redundancies)
+        # Each intermediate result is cached, so a failure in a later step resumes from it,
+        # along with the parameters it depends on so runs with other Quality parameters reuse it
+        threshold_parameters = (self.__engine, self.__base_threshold, self.__reference_duration)
+        bow_df = self.__summarizer.cached_artifact(
+            "redundancy-bow", self.__generate_bow_df, self.__engine, shared=True
+        )
+        redundancies = self.__summarizer.cached_artifact(
+            "redundancy-pairs",
+            lambda: find_redundancies(self.__calculate_bow_correlations(bow_df)),
+            *threshold_parameters,
+            shared=True,
+        )
+        clusters = self.__summarizer.cached_artifact(
+            "redundancy-clusters",
+            lambda: cluster_redundancies(redundancies),
+            *threshold_parameters,
+            shared=True,
+        )
 
-        return cluster_redundancies
+        return clusters
 
     def __segment_from_indexes(self, video_index: int, segment_index: int) -> Segment:
         return self.__summarizer.get_video_at(video_index).get_segment(segment_index)
@@ -96,82 +304,42 @@ class Redundancy(SelectionCriteria):
             }
         )
         bow.items_preprocessing()
-        return bow.generate_bow_dataframe(["video_index", "segment_index"])
-
-    def __calculate_bow_correlations(self, bow_df: DataFrame) -> DataFrame:
-        # Generating BoW correlations matrix
-        correlations = bow_df.T.corr(custom_cosine)
 
-        # Disregarding same-video comparisons
-        is_same_video = equal.outer(
-            correlations.index.get_level_values("video_index"),
-            correlations.columns.get_level_values("video_index"),
-        )
-        # Keeping only the upper diagonal of the pairwise comparisons
-        is_upper_diagonal = tril(correlations) > 0
-        # Keeping only similarities greater than treshold
-        is_gt_threshold = correlations.gt(self.__calc_minimum_threshold())
-
-        # Masking correlations matrix
-        correlations = (
-            correlations.mask(is_same_video | is_upper_diagonal | ~is_gt_threshold)
-            .dropna(axis="index", how="all")
-            .dropna(axis="columns", how="all")
-        )
-
-        # Finding text-pair matches
-        correlations = correlations.melt(ignore_index=False).dropna(
-            "index", subset=["value"]
-        )
-        correlations.columns = ["video_index_col", "segment_index_col", "value"]
-        correlations.reset_index(inplace=True)
-        return correlations
-
-    def __find_redundancies(self, correlations: DataFrame) -> DataFrame:
-        redundancies = correlations[
-            correlations.groupby(["video_index", "video_index_col"])["value"].transform(
-                max
-            )
-            == correlations["value"]
-        ]
+        # Falling back to a sparse DataFrame when the dense one does not fit in the memory budget
+        if not fits_memory("bow_dataframe", bow.estimate_dataframe_size()):
+            bow_df = bow.generate_sparse_bow_dataframe(["video_index", "segment_index"])
+        elif self.__engine == "fast":
+            bow_df = bow.generate_bow_dataframe_fast(["video_index", "segment_index"])
+        else:
+            bow_df = bow.generate_bow_dataframe(["video_index", "segment_index"])
+        track_memory("bow_dataframe", bow_df.memory_usage().sum())
+        return bow_df
 
-        # Setting video index and segment index as one tuple object
-        redundancies["video"] = tuple(
-            zip(redundancies["video_index"], redundancies["segment_index"])
-        )
-        redundancies["match"] = tuple(
-            zip(redundancies["video_index_col"], redundancies["segment_index_col"])
-        )
-        return redundancies
-
-    def __cluster_redundancies(
-        self, redundancies: DataFrame
-    ) -> list[set[tuple[int, int]]]:
-        # Retrieving all matches from DataFrame and clustering where elements intersect
-        all_matches = redundancies[["video", "match"]].values.tolist()
-        return self.__cluster_matches(all_matches)
-
-    def __cluster_matches(
-        self, matches: list[list[tuple[int, int]]]
-    ) -> list[set[tuple[int, int]]]:
-        clusters, locations = [], {}  # hashtable of which cluster each element is in
-
-        for item_a, item_b in matches:
-            if item_a in locations:
-                clusters[locations.get(item_a)].add(item_b)
-            elif item_b in locations:
-                clusters[locations.get(item_b)].add(item_a)
+    def __calculate_bow_correlations(self, bow_df: DataFrame) -> DataFrame:
+        n_segments = len(bow_df)
+        threshold = self.__calc_minimum_threshold()
+        with span("bow_correlations", "compute", segments=n_segments):
+            # The dense matrix and its masks are only built when they fit in the memory budget
+            if (
+                self.__engine == "reference"
+                and not is_sparse_dataframe(bow_df)
+                and fits_memory("bow_correlations", n_segments**2 * DENSE_CORRELATION_BYTES)
+            ):
+                track_memory("bow_correlations", n_segments**2 * 8)
+                correlations = bow_correlations(bow_df, threshold)
             else:
-                clusters.append({item_a, item_b})
-                locations[item_a] = len(clusters) - 1
-                locations[item_b] = len(clusters) - 1
-
-        return clusters
+                # All rows at once for the fast engine, unless only chunks of them fit in the budget
+                # Videos may be left without segments, with no rows to score at all
+                row_bytes = max(1, n_segments) * CHUNK_CORRELATION_BYTES
+                require_memory("bow_correlations chunk", row_bytes)
+                available = get_available_memory()
+                rows_per_chunk = max(1, available // row_bytes if available is not None else n_segments)
+                track_memory("bow_correlations", min(rows_per_chunk, n_segments) * n_segments * 8)
+                correlations = bow_correlations_chunked(bow_df, threshold, rows_per_chunk)
+        count("pairs.scored", n_segments * (n_segments - 1) // 2)
+        return correlations
 
     def __calc_minimum_threshold(self):
-        set_time = sum(
-            video.get_segments()[-1].get_end()
-            for video in self.__summarizer.get_videos()
+        return minimum_threshold(
+            self.__summarizer.get_videos(), self.__base_threshold, self.__reference_duration
         )
-        dif = (set_time - 785) / 785
-        return 0.17 + 0.17 * dif
@@ -1,15 +1,12 @@
 from __future__ import annotations
 
+from os.path import join
+from numpy import ndarray, searchsorted
+
 from processing.utils import log
 from components.video import Video
-from components.segment import Segment
-from processing.image import FaceDetector
-from processing.text import SubjectivityGoogleAPI
-from processing.models import (
-    FACE_CLASSIFIER,
-    SENTIMENT_API_RESULTS,
-    SENTILEX_DATA_PT,
-)
+from components.frame import FrameSequence
+from processing.models import load_face_detector, load_subjectivity_classifier
 
 from modules.modules_base import SelectionCriteria
 
@@ -19,10 +16,47 @@ if TYPE_CHECKING:
     from summarizers.base_summarizer import BaseSummarizer
 
 
+def find_subjective_segments(
+    segments: list[tuple[int, int, str]],
+    frames_dir: str,
+    seconds: ndarray = None,
+    faces: ndarray = None,
+) -> list[bool]:
+    """
+    Classifies each (begin, end, content) segment of a video as subjective or not.
+    Only segments showing a face are classified by their text, face presence is taken
+    from the precomputed per-frame `faces` when given.
+    """
+    frames, face_classifier = None, None
+
+    def segment_contains_faces(begin: int, end: int) -> bool:
+        nonlocal frames, face_classifier
+        if faces is not None:
+            first, last = searchsorted(seconds, [begin, end], side="left")
+            return bool(faces[first:last].any())
+
+        if frames is None:
+            frames = FrameSequence(frames_dir)
+            face_classifier = load_face_detector()
+        for frame in frames.between(begin, end):
+            if face_classifier.frame_contains_face(frame):
+                return True
+        return False
+
+    subjective = []
+    for begin, end, content in segments:
+        if not segment_contains_faces(begin, end):
+            subjective.append(False)
+            continue
+
+        subjective.append(load_subjectivity_classifier().is_subjective(content))
+
+    return subjective
+
+
 class Subjectivity(SelectionCriteria):
     def __init__(self, summarizer: BaseSummarizer) -> None:
         self.__summarizer = summarizer
-        self.__face_classifier = FaceDetector(FACE_CLASSIFIER)
 
     def include(self) -> BaseSummarizer:
         log("Filtering only subjective segments for summarized video")
@@ -35,34 +69,39 @@ class Subjectivity(SelectionCriteria):
         return self.__summarizer
 
     def __clear_videos_segments(self, remove_subjective: bool) -> None:
-        for video in self.__summarizer.get_videos():
-            self.__remove_segments(video, remove_subjective)
+        videos = self.__summarizer.get_videos()
+        videos_subjective = self.__summarizer.run_video_tasks(
+            find_subjective_segments,
+            [self.__subjectivity_task(video) for video in videos],
+        )
+        for video, subjective in zip(videos, videos_subjective):
+            self.__remove_segments(video, subjective, remove_subjective)
 
-    def __remove_segments(self, video: Video, remove_subjective: bool) -> None:
-        video_segments, segs_delete = video.get_segments(), []
+    def __subjectivity_task(self, video: Video) -> tuple:
+        segments = [
+            (segment.get_begin(), segment.get_end(), segment.get_content())
+            for segment in video.get_segments()
+        ]
+        frames_dir = join(self.__summarizer.get_frames_path(), video.get_name())
+        features = self.__summarizer.get_frame_features()
+        if features is not None and features.has(video.get_name(), "faces"):
+            return (
+                segments,
+                frames_dir,
+                features.get_seconds(video.get_name()),
+                features.get(video.get_name(), "faces"),
+            )
+        return (segments, frames_dir)
 
+    def __remove_segments(
+        self, video: Video, subjective: list[bool], remove_subjective: bool
+    ) -> None:
         segments_to_delete = [
             i
-            for i, segment in enumerate(video_segments)
-            if self.__is_segment_subjective(segment) == remove_subjective
+            for i, is_subjective in enumerate(subjective)
+            if is_subjective == remove_subjective
         ]
 
         # Deleting objective/subjective segments from last to first
         for i in sorted(segments_to_delete, reverse=True):
             video.delete_segment_at(i)
-
-    def __is_segment_subjective(self, segment: Segment) -> bool:
-        if not self.__segment_contains_faces(segment):
-            return False
-        text_subj_classifier = SubjectivityGoogleAPI(
-            sentilex_path=SENTILEX_DATA_PT,
-            sentiment_data_path=SENTIMENT_API_RESULTS,
-        )
-
-        return text_subj_classifier.is_subjective(segment.get_content())
-
-    def __segment_contains_faces(self, segment: Segment) -> bool:
-        for frame in segment.load_frames(self.__summarizer.get_frames_path()):
-            if self.__face_classifier.frame_contains_face(frame):
-                return True
-        return False
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import pickle
+from hashlib import sha256
+from typing import Any, Callable
+from tempfile import mkstemp
+from os import fdopen, makedirs, remove, replace, stat
+from os.path import exists, join
+
+from processing.utils import log
+from processing.tracing import count, span
+
+# Bumped whenever the layout of the cached artifacts changes
+CACHE_VERSION = 1
+
+
+def fingerprint(*parts: Any) -> str:
+    """Content hash of JSON serializable parts, sets and tuples included"""
+    payload = json.dumps(
+        [CACHE_VERSION, *parts],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=lambda obj: sorted(obj) if isinstance(obj, (set, frozenset)) else str(obj),
+    )
+    return sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path: str) -> list:
+    """Cheap identity of a file contents: its path, size and modification time"""
+    if not exists(path):
+        return [path, None, None]
+    info = stat(path)
+    return [path, info.st_size, info.st_mtime_ns]
+
+
+class StageCache:
+    """
+    Content-addressed store of pipeline artifacts.
+    Artifacts are keyed by a hash of everything they were computed from, so the key of a
+    stage chains the key of the previous one and a changed input invalidates every later stage.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self.__cache_dir = cache_dir
+        self.__hits = 0
+        self.__misses = 0
+
+    def get_cache_dir(self) -> str:
+        return self.__cache_dir
+
+    def get_stats(self) -> tuple[int, int]:
+        return self.__hits, self.__misses
+
+    def __artifact_path(self, stage: str, key: str) -> str:
+        return join(self.__cache_dir, stage, f"{key}.pkl")
+
+    def contains(self, stage: str, key: str) -> bool:
+        return exists(self.__artifact_path(stage, key))
+
+    def load(self, stage: str, key: str) -> Any:
+        with span("cache.load", "io", stage=stage), open(self.__artifact_path(stage, key), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, stage: str, key: str, artifact: Any) -> None:
+        stage_dir = join(self.__cache_dir, stage)
+        makedirs(stage_dir, exist_ok=True)
+
+        # Writing atomically, an interrupted run must never leave a truncated artifact. Each writer has its own
+        # temporary file, as processes sharing the cache may save the same artifact at once, the last one wins
+        fd, tmp_path = mkstemp(prefix=f"{key}.", suffix=".pkl.tmp", dir=stage_dir)
+        try:
+            with span("cache.save", "io", stage=stage), fdopen(fd, "wb") as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            replace(tmp_path, self.__artifact_path(stage, key))
+        except BaseException:
+            if exists(tmp_path):
+                remove(tmp_path)
+            raise
+
+    def cached(self, stage: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Loads the stage artifact for the key, computing and saving it when missing"""
+        if self.contains(stage, key):
+            try:
+                artifact = self.load(stage, key)
+            except (OSError, EOFError, pickle.UnpicklingError) as e:
+                log(f"Ignoring unreadable '{stage}' cache entry: {e}", log_type="WARNING")
+            else:
+                self.__hits += 1
+                count("cache.hits")
+                log(f"Reusing cached '{stage}' ({key[:12]})")
+                return artifact
+
+        self.__misses += 1
+        count("cache.misses")
+        artifact = compute()
+        self.save(stage, key, artifact)
+        return artifact
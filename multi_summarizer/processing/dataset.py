@@ -1,10 +1,11 @@
-import json
-from os.path import join, exists
-from dataclasses import dataclass
-from os import system, listdir, makedirs
+from os.path import join
+from dataclasses import dataclass, field
 
-from components.video import Video, Segment
-from processing.utils import get_seconds_from_time
+from components.video import Video
+from processing.frame_cache import FrameCache
+from components.segment_table import SegmentTable
+from components.frame import ExtractionSettings
+from processing.transcript import TranscriptLine, load_transcripts
 
 
 @dataclass
@@ -12,6 +13,7 @@ class Dataset:
     name: str
     path: str
     videos: list[str]
+    extraction: ExtractionSettings = field(default_factory=ExtractionSettings)
 
 
 @dataclass
@@ -29,23 +31,40 @@ class DatasetLoader:
         self.__video_format = video_format
         self.__content_format = content_format
         self.__videos = self.__load_dataset_videos()
+        self.__segment_table = SegmentTable()
 
-    def load_videos(self) -> Video:
-        return [self.__load_video(video) for video in self.__videos]
+    def get_segment_table(self) -> SegmentTable:
+        return self.__segment_table
 
-    def __load_video(self, video: DatasetVideo) -> list[Segment]:
+    def get_videos(self) -> list[DatasetVideo]:
+        return self.__videos
+
+    def load_videos(self, max_workers: int = 8) -> Video:
+        """Reads all the dataset transcripts concurrently and loads them as videos"""
+        self.__segment_table = SegmentTable()
+        transcripts = load_transcripts(
+            [video.content_file for video in self.__videos], max_workers=max_workers
+        )
+        return [
+            self.__load_video(video_id, video, transcript)
+            for video_id, (video, transcript) in enumerate(
+                zip(self.__videos, transcripts)
+            )
+        ]
+
+    def __load_video(
+        self, video_id: int, video: DatasetVideo, transcript: list[TranscriptLine]
+    ) -> Video:
         """Loads video object and all of its segments from given video in dataset"""
+        for begin, end, content in transcript:
+            self.__segment_table.append(
+                begin=begin, end=end, content=content, video_id=video_id
+            )
+
         return Video(
             name=video.name,
             path=video.video_file,
-            segments=[
-                Segment(
-                    begin=get_seconds_from_time(obj.get("begin")),
-                    end=get_seconds_from_time(obj.get("end")),
-                    content=obj.get("content"),
-                )
-                for obj in json.load(open(video.content_file))
-            ],
+            segments=self.__segment_table.segments(video_id),
         )
 
     def __get_video_filename(self, video_name: str, file_ext: str) -> str:
@@ -61,25 +80,22 @@ class DatasetLoader:
             for video in self.__dataset.videos
         ]
 
-    def save_video_frames(self) -> str:
+    def save_video_frames(self, frame_cache: FrameCache = None) -> str:
         """
-        Runs ffmpeg to save 1 frame per second for every video in the dataset.
-        If video directory exists and is not empty, does nothing.
+        Runs ffmpeg to save the frames of every video in the dataset with the dataset extraction settings.
+        Complete extractions of the same video file with the same settings are reused from the frame cache,
+        which then evicts the least recently used frames of other videos if it is over its budget.
         """
-        dataset_frames = join("video_frames", self.__dataset.name)
-
-        for video in self.__videos:
-            frames_dir = join(dataset_frames, video.name)
-
-            # Checking whether rames have been extracted before
-            if exists(frames_dir) and listdir(frames_dir):
-                continue
+        frame_cache = frame_cache if frame_cache is not None else FrameCache()
+        frames_dirs = [
+            frame_cache.get_frames_dir(self.__dataset.name, video.name)
+            for video in self.__videos
+        ]
 
-            if not exists(frames_dir):
-                makedirs(frames_dir)
+        for video, frames_dir in zip(self.__videos, frames_dirs):
+            frame_cache.ensure(frames_dir, video.video_file, self.__dataset.extraction)
 
-            frames_path = join(frames_dir, "image-%d.jpg")
-            ffmpeg_cmd = f"ffmpeg -i '{video.video_file}' -hide_banner -loglevel error -vf fps=1 -start_number 0 '{frames_path}'"
-            system(ffmpeg_cmd)
+        if frame_cache.get_budget() is not None:
+            frame_cache.prune(protect=frames_dirs)
 
-        return dataset_frames
+        return join(frame_cache.get_root(), self.__dataset.name)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from functools import partial
+from os.path import join
+from typing import TYPE_CHECKING, Any, Callable
+
+from processing.utils import log
+from processing.job_queue import FileJobQueue
+
+if TYPE_CHECKING:
+    from processing.dataset import Dataset, DatasetLoader
+    from processing.executor import TaskExecutor
+    from processing.frame_cache import FrameCache
+
+# Kind of the jobs extracting and analyzing the frames of a video
+FRAME_FEATURES_JOB = "frame-features"
+
+
+def extract_video_features(payload: dict, executor: TaskExecutor = None) -> dict:
+    """
+    Worker side of a frame features job: extracts the frames of one video into the frame cache
+    and stores the features of every frame in the stage cache, where the coordinator finds them.
+    """
+    from components.video import Video
+    from processing.cache import StageCache
+    from processing.frame_cache import FrameCache
+    from components.frame import ExtractionSettings
+    from processing.frame_stream import FrameStream, default_analyzers
+
+    frame_cache = FrameCache(payload["frames_root"])
+    frames_dir = frame_cache.get_frames_dir(payload["dataset"], payload["video"])
+    manifest = frame_cache.ensure(
+        frames_dir, payload["video_file"], ExtractionSettings.from_dict(payload["settings"])
+    )
+
+    quality_mode = payload.get("quality_mode", "bovw")
+    analyzers = [a for a in default_analyzers(quality_mode) if a.name in payload["analyzers"]]
+    video = Video(name=payload["video"], path=payload["video_file"], segments=[])
+    FrameStream(analyzers, executor=executor).process(
+        [video],
+        join(payload["frames_root"], payload["dataset"]),
+        cache=StageCache(payload["cache_dir"]),
+    )
+    log(f"Cached frame features of {payload['video_file']}")
+    return {"frames": manifest.frame_count}
+
+
+def get_job_handlers(executor: TaskExecutor = None) -> dict[str, Callable[[dict], Any]]:
+    return {FRAME_FEATURES_JOB: partial(extract_video_features, executor=executor)}
+
+
+def distribute_video_features(
+    dataset: Dataset,
+    loader: DatasetLoader,
+    queue: FileJobQueue,
+    frame_cache: FrameCache,
+    cache_dir: str,
+    quality_mode: str = "bovw",
+) -> None:
+    """
+    Coordinator side: queues a frame features job for every video of the dataset whose features
+    are not cached yet and waits for the workers to run them. The frames and features they leave in
+    the shared frame and stage caches are then reused by the rest of the pipeline.
+    """
+    from components.video import Video
+    from processing.cache import StageCache
+    from processing.frame_stream import FrameStream, default_analyzers
+
+    analyzers = default_analyzers(quality_mode)
+    stream, stage_cache = FrameStream(analyzers), StageCache(cache_dir)
+    frames_path = join(frame_cache.get_root(), dataset.name)
+
+    job_ids = []
+    for dataset_video in loader.get_videos():
+        frames_dir = frame_cache.get_frames_dir(dataset.name, dataset_video.name)
+        if frame_cache.is_valid(frames_dir, dataset_video.video_file, dataset.extraction):
+            video = Video(name=dataset_video.name, path=dataset_video.video_file, segments=[])
+            if stage_cache.contains("frame-features", stream.get_cache_key(video, frames_path)):
+                continue
+
+        job_ids.append(
+            queue.put(
+                FRAME_FEATURES_JOB,
+                {
+                    "dataset": dataset.name,
+                    "video": dataset_video.name,
+                    "video_file": dataset_video.video_file,
+                    "frames_root": frame_cache.get_root(),
+                    "settings": dataset.extraction.to_dict(),
+                    "analyzers": [analyzer.name for analyzer in analyzers],
+                    "quality_mode": quality_mode,
+                    "cache_dir": cache_dir,
+                },
+            )
+        )
+
+    if not job_ids:
+        return
+    log(f"Queued {len(job_ids)} frame features jobs in {queue.get_root()}")
+
+    states = queue.wait(job_ids)
+    failed = [job_id for job_id, state in states.items() if state == "failed"]
+    if failed:
+        errors = [queue.load("failed", job_id)["error"] for job_id in failed]
+        raise Exception(f"{len(failed)} frame features jobs failed: {'; '.join(errors)}")
+    log(f"Workers finished {len(job_ids)} frame features jobs")
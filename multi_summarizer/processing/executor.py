@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from processing.tracing import get_tracer, run_traced
+from processing.scheduler import ResourceScheduler, run_with_thread_limit
+
+
+class TaskExecutor:
+    """
+    Process pool shared by the summarization stages to run independent per-video tasks.
+    Results are always returned in task order, so stages merge them exactly as a sequential loop would.
+    Worker slots and the threads of each worker are taken from the scheduler CPU budget.
+    Tasks run inline when there is a single worker slot or a single task.
+    While tracing, the spans and counters recorded by the workers are merged into the tracer.
+    """
+
+    def __init__(self, scheduler: ResourceScheduler = None) -> None:
+        self.__scheduler = scheduler if scheduler is not None else ResourceScheduler()
+        self.__pool = None
+
+    def get_scheduler(self) -> ResourceScheduler:
+        return self.__scheduler
+
+    def map(self, function: Callable[..., Any], tasks: list[tuple]) -> list[Any]:
+        """Calls `function` with the arguments of each task, the function and arguments must be picklable"""
+        workers, threads = self.__scheduler.split(len(tasks))
+        if workers < 2:
+            return [function(*args) for args in tasks]
+
+        tracer = get_tracer()
+        if tracer is not None:
+            function = partial(run_traced, tracer.get_path(), function)
+
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(max_workers=self.__scheduler.get_cpus())
+        results = list(
+            self.__pool.map(
+                run_with_thread_limit,
+                [threads] * len(tasks),
+                [function] * len(tasks),
+                *zip(*tasks),
+            )
+        )
+        if tracer is None:
+            return results
+
+        for _, trace in results:
+            tracer.merge(*trace)
+        return [result for result, _ in results]
+
+    def close(self) -> None:
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def __enter__(self) -> TaskExecutor:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import subprocess
+from os import getenv
+from re import search, findall
+from shutil import which
+from functools import lru_cache
+from dataclasses import dataclass, field
+
+from processing.tracing import span
+
+
+@lru_cache(maxsize=1)
+def get_ffmpeg_binary() -> str:
+    """
+    Gets the ffmpeg executable: `FFMPEG_BINARY` environment variable, ffmpeg in PATH
+    or the binary shipped with imageio-ffmpeg (installed along with moviepy)
+    """
+    binary = getenv("FFMPEG_BINARY") or which("ffmpeg")
+    if binary:
+        return binary
+
+    from imageio_ffmpeg import get_ffmpeg_exe
+
+    return get_ffmpeg_exe()
+
+
+def run_ffmpeg(args: list[str]) -> str:
+    """Runs ffmpeg with the given arguments and returns its stderr output"""
+    with span("ffmpeg", "io"):
+        process = subprocess.run(
+            [get_ffmpeg_binary(), "-hide_banner", "-nostdin", "-y", *args],
+            capture_output=True,
+            text=True,
+        )
+    if process.returncode != 0:
+        raise Exception(f"ffmpeg failed: {process.stderr.strip()[-2000:]}")
+    return process.stderr
+
+
+@dataclass
+class VideoStreamInfo:
+    path: str
+    video_codec: str
+    pixel_format: str
+    width: int
+    height: int
+    fps: float
+    audio_codec: str = None
+    sample_rate: int = None
+    channels: int = None
+    keyframes: list[float] = field(default_factory=list)
+
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+    def get_format(self) -> tuple:
+        """Stream parameters that must match for segments to be joined without re-encoding"""
+        return (
+            self.video_codec,
+            self.pixel_format,
+            self.width,
+            self.height,
+            self.fps,
+            self.audio_codec,
+            self.sample_rate,
+            self.channels,
+        )
+
+
+def probe_keyframes(path: str) -> list[float]:
+    """Lists the keyframe timestamps of the first video stream, decoding only the keyframes"""
+    output = run_ffmpeg(
+        ["-skip_frame", "nokey", "-i", path, "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"]
+    )
+    return [float(pts) for pts in findall(r"pts_time:\s*(-?[\d.]+)", output)]
+
+
+@lru_cache(maxsize=256)
+def probe_video(path: str) -> VideoStreamInfo:
+    """Reads the stream parameters and keyframe timestamps of a video file"""
+    process = subprocess.run(
+        [get_ffmpeg_binary(), "-hide_banner", "-nostdin", "-i", path],
+        capture_output=True,
+        text=True,
+    )
+    video = search(r"Stream #.*?Video: (\w+).*?, (\w+)(?:\(.*?\))?, (\d+)x(\d+)", process.stderr)
+    if video is None:
+        raise Exception(f"No video stream found in '{path}'")
+
+    fps = search(r"Stream #.*?Video: .*?([\d.]+) (?:fps|tbr)", process.stderr)
+    audio = search(r"Stream #.*?Audio: (\w+).*?, (\d+) Hz, ([\w.]+)", process.stderr)
+    channels = {"mono": 1, "stereo": 2, "5.1": 6}.get(audio.group(3), 2) if audio else None
+
+    return VideoStreamInfo(
+        path=path,
+        video_codec=video.group(1),
+        pixel_format=video.group(2),
+        width=int(video.group(3)),
+        height=int(video.group(4)),
+        fps=float(fps.group(1)) if fps else 30.0,
+        audio_codec=audio.group(1) if audio else None,
+        sample_rate=int(audio.group(2)) if audio else None,
+        channels=channels,
+        keyframes=probe_keyframes(path),
+    )
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import json
+from time import time
+from re import fullmatch
+from hashlib import sha256
+from shutil import rmtree
+from dataclasses import dataclass, field
+from os import listdir, makedirs, replace, stat
+from os.path import exists, getsize, isdir, join
+
+from processing.utils import log
+from processing.ffmpeg import run_ffmpeg
+from components.frame import FRAME_FILE_PATTERN, FRAME_MANIFEST_FILE, ExtractionSettings
+
+# Bytes read from the start and the end of a video for its sampled content hash
+HASH_SAMPLE_SIZE = 1024 * 1024
+
+
+def sample_hash(path: str) -> str:
+    """Hash of the size, first and last megabyte of a file, enough to tell videos apart without reading them"""
+    digest = sha256(str(getsize(path)).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(HASH_SAMPLE_SIZE))
+        f.seek(max(getsize(path) - HASH_SAMPLE_SIZE, 0))
+        digest.update(f.read(HASH_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def count_frames(frames_dir: str) -> tuple[int, int]:
+    """Counts the frame images in a directory and their total size in bytes"""
+    count, size = 0, 0
+    for filename in listdir(frames_dir):
+        if fullmatch(FRAME_FILE_PATTERN, filename):
+            count += 1
+            size += getsize(join(frames_dir, filename))
+    return count, size
+
+
+@dataclass
+class FrameManifest:
+    """Extraction record of the frames of a video, written only once all the frames are extracted"""
+
+    settings: ExtractionSettings
+    source: str
+    source_size: int
+    source_mtime: int
+    source_hash: str
+    frame_count: int
+    size: int
+    created: float = field(default_factory=time)
+    last_used: float = field(default_factory=time)
+
+    def to_dict(self) -> dict:
+        return {
+            "settings": self.settings.to_dict(),
+            "source": {
+                "path": self.source,
+                "size": self.source_size,
+                "mtime": self.source_mtime,
+                "hash": self.source_hash,
+            },
+            "frame_count": self.frame_count,
+            "size": self.size,
+            "created": self.created,
+            "last_used": self.last_used,
+        }
+
+    def save(self, frames_dir: str) -> None:
+        # Replacing the manifest atomically, a partial manifest would look like a valid one
+        path = join(frames_dir, FRAME_MANIFEST_FILE)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def load(frames_dir: str) -> FrameManifest | None:
+        try:
+            with open(join(frames_dir, FRAME_MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+            source = manifest["source"]
+            return FrameManifest(
+                settings=ExtractionSettings.from_dict(manifest["settings"]),
+                source=source["path"],
+                source_size=source["size"],
+                source_mtime=source["mtime"],
+                source_hash=source["hash"],
+                frame_count=manifest["frame_count"],
+                size=manifest["size"],
+                created=manifest.get("created", 0.0),
+                last_used=manifest.get("last_used", 0.0),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+@dataclass
+class FrameCacheEntry:
+    dataset: str
+    video: str
+    path: str
+    manifest: FrameManifest = None
+    size: int = 0
+
+    def is_complete(self) -> bool:
+        return self.manifest is not None and count_frames(self.path) == (
+            self.manifest.frame_count,
+            self.manifest.size,
+        )
+
+
+class FrameCache:
+    """
+    Extracted frames under `root/<dataset>/<video>`, each video directory with a manifest.
+    Frames are reused only while their manifest matches the source video and the extraction settings
+    and all the frames it lists are there. When a `budget` in bytes is given, the least recently used
+    videos are evicted to keep the cache under it.
+    """
+
+    def __init__(self, root: str = "video_frames", budget: int = None) -> None:
+        self.__root = root
+        self.__budget = budget
+
+    def get_root(self) -> str:
+        return self.__root
+
+    def get_budget(self) -> int:
+        return self.__budget
+
+    def get_frames_dir(self, dataset: str, video: str) -> str:
+        return join(self.__root, dataset, video)
+
+    def is_valid(self, frames_dir: str, video_file: str, settings: ExtractionSettings) -> bool:
+        manifest = FrameManifest.load(frames_dir)
+        if manifest is None or manifest.settings != settings:
+            return False
+
+        # Checking the source video by size and modification time, then by content if it was touched
+        info = stat(video_file)
+        if (manifest.source_size, manifest.source_mtime) != (info.st_size, info.st_mtime_ns):
+            if manifest.source_size != info.st_size or manifest.source_hash != sample_hash(video_file):
+                return False
+            manifest.source_mtime = info.st_mtime_ns
+            manifest.save(frames_dir)
+
+        return count_frames(frames_dir) == (manifest.frame_count, manifest.size)
+
+    def ensure(self, frames_dir: str, video_file: str, settings: ExtractionSettings) -> FrameManifest:
+        """Extracts the video frames unless a complete extraction with the same settings is cached"""
+        if self.is_valid(frames_dir, video_file, settings):
+            manifest = FrameManifest.load(frames_dir)
+            manifest.last_used = time()
+            manifest.save(frames_dir)
+            return manifest
+
+        return self.extract(frames_dir, video_file, settings)
+
+    def extract(self, frames_dir: str, video_file: str, settings: ExtractionSettings) -> FrameManifest:
+        if exists(frames_dir):
+            rmtree(frames_dir)
+        makedirs(frames_dir)
+
+        run_ffmpeg(
+            ["-loglevel", "error", "-i", video_file]
+            + ["-vf", settings.to_filter(), "-start_number", "0"]
+            + [join(frames_dir, "image-%d.jpg")]
+        )
+
+        frame_count, size = count_frames(frames_dir)
+        info = stat(video_file)
+        manifest = FrameManifest(
+            settings=settings,
+            source=video_file,
+            source_size=info.st_size,
+            source_mtime=info.st_mtime_ns,
+            source_hash=sample_hash(video_file),
+            frame_count=frame_count,
+            size=size,
+        )
+        manifest.save(frames_dir)
+        log(f"Extracted {frame_count} frames of {video_file} ({size / 2**20:.1f} MiB)")
+        return manifest
+
+    def get_entries(self) -> list[FrameCacheEntry]:
+        """Lists the cached videos, from the least to the most recently used"""
+        entries = []
+        for dataset in sorted(listdir(self.__root)) if isdir(self.__root) else []:
+            dataset_dir = join(self.__root, dataset)
+            if not isdir(dataset_dir):
+                continue
+            for video in sorted(listdir(dataset_dir)):
+                path = join(dataset_dir, video)
+                if not isdir(path):
+                    continue
+                manifest = FrameManifest.load(path)
+                size = sum(getsize(join(path, filename)) for filename in listdir(path))
+                entries.append(FrameCacheEntry(dataset, video, path, manifest, size))
+
+        # Directories without a manifest are unfinished extractions, evicted first
+        return sorted(
+            entries,
+            key=lambda entry: entry.manifest.last_used if entry.manifest else float("-inf"),
+        )
+
+    def get_usage(self) -> int:
+        return sum(entry.size for entry in self.get_entries())
+
+    def prune(
+        self,
+        budget: int = None,
+        protect: list[str] = (),
+        incomplete: bool = False,
+        dataset: str = None,
+    ) -> list[FrameCacheEntry]:
+        """
+        Evicts the least recently used videos until the cache fits the budget, never the `protect` directories.
+        `incomplete` evicts every unfinished extraction and `dataset` every video of that dataset.
+        """
+        budget = budget if budget is not None else self.__budget
+        protected = {join(path, "") for path in protect}
+        entries = self.get_entries()
+        usage = sum(entry.size for entry in entries)
+
+        evicted = []
+        for entry in entries:
+            if join(entry.path, "") in protected:
+                continue
+            over_budget = budget is not None and usage > budget
+            if (
+                over_budget
+                or (incomplete and not entry.is_complete())
+                or (dataset is not None and entry.dataset == dataset)
+            ):
+                rmtree(entry.path)
+                usage -= entry.size
+                evicted.append(entry)
+
+        if evicted:
+            log(
+                f"Evicted frames of {len(evicted)} videos from {self.__root} "
+                f"({sum(entry.size for entry in evicted) / 2**20:.1f} MiB)"
+            )
+        return evicted
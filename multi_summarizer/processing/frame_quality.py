@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from numpy import (
+    abs as np_abs,
+    array,
+    asarray,
+    float32,
+    log1p,
+    median,
+    ndarray,
+    searchsorted,
+    stack,
+    zeros,
+)
+
+# Columns of the per-frame quality measures
+FRAME_QUALITY_COLUMNS = ("sharpness", "exposure", "motion")
+
+# Side of the pixel blocks averaged into the thumbnails motion is measured on
+THUMBNAIL_BLOCK = 8
+
+
+def laplacian_variance(frames: ndarray) -> ndarray:
+    """Variance of the 4-neighbours Laplacian of each grayscale frame of a (frames, height, width) batch"""
+    frames = asarray(frames, dtype=float32)
+    laplacian = (
+        frames[:, :-2, 1:-1]
+        + frames[:, 2:, 1:-1]
+        + frames[:, 1:-1, :-2]
+        + frames[:, 1:-1, 2:]
+        - 4 * frames[:, 1:-1, 1:-1]
+    )
+    return laplacian.reshape(len(frames), -1).var(axis=1)
+
+
+def exposure(frames: ndarray, clip_margin: int = 5) -> ndarray:
+    """
+    How well exposed each grayscale frame is, from 0 to 1: how close its mean brightness is to mid-gray,
+    lowered by the share of pixels clipped within `clip_margin` levels of black or white
+    """
+    pixels = asarray(frames).reshape(len(frames), -1)
+    brightness = 1 - np_abs(pixels.mean(axis=1, dtype=float32) - 127.5) / 127.5
+    clipped = ((pixels <= clip_margin) | (pixels >= 255 - clip_margin)).mean(axis=1)
+    return brightness * (1 - clipped)
+
+
+def motion(frames: ndarray) -> ndarray:
+    """Mean absolute difference of each grayscale frame with the previous one, from 0 to 1, 0 for the first"""
+    frames = asarray(frames, dtype=float32).reshape(len(frames), -1)
+    differences = zeros(len(frames), dtype=float32)
+    differences[1:] = np_abs(frames[1:] - frames[:-1]).mean(axis=1) / 255
+    return differences
+
+
+def thumbnails(frames: ndarray, block: int = THUMBNAIL_BLOCK) -> ndarray:
+    """Grayscale frames of a batch shrunk by averaging blocks of `block` by `block` pixels"""
+    frames = asarray(frames, dtype=float32)
+    n, height, width = frames.shape[0], frames.shape[1] // block, frames.shape[2] // block
+    if not height or not width:
+        return frames
+    blocks = frames[:, : height * block, : width * block].reshape(n, height, block, width, block)
+    return blocks.mean(axis=(2, 4))
+
+
+def frame_quality(frames: ndarray) -> ndarray:
+    """
+    Sharpness, exposure and motion of each frame of a batch, as the `FRAME_QUALITY_COLUMNS` columns.
+    Motion is measured on thumbnails, so it can be computed from `frame_measures` kept while streaming.
+    """
+    if not len(frames):
+        return zeros((0, len(FRAME_QUALITY_COLUMNS)), dtype=float32)
+    return stack([laplacian_variance(frames), exposure(frames), motion(thumbnails(frames))], axis=1)
+
+
+def frame_measures(frame: ndarray) -> tuple[float, float, ndarray]:
+    """Sharpness and exposure of a grayscale frame, with the thumbnail its motion is measured on"""
+    frames = asarray(frame)[None]
+    return float(laplacian_variance(frames)[0]), float(exposure(frames)[0]), thumbnails(frames)[0]
+
+
+def stack_frame_measures(measures: list[tuple[float, float, ndarray]]) -> ndarray:
+    """Same array as `frame_quality` from the `frame_measures` of consecutive frames"""
+    if not measures:
+        return zeros((0, len(FRAME_QUALITY_COLUMNS)), dtype=float32)
+    sharpness, exposure_, frames = zip(*measures)
+    return stack(
+        [asarray(sharpness, dtype=float32), asarray(exposure_, dtype=float32), motion(stack(frames))], axis=1
+    )
+
+
+def segments_quality_scores(
+    seconds: ndarray, qualities: ndarray, spans: list[tuple[float, float]]
+) -> list[float]:
+    """
+    Scores of the (begin, end) seconds segments of a video, from the `frame_quality` of its frames at
+    `seconds`. The first frame of each segment is not compared with the frame before it.
+    """
+    scores = []
+    for first, last in searchsorted(seconds, spans, side="left"):
+        segment_qualities = array(qualities[first:last], dtype=float32)
+        if len(segment_qualities):
+            segment_qualities[0, 2] = 0
+        scores.append(segment_quality_score(segment_qualities))
+    return scores
+
+
+def segment_quality_score(qualities: ndarray) -> float:
+    """
+    Score of a segment from the quality of its frames: the log of their median sharpness, weighted by their
+    mean exposure and by how steady they are, so sharp, well exposed and stable shots rank first
+    """
+    if not len(qualities):
+        return 0.0
+    sharpness, exposure_, motion_ = qualities[:, 0], qualities[:, 1], qualities[:, 2]
+    return float(log1p(median(sharpness)) * exposure_.mean() * (1 - motion_.mean()))
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+from math import ceil
+from queue import Queue
+from threading import Thread
+from typing import Any
+from abc import ABC, abstractmethod
+from numpy import ndarray, array, stack, searchsorted
+
+from processing.utils import log
+from components.video import Video
+from components.frame import FrameSequence
+from processing.tracing import adopt_path, count, get_path, span
+from processing.executor import TaskExecutor
+from processing.cache import StageCache, file_fingerprint, fingerprint
+from processing.shared_memory import (
+    SharedArray,
+    SharedArrayList,
+    SharedBufferPool,
+    attach,
+    share_arrays,
+    take_arrays,
+)
+from processing.image import ImageProcessing
+from processing.frame_quality import frame_measures, stack_frame_measures
+from processing.models import FACE_CLASSIFIER, load_face_detector
+
+# Marks the end of the frames handed to the analyzer threads
+_END = object()
+
+
+class FrameAnalyzer(ABC):
+    """Per-frame analysis fed by `FrameStream`, results are stored under the analyzer name"""
+
+    name: str = ""
+    # Whether results are arrays returned from worker processes through shared memory
+    shared_output: bool = False
+
+    @abstractmethod
+    def analyze(self, image: ndarray) -> Any:
+        pass
+
+    def collect(self, results: list[Any]) -> Any:
+        """Converts the results of all frames in a video to the stored feature"""
+        return results
+
+
+class HistogramAnalyzer(FrameAnalyzer):
+    name = "histogram"
+
+    def analyze(self, image: ndarray) -> ndarray:
+        return ImageProcessing.get_image_histogram(image).ravel()
+
+    def collect(self, results: list[ndarray]) -> ndarray:
+        return stack(results) if results else array([])
+
+
+class FacePresenceAnalyzer(FrameAnalyzer):
+    name = "faces"
+
+    def __init__(self, classifier_path: str) -> None:
+        self.__classifier_path = classifier_path
+        self.__face_detector = load_face_detector(classifier_path)
+
+    def __reduce__(self) -> tuple:
+        # OpenCV classifiers can't be pickled, worker processes load their own
+        return (FacePresenceAnalyzer, (self.__classifier_path,))
+
+    def analyze(self, image: ndarray) -> bool:
+        return self.__face_detector.image_contains_face(image)
+
+    def collect(self, results: list[bool]) -> ndarray:
+        return array(results, dtype=bool)
+
+
+class DescriptorAnalyzer(FrameAnalyzer):
+    name = "descriptors"
+    shared_output = True
+
+    def __init__(self) -> None:
+        from cv2 import xfeatures2d
+
+        self.__sift = xfeatures2d.SIFT_create()
+
+    def __reduce__(self) -> tuple:
+        return (DescriptorAnalyzer, ())
+
+    def analyze(self, image: ndarray) -> ndarray:
+        descriptors = ImageProcessing.get_image_descriptors(image, self.__sift)
+        count("descriptors.computed", len(descriptors) if descriptors is not None else 0)
+        return descriptors
+
+
+class FrameQualityAnalyzer(FrameAnalyzer):
+    name = "quality"
+
+    def analyze(self, image: ndarray) -> tuple[float, float, ndarray]:
+        return frame_measures(image)
+
+    def collect(self, results: list[tuple[float, float, ndarray]]) -> ndarray:
+        return stack_frame_measures(results)
+
+
+def default_analyzers(quality_mode: str = "bovw") -> list[FrameAnalyzer]:
+    """
+    Analyzers of the frame features used by the summarization stages. SIFT descriptors are only computed
+    for the `bovw` quality mode, the only stage using them, and frame qualities for the `frames` one.
+    """
+    analyzers = [HistogramAnalyzer(), FacePresenceAnalyzer(FACE_CLASSIFIER)]
+    if quality_mode == "bovw":
+        analyzers.append(DescriptorAnalyzer())
+    else:
+        analyzers.append(FrameQualityAnalyzer())
+    return analyzers
+
+
+def analyze_shared_frames(
+    analyzer: FrameAnalyzer, frames: list[SharedArray]
+) -> list[Any] | SharedArrayList:
+    """Runs an analyzer over frames read in place from shared memory, in a worker process"""
+    with span(analyzer.name, "analyzer", frames=len(frames)):
+        results = [analyzer.analyze(attach(frame)) for frame in frames]
+    return share_arrays(results) if analyzer.shared_output else results
+
+
+class FrameFeatureTable:
+    """Per-frame features of each video, aligned with the second-sorted frames of the video"""
+
+    def __init__(self) -> None:
+        self.__seconds = {}
+        self.__features = {}
+
+    def set_video_features(
+        self, video_name: str, seconds: ndarray, features: dict[str, Any]
+    ) -> None:
+        self.__seconds[video_name] = seconds
+        self.__features.setdefault(video_name, {}).update(features)
+
+    def get_videos(self) -> list[str]:
+        return list(self.__seconds.keys())
+
+    def get_seconds(self, video_name: str) -> ndarray:
+        return self.__seconds[video_name]
+
+    def has(self, video_name: str, feature: str) -> bool:
+        return feature in self.__features.get(video_name, {})
+
+    def get(self, video_name: str, feature: str) -> Any:
+        return self.__features[video_name][feature]
+
+    def get_video_features(self, video_name: str) -> dict[str, Any]:
+        return self.__features[video_name]
+
+    def select(self, video_names: list[str], features: list[str]) -> FrameFeatureTable:
+        """Table with only the given features of the given videos, small enough to send to worker processes"""
+        table = FrameFeatureTable()
+        for video_name in dict.fromkeys(video_names):
+            if video_name in self.__seconds:
+                table.set_video_features(
+                    video_name,
+                    self.__seconds[video_name],
+                    {
+                        feature: self.__features[video_name][feature]
+                        for feature in features
+                        if self.has(video_name, feature)
+                    },
+                )
+        return table
+
+    def between(self, video_name: str, feature: str, begin: int, end: int) -> Any:
+        """Gets the feature values of the frames whose video second is in the [begin, end) range"""
+        first, last = searchsorted(self.__seconds[video_name], [begin, end], side="left")
+        return self.__features[video_name][feature][first:last]
+
+
+class FrameStream:
+    """
+    Decodes each video frame once, in order, and fans it out to the registered analyzers.
+    Every analyzer runs on its own thread behind a bounded queue, so decoding never runs
+    more than `queue_size` frames ahead of the slowest analyzer.
+    Given an executor with more than one CPU, windows of `window` frames are decoded into shared
+    memory instead and analyzed in batches by the worker processes, which only receive frame handles.
+    """
+
+    def __init__(
+        self,
+        analyzers: list[FrameAnalyzer] = None,
+        queue_size: int = 16,
+        executor: TaskExecutor = None,
+        window: int = 256,
+    ) -> None:
+        self.__analyzers = list(analyzers) if analyzers else []
+        self.__queue_size = queue_size
+        self.__executor = executor
+        self.__window = window
+
+    def register(self, analyzer: FrameAnalyzer) -> FrameStream:
+        self.__analyzers.append(analyzer)
+        return self
+
+    def process(
+        self,
+        videos: list[Video],
+        frames_path: str,
+        features: FrameFeatureTable = None,
+        cache: StageCache = None,
+    ) -> FrameFeatureTable:
+        """Analyzes the frames of every video, reusing the cached features of unchanged videos"""
+        features = features if features is not None else FrameFeatureTable()
+        for video in videos:
+            if cache is None:
+                self.process_video(video, frames_path, features)
+                continue
+
+            features.set_video_features(
+                video.get_name(),
+                *cache.cached(
+                    "frame-features",
+                    self.get_cache_key(video, frames_path),
+                    lambda: self.__analyze_video(video, frames_path),
+                ),
+            )
+        return features
+
+    def get_cache_key(self, video: Video, frames_path: str) -> str:
+        """Key of the cached features of a video, given its extracted frames"""
+        frames = video.get_frame_sequence(frames_path)
+        return fingerprint(
+            file_fingerprint(video.get_video_path()),
+            frames.get_settings().to_dict(),
+            frames.get_seconds().tolist(),
+            [analyzer.name for analyzer in self.__analyzers],
+        )
+
+    def process_video(
+        self, video: Video, frames_path: str, features: FrameFeatureTable
+    ) -> None:
+        features.set_video_features(
+            video.get_name(), *self.__analyze_video(video, frames_path)
+        )
+
+    def __analyze_video(
+        self, video: Video, frames_path: str
+    ) -> tuple[ndarray, dict[str, Any]]:
+        with span("analyze_video", "stream", video=video.get_name()):
+            if self.__executor is not None and self.__executor.get_scheduler().get_cpus() > 1:
+                return self.__analyze_video_shared(video, frames_path)
+            return self.__analyze_video_threaded(video, frames_path)
+
+    def __analyze_video_threaded(
+        self, video: Video, frames_path: str
+    ) -> tuple[ndarray, dict[str, Any]]:
+        frames = video.get_frame_sequence(frames_path)
+        queues = [Queue(maxsize=self.__queue_size) for _ in self.__analyzers]
+        results = [[] for _ in self.__analyzers]
+        errors = []
+        path = get_path()
+
+        def consume(analyzer: FrameAnalyzer, queue: Queue, analyzer_results: list) -> None:
+            adopt_path(path)
+            with span(analyzer.name, "analyzer"):
+                while (image := queue.get()) is not _END:
+                    if errors:
+                        continue
+                    try:
+                        analyzer_results.append(analyzer.analyze(image))
+                    except Exception as e:
+                        errors.append(e)
+
+        threads = [
+            Thread(target=consume, args=args, daemon=True)
+            for args in zip(self.__analyzers, queues, results)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Decoding each frame once and handing it to every analyzer
+        readable = []
+        for i in range(len(frames)):
+            image = frames[i].load_image()
+            if image is None:
+                continue
+            readable.append(i)
+            for queue in queues:
+                queue.put(image)
+            if errors:
+                break
+
+        for queue in queues:
+            queue.put(_END)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        self.__log_unreadable(video, frames, readable)
+        log(f"Analyzed {len(readable)} frames of {video.get_name()}")
+        return frames.get_seconds()[readable], {
+            analyzer.name: analyzer.collect(analyzer_results)
+            for analyzer, analyzer_results in zip(self.__analyzers, results)
+        }
+
+    def __analyze_video_shared(
+        self, video: Video, frames_path: str
+    ) -> tuple[ndarray, dict[str, Any]]:
+        frames = video.get_frame_sequence(frames_path)
+        results = [[] for _ in self.__analyzers]
+        readable = []
+
+        # Splitting each window in enough batches to give every CPU at least one task
+        cpus = self.__executor.get_scheduler().get_cpus()
+        n_batches = max(ceil(cpus / max(len(self.__analyzers), 1)), 1)
+
+        with SharedBufferPool() as pool:
+            for start in range(0, len(frames), self.__window):
+                # Decoding each frame of the window once, straight into shared memory
+                pool.reset()
+                handles = []
+                for i in range(start, min(start + self.__window, len(frames))):
+                    image = frames[i].load_image()
+                    if image is not None:
+                        readable.append(i)
+                        handles.append(pool.put(image))
+                if not handles:
+                    continue
+
+                batch_size = ceil(len(handles) / n_batches)
+                tasks = [
+                    (i, analyzer, handles[j : j + batch_size])
+                    for i, analyzer in enumerate(self.__analyzers)
+                    for j in range(0, len(handles), batch_size)
+                ]
+                outputs = self.__executor.map(
+                    analyze_shared_frames, [task[1:] for task in tasks]
+                )
+
+                # Merging the batches back in frame order
+                for (i, analyzer, _), output in zip(tasks, outputs):
+                    results[i].extend(
+                        take_arrays(output) if analyzer.shared_output else output
+                    )
+
+        self.__log_unreadable(video, frames, readable)
+        log(f"Analyzed {len(readable)} frames of {video.get_name()} in shared memory")
+        return frames.get_seconds()[readable], {
+            analyzer.name: analyzer.collect(analyzer_results)
+            for analyzer, analyzer_results in zip(self.__analyzers, results)
+        }
+
+    @staticmethod
+    def __log_unreadable(video: Video, frames: FrameSequence, readable: list[int]) -> None:
+        # Unreadable frames are skipped, along with their seconds
+        if len(readable) < len(frames):
+            log(f"Skipped {len(frames) - len(readable)} unreadable frames of {video.get_name()}")
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from math import ceil
+from os import replace
+from os.path import basename
+
+
+class HLSPlaylist:
+    """
+    HLS media playlist that is rewritten each time a segment becomes available,
+    so players can start while the rest of the summary is still being rendered.
+    Segments are independently encoded, so each one after the first starts a discontinuity.
+    """
+
+    def __init__(self, path: str, target_duration: float) -> None:
+        self.__path = path
+        self.__target_duration = max(ceil(target_duration), 1)
+        self.__segments = []
+        self.__ended = False
+        self.__write()
+
+    def get_path(self) -> str:
+        return self.__path
+
+    def get_segments(self) -> list[tuple[str, float]]:
+        return self.__segments
+
+    def append(self, segment_path: str, duration: float) -> None:
+        self.__segments.append((basename(segment_path), duration))
+        self.__write()
+
+    def close(self) -> None:
+        self.__ended = True
+        self.__write()
+
+    def __write(self) -> None:
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{self.__target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for i, (segment, duration) in enumerate(self.__segments):
+            if i:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines += [f"#EXTINF:{duration:.3f},", segment]
+        if self.__ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        # Replacing the playlist atomically, players must never read a partial file
+        tmp_path = f"{self.__path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        replace(tmp_path, self.__path)
@@ -2,11 +2,9 @@ from __future__ import annotations
 
 from math import log10
 from typing import Any
-from pandas import DataFrame
 from collections import Counter
-from sklearn.cluster import KMeans
 from dataclasses import dataclass, field
-from numpy import ndarray, dot, zeros, argsort, transpose, concatenate
+from numpy import ndarray, dot, zeros, arange, argsort, transpose, concatenate
 from cv2 import (
     NORM_L1,
     calcHist,
@@ -18,15 +16,25 @@ from cv2 import (
 )
 
 from components.frame import Frame
+from processing.tracing import span, traced
 from components.segment import Segment
 
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from processing.frame_stream import FrameFeatureTable
+
 
 class FaceDetector:
     def __init__(self, classifier_path: str) -> None:
         self.__face_classifier = CascadeClassifier(classifier_path)
 
     def frame_contains_face(self, frame: Frame) -> bool:
-        faces = self.__face_classifier.detectMultiScale(frame.load_image(), 1.1, 5)
+        return self.image_contains_face(frame.load_image())
+
+    def image_contains_face(self, image: ndarray) -> bool:
+        faces = self.__face_classifier.detectMultiScale(image, 1.1, 5)
         return bool(len(faces))
 
 
@@ -37,11 +45,45 @@ class BagOfVisualWords:
         self.__kmeans = None
         self.__bovw_df = None
 
-    def fit_kmeans(self, **kwargs) -> None:
-        self.__kmeans = KMeans(n_clusters=self.__dict_size, **kwargs)
-        self.__kmeans.fit(concatenate(list(self.__items.values())))
-
+    def fit_kmeans(self, streaming: bool = False, batch_size: int = 4096, **kwargs) -> None:
+        """
+        Fits the visual words dictionary, on all descriptors at once or, `streaming`, with mini-batch
+        k-means on batches of about `batch_size` descriptors so they are never concatenated
+        """
+        if streaming:
+            self.__fit_kmeans_streaming(batch_size, **kwargs)
+            return
+
+        from sklearn.cluster import KMeans
+
+        descriptors = concatenate(list(self.__items.values()))
+        with span("kmeans", "compute", clusters=self.__dict_size, descriptors=len(descriptors)):
+            self.__kmeans = KMeans(n_clusters=self.__dict_size, **kwargs)
+            self.__kmeans.fit(descriptors)
+
+    def __fit_kmeans_streaming(self, batch_size: int, **kwargs) -> None:
+        from sklearn.cluster import MiniBatchKMeans
+
+        # The first batch needs at least as many descriptors as clusters
+        batch_size = max(batch_size, self.__dict_size)
+        with span("kmeans_streaming", "compute", clusters=self.__dict_size):
+            self.__kmeans = MiniBatchKMeans(
+                n_clusters=self.__dict_size, batch_size=batch_size, n_init=3, **kwargs
+            )
+            batch, batch_rows = [], 0
+            for descriptors in self.__items.values():
+                batch.append(descriptors)
+                batch_rows += len(descriptors)
+                if batch_rows >= batch_size:
+                    self.__kmeans.partial_fit(concatenate(batch))
+                    batch, batch_rows = [], 0
+            if batch:
+                self.__kmeans.partial_fit(concatenate(batch))
+
+    @traced("bovw_dataframe", "compute")
     def generate_bovw_dataframe(self) -> DataFrame:
+        from pandas import DataFrame
+
         self.__bovw_df = DataFrame(
             self.__items.items(), columns=["segment", "features"]
         )
@@ -64,7 +106,11 @@ class BagOfVisualWords:
 class ImageProcessing:
     @staticmethod
     def get_frame_histogram(frame: Frame) -> list[float]:
-        histogram = calcHist([frame.load_image()], [0], None, [256], [0, 256])
+        return ImageProcessing.get_image_histogram(frame.load_image())
+
+    @staticmethod
+    def get_image_histogram(image: ndarray) -> list[float]:
+        histogram = calcHist([image], [0], None, [256], [0, 256])
         normalize(histogram, histogram, norm_type=NORM_L1)
         return histogram
 
@@ -73,18 +119,44 @@ class ImageProcessing:
         return compareHist(hist_1, hist_2, HISTCMP_INTERSECT)
 
     @staticmethod
-    def ks_sift(segment: Segment, frames_path: str):
-        segment_keyframes = []
-        for frame in segment.load_frames(frames_path)[1:-1]:
-            _, descriptor = xfeatures2d.SIFT_create().detectAndCompute(
-                frame.load_image(), None
+    def get_image_descriptors(image: ndarray, sift: Any = None) -> ndarray:
+        sift = sift if sift is not None else xfeatures2d.SIFT_create()
+        _, descriptor = sift.detectAndCompute(image, None)
+        return descriptor
+
+    @staticmethod
+    @traced("ks_sift", "compute")
+    def ks_sift(
+        segment: Segment,
+        frames_path: str,
+        features: FrameFeatureTable = None,
+        engine: str = "reference",
+        keyframe_ratios: tuple[float, float] = (0.6, 0.1),
+    ):
+        """
+        Keyframe selection with SIFT descriptors, returning the descriptors of the segment keyframes.
+        Frame descriptors are taken from `features` when they have been computed for the video.
+        The `fast` engine matches the descriptors of the frames with `Keyframe.num_matches_fast`.
+        `keyframe_ratios` are the minimum keypoints and descriptors difference ratios of `Keyframe.is_keyframe`.
+        """
+        video_name = segment.get_video().get_name()
+        if features is not None and features.has(video_name, "descriptors"):
+            descriptors = features.between(
+                video_name, "descriptors", segment.get_begin(), segment.get_end()
+            )[1:-1]
+        else:
+            descriptors = (
+                ImageProcessing.get_image_descriptors(frame.load_image())
+                for frame in segment.load_frames(frames_path)[1:-1]
             )
 
+        segment_keyframes = []
+        for descriptor in descriptors:
             if descriptor is None:
                 continue
 
             keyframe = Keyframe(descriptor=descriptor)
-            if keyframe.is_keyframe(segment_keyframes):
+            if keyframe.is_keyframe(segment_keyframes, *keyframe_ratios, engine=engine):
                 segment_keyframes.append(keyframe)
         return concatenate([kf.descriptor for kf in segment_keyframes])
 
@@ -116,22 +188,42 @@ class Keyframe:
 
         return num_match
 
+    def num_matches_fast(self, other: Keyframe, threshold: float = 0.95) -> int:
+        """
+        Same count as `num_matches`, of the descriptors whose most similar descriptor of the other keyframe
+        is above `threshold` and has them as its own most similar one, with all similarities computed at once
+        """
+        similarity = dot(self.descriptor, transpose(other.descriptor))
+        self_matches = similarity.argmax(axis=1)
+        other_matches = similarity.argmax(axis=0)
+
+        descriptors = arange(len(self.descriptor))
+        return int(
+            (
+                (similarity[descriptors, self_matches] >= threshold)
+                & (other_matches[self_matches] == descriptors)
+            ).sum()
+        )
+
     def is_keyframe(
         self,
         keyframes: list[Keyframe],
         min_keypoints_diff_ratio: float = 0.6,
         min_descriptors_diff_ratio: float = 0.1,
+        engine: str = "reference",
     ) -> bool:
         if not keyframes:
             return True
 
+        num_matches = self.num_matches_fast if engine == "fast" else self.num_matches
+
         return sum(
             (
                 abs(self.descriptor_size - kf.descriptor_size)
                 >= kf.descriptor_size * min_keypoints_diff_ratio
             )
             or (
-                self.num_matches(kf) < (min_descriptors_diff_ratio * kf.descriptor_size)
+                num_matches(kf) < (min_descriptors_diff_ratio * kf.descriptor_size)
             )
             for kf in keyframes
         ) == len(keyframes)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import socket
+from uuid import uuid4
+from time import sleep, time
+from threading import Event, Thread
+from typing import Any, Callable
+from os import chdir, getcwd, getpid, listdir, makedirs, rename, replace, stat, utime
+from os.path import exists, join
+
+from processing.utils import log
+
+# Job states, each one a folder of the queue
+JOB_STATES = ("pending", "claimed", "done", "failed")
+
+
+class FileJobQueue:
+    """
+    Job queue on a shared filesystem, each job a JSON file in the folder of its state.
+    Workers claim a job by renaming it from `pending` to `claimed`, which only one of them can do,
+    and keep touching it while they run it. Jobs whose worker stopped heartbeating for
+    `heartbeat_timeout` seconds are given back to `pending`, up to `max_attempts` runs.
+    """
+
+    def __init__(self, root: str, heartbeat_timeout: float = 60.0, max_attempts: int = 3) -> None:
+        self.__root = root
+        self.__heartbeat_timeout = heartbeat_timeout
+        self.__max_attempts = max_attempts
+        for state in JOB_STATES:
+            makedirs(join(root, state), exist_ok=True)
+
+    def get_root(self) -> str:
+        return self.__root
+
+    def __path(self, state: str, job_id: str) -> str:
+        return join(self.__root, state, f"{job_id}.json")
+
+    def __write(self, state: str, job: dict) -> None:
+        # Writing next to the job file and renaming it, readers never see a partial job
+        path = self.__path(state, job["id"])
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(job, f, indent=4)
+        replace(f"{path}.tmp", path)
+
+    def __move(self, job: dict, source: str, target: str) -> bool:
+        # Renaming first, a job given to another worker in the meantime is not written back
+        try:
+            rename(self.__path(source, job["id"]), self.__path(target, job["id"]))
+        except FileNotFoundError:
+            return False
+        self.__write(target, job)
+        return True
+
+    def load(self, state: str, job_id: str) -> dict | None:
+        try:
+            with open(self.__path(state, job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_jobs(self, state: str) -> list[str]:
+        return sorted(
+            filename[: -len(".json")]
+            for filename in listdir(join(self.__root, state))
+            if filename.endswith(".json")
+        )
+
+    def put(self, kind: str, payload: dict, job_id: str = None) -> str:
+        """Queues a job, run by the workers from the current working directory"""
+        job = {
+            "id": job_id or uuid4().hex[:12],
+            "kind": kind,
+            "payload": payload,
+            "workdir": getcwd(),
+            "attempts": 0,
+            "worker": None,
+            "error": "",
+            "result": None,
+        }
+        self.__write("pending", job)
+        return job["id"]
+
+    def get_state(self, job_id: str) -> str | None:
+        for state in JOB_STATES:
+            if exists(self.__path(state, job_id)):
+                return state
+        return None
+
+    def claim(self, worker_id: str) -> dict | None:
+        """Takes the oldest pending job for the worker, `None` if there is none"""
+        for job_id in self.get_jobs("pending"):
+            try:
+                # Renaming keeps the modification time, which must not be the time the job was queued or
+                # the job would look stale right away
+                utime(self.__path("pending", job_id))
+                rename(self.__path("pending", job_id), self.__path("claimed", job_id))
+            except FileNotFoundError:
+                # Claimed by another worker in the meantime
+                continue
+
+            job = self.load("claimed", job_id)
+            if job is None:
+                # Given back to the queue in the meantime
+                continue
+            job["attempts"] += 1
+            job["worker"] = worker_id
+            self.__write("claimed", job)
+            return job
+        return None
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Marks a claimed job as alive, `False` if it was given back to the queue"""
+        try:
+            utime(self.__path("claimed", job_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def complete(self, job: dict, result: Any = None) -> bool:
+        job["result"], job["error"] = result, ""
+        return self.__move(job, "claimed", "done")
+
+    def fail(self, job: dict, error: str) -> bool:
+        """Gives a failed job back to the queue, or to `failed` once it ran `max_attempts` times"""
+        job["error"] = error
+        return self.__move(
+            job, "claimed", "pending" if job["attempts"] < self.__max_attempts else "failed"
+        )
+
+    def requeue_stale(self) -> list[str]:
+        """Gives back the claimed jobs whose worker stopped heartbeating"""
+        requeued = []
+        for job_id in self.get_jobs("claimed"):
+            try:
+                stale = time() - stat(self.__path("claimed", job_id)).st_mtime > self.__heartbeat_timeout
+            except FileNotFoundError:
+                continue
+            job = self.load("claimed", job_id) if stale else None
+            if job is not None and self.fail(job, f"Worker {job['worker']} stopped heartbeating"):
+                requeued.append(job_id)
+        return requeued
+
+    def wait(self, job_ids: list[str], poll_interval: float = 2.0, report_interval: float = 60.0) -> dict[str, str]:
+        """Waits for the jobs to be done or failed, giving back stale ones meanwhile, and gets their states"""
+        last_report = time()
+        while True:
+            for job_id in self.requeue_stale():
+                log(f"Job {job_id} was given back to the queue", log_type="WARNING")
+
+            states = {job_id: self.get_state(job_id) for job_id in job_ids}
+            finished = sum(state in ("done", "failed") for state in states.values())
+            if finished == len(job_ids):
+                return states
+
+            if time() - last_report > report_interval:
+                log(f"{finished}/{len(job_ids)} jobs finished, waiting for workers")
+                last_report = time()
+            sleep(poll_interval)
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}-{getpid()}"
+
+
+def work(
+    queue: FileJobQueue,
+    handlers: dict[str, Callable[[dict], Any]],
+    worker_id: str = None,
+    idle_timeout: float = None,
+    poll_interval: float = 2.0,
+    heartbeat_interval: float = 10.0,
+) -> int:
+    """
+    Runs queued jobs with the handler of their kind until no job shows up for `idle_timeout` seconds,
+    forever when it is not given. Gets the number of jobs run.
+    """
+    worker_id = worker_id or get_worker_id()
+    idle_since, ran = time(), 0
+    while idle_timeout is None or time() - idle_since < idle_timeout:
+        job = queue.claim(worker_id)
+        if job is None:
+            sleep(poll_interval)
+            continue
+
+        # Heartbeating from a thread, so long jobs are not given back to the queue
+        stopped = Event()
+
+        def beat() -> None:
+            while not stopped.wait(heartbeat_interval) and queue.heartbeat(job["id"]):
+                pass
+
+        heartbeat = Thread(target=beat, daemon=True)
+        heartbeat.start()
+        try:
+            chdir(job["workdir"])
+            result = handlers[job["kind"]](job["payload"])
+        except Exception as e:
+            log(f"Job {job['id']} failed: {e}", log_type="ERROR")
+            queue.fail(job, str(e))
+        else:
+            if not queue.complete(job, result):
+                log(f"Job {job['id']} was given to another worker before finishing", log_type="WARNING")
+        finally:
+            stopped.set()
+            heartbeat.join()
+
+        ran += 1
+        idle_since = time()
+    return ran
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import tracemalloc
+from os import sysconf
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from processing.utils import log
+
+# Monitor of the current process, stages and structures are only accounted while it is set
+_monitor: MemoryMonitor | None = None
+
+
+def format_size(size: int) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(size) < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+
+def get_rss() -> int:
+    """Resident memory of the process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return get_peak_rss()
+
+
+def get_peak_rss() -> int:
+    """Highest resident memory of the process in bytes, since it started or the last `reset_peak_rss`"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    from resource import RUSAGE_SELF, getrusage
+
+    return getrusage(RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak_rss() -> bool:
+    """Resets the peak resident memory of the process to the current one, where the kernel allows it"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+@dataclass
+class StageMemory:
+    name: str
+    rss_before: int
+    rss_after: int = 0
+    peak_rss: int = 0
+    traced_peak: int = None
+    structures: dict[str, int] = field(default_factory=dict)
+
+
+class MemoryMonitor:
+    """
+    Resident memory high-water mark of each pipeline stage and size of its largest structures,
+    with the Python allocations peak too when `trace_allocations` is on (slower).
+    Given a `budget` in bytes, stages ask whether a structure fits in what is left of it before
+    building it, so they can fall back to a chunked or sparse variant, or fail before swapping.
+    """
+
+    def __init__(self, budget: int = None, trace_allocations: bool = False) -> None:
+        self.__budget = budget
+        self.__trace_allocations = trace_allocations
+        self.__stages: list[StageMemory] = []
+        self.__open: list[StageMemory] = []
+
+    def get_budget(self) -> int:
+        return self.__budget
+
+    def get_stages(self) -> list[StageMemory]:
+        return self.__stages
+
+    def get_available(self) -> int | None:
+        """Bytes left in the budget, `None` without a budget"""
+        if self.__budget is None:
+            return None
+        return self.__budget - get_rss()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMemory]:
+        record = StageMemory(name, get_rss())
+
+        # Keeping the peak of the enclosing stages so far before resetting it for this one
+        peak_rss = get_peak_rss()
+        for parent in self.__open:
+            parent.peak_rss = max(parent.peak_rss, peak_rss)
+        if not reset_peak_rss():
+            record.peak_rss = get_peak_rss()
+        if self.__trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.__open.append(record)
+        self.__stages.append(record)
+        try:
+            yield record
+        finally:
+            self.__open.pop()
+            record.rss_after = get_rss()
+            record.peak_rss = max(record.peak_rss, get_peak_rss())
+            if self.__trace_allocations:
+                record.traced_peak = tracemalloc.get_traced_memory()[1]
+
+            # Enclosing stages peak at least as high as the ones they ran
+            for parent in self.__open:
+                parent.peak_rss = max(parent.peak_rss, record.peak_rss)
+                if record.traced_peak is not None:
+                    parent.traced_peak = max(parent.traced_peak or 0, record.traced_peak)
+
+            if self.__budget is not None and record.peak_rss > self.__budget:
+                log(
+                    f"Stage '{name}' peaked at {format_size(record.peak_rss)}, "
+                    f"over the {format_size(self.__budget)} memory budget",
+                    log_type="WARNING",
+                )
+
+    def track(self, name: str, nbytes: int) -> None:
+        """Records the size of a structure built by the running stage"""
+        if self.__open:
+            structures = self.__open[-1].structures
+            structures[name] = max(structures.get(name, 0), int(nbytes))
+
+    def fits(self, name: str, nbytes: int) -> bool:
+        available = self.get_available()
+        if available is None or nbytes <= available:
+            return True
+        log(
+            f"'{name}' needs about {format_size(nbytes)}, more than the {format_size(available)} "
+            f"left in the memory budget, using its low-memory variant",
+            log_type="WARNING",
+        )
+        return False
+
+    def require(self, name: str, nbytes: int) -> None:
+        """Fails before building a structure that does not fit in the budget"""
+        available = self.get_available()
+        if available is not None and nbytes > available:
+            raise Exception(
+                f"Memory budget of {format_size(self.__budget)} exceeded: '{name}' needs about "
+                f"{format_size(nbytes)} with only {format_size(available)} left\n{self.summary()}"
+            )
+
+    def summary(self) -> str:
+        lines = [f"{'stage':32} {'rss before':>12} {'rss after':>12} {'peak rss':>12} {'python peak':>12}"]
+        for record in self.__stages:
+            # Stages still running, e.g. when the budget is exceeded, have no memory after them yet
+            running = any(record is stage for stage in self.__open)
+            lines.append(
+                f"{record.name[:32]:32} {format_size(record.rss_before):>12} "
+                f"{'-' if running else format_size(record.rss_after):>12} "
+                f"{'-' if running else format_size(record.peak_rss):>12} "
+                f"{format_size(record.traced_peak) if record.traced_peak is not None else '-':>12}"
+            )
+            lines += [
+                f"  {structure[:30]:30} {format_size(nbytes):>12}"
+                for structure, nbytes in record.structures.items()
+            ]
+        return "\n".join(lines)
+
+
+def get_monitor() -> MemoryMonitor | None:
+    return _monitor
+
+
+@contextmanager
+def memory_monitoring(budget: int = None, report: bool = False) -> Iterator[MemoryMonitor | None]:
+    """Accounts the memory of the block when a budget is given or a report asked, logging the report after it"""
+    global _monitor
+    if budget is None and not report:
+        yield None
+        return
+
+    _monitor = MemoryMonitor(budget, trace_allocations=report)
+    try:
+        yield _monitor
+    finally:
+        monitor, _monitor = _monitor, None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        log(f"Memory by stage:\n{monitor.summary()}")
+
+
+@contextmanager
+def memory_stage(name: str) -> Iterator[None]:
+    if _monitor is None:
+        yield
+        return
+    with _monitor.stage(name):
+        yield
+
+
+def track_memory(name: str, nbytes: int) -> None:
+    if _monitor is not None:
+        _monitor.track(name, nbytes)
+
+
+def fits_memory(name: str, nbytes: int) -> bool:
+    """Whether a structure fits in the memory budget, always without one"""
+    return _monitor is None or _monitor.fits(name, nbytes)
+
+
+def require_memory(name: str, nbytes: int) -> None:
+    if _monitor is not None:
+        _monitor.require(name, nbytes)
+
+
+def get_available_memory() -> int | None:
+    return _monitor.get_available() if _monitor is not None else None
@@ -1,5 +1,15 @@
+from __future__ import annotations
+
+from typing import Any, TYPE_CHECKING
+from functools import lru_cache
 from os.path import join, dirname
 
+from processing.utils import log
+
+if TYPE_CHECKING:
+    from processing.image import FaceDetector
+    from processing.text import SubjectivityGoogleAPI
+
 MODELS_DIR = join(dirname(dirname(__file__)), "models")
 
 IMAGE_MODELS_DIR = join(MODELS_DIR, "image")
@@ -9,3 +19,46 @@ FACE_CLASSIFIER = join(IMAGE_MODELS_DIR, "lbpcascade_frontalface_improved.xml")
 
 SENTIMENT_API_RESULTS = join(TEXT_MODELS_DIR, "sentiments.data")
 SENTILEX_DATA_PT = join(TEXT_MODELS_DIR, "SentiLex-flex-PT02.txt")
+
+
+# Models are loaded once per process and reused by every stage and dataset run in it
+
+
+@lru_cache(maxsize=None)
+def load_face_detector(classifier_path: str = FACE_CLASSIFIER) -> FaceDetector:
+    from processing.image import FaceDetector
+
+    return FaceDetector(classifier_path)
+
+
+@lru_cache(maxsize=1)
+def load_subjectivity_classifier() -> SubjectivityGoogleAPI:
+    from processing.text import SubjectivityGoogleAPI
+
+    return SubjectivityGoogleAPI(
+        sentiment_data_path=SENTIMENT_API_RESULTS,
+        sentilex_path=SENTILEX_DATA_PT,
+    )
+
+
+@lru_cache(maxsize=None)
+def load_stopwords(language: str = "portuguese") -> frozenset[str]:
+    import nltk
+
+    return frozenset(nltk.corpus.stopwords.words(language))
+
+
+@lru_cache(maxsize=1)
+def load_stemmer() -> Any:
+    import nltk
+
+    return nltk.stem.RSLPStemmer()
+
+
+def warm_up_models() -> None:
+    """Loads every model ahead of time, e.g. in a new worker process, skipping the ones that are not available"""
+    for load in (load_face_detector, load_subjectivity_classifier, load_stopwords, load_stemmer):
+        try:
+            load()
+        except Exception as e:
+            log(f"Could not load {load.__name__[5:]}: {e}", log_type="WARNING")
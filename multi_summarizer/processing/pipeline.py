@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from time import perf_counter
+from os.path import join
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+
+from processing.utils import log
+from processing.tracing import span
+from processing.memory import memory_stage
+
+
+@dataclass
+class PipelineReport:
+    """Outcome and per-stage wall time in seconds of a summarization run"""
+
+    name: str
+    output: str = ""
+    timings: dict[str, float] = field(default_factory=dict)
+    status: str = "running"
+    error: str = ""
+
+    def get_total(self) -> float:
+        return sum(self.timings.values())
+
+    @contextmanager
+    def stage(self, name: str):
+        start = perf_counter()
+        try:
+            with span(name, "pipeline"), memory_stage(name):
+                yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + perf_counter() - start
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "total": self.get_total()}
+
+
+def run_pipeline(
+    name: str,
+    path: str,
+    videos: list[str],
+    output: str,
+    content_format: str = "json",
+    plan: str = "",
+    plan_only: bool = False,
+    stream: str = "",
+    cache_dir: str = "",
+    cpus: int = None,
+    sample_fps: float = 1.0,
+    analysis_height: int = None,
+    roi: tuple[int, int, int, int] = None,
+    frames_budget: int = None,
+    queue_dir: str = "",
+    compute_engine: str = "reference",
+    quality_mode: str = "bovw",
+    snap_to_cuts: float = 0.0,
+    report: PipelineReport = None,
+) -> PipelineReport:
+    """
+    Summarizes one dataset, from the frames extraction to the rendering of the summary video.
+    Stage timings are recorded in `report`, which keeps the ones already run if a stage fails.
+    With a `queue_dir`, the frames of every video are extracted and analyzed by the workers of that queue.
+    With `snap_to_cuts`, summary segments boundaries are moved to the shot cuts that many seconds around them.
+    """
+    # Heavy dependencies are only imported once the arguments are valid
+    from processing.dataset import Dataset, DatasetLoader
+    from summarizers.hsmvideosumm import HSMVideoSumm
+    from processing.cache import StageCache
+    from processing.executor import TaskExecutor
+    from processing.scheduler import ResourceScheduler
+    from components.frame import ExtractionSettings
+    from processing.frame_cache import FrameCache
+    from processing.frame_stream import FrameStream, default_analyzers
+    from processing.job_queue import FileJobQueue
+    from processing.distributed import distribute_video_features
+
+    report = report if report is not None else PipelineReport(name)
+    report.output = plan if plan_only else (stream or output)
+    scheduler = ResourceScheduler(cpus)
+    scheduler.apply()
+    if queue_dir and not cache_dir:
+        # Workers hand the video features over through the stage cache
+        cache_dir = join(queue_dir, "cache")
+    stage_cache = StageCache(cache_dir) if cache_dir else None
+    extraction = ExtractionSettings(fps=sample_fps, height=analysis_height, roi=roi)
+    frame_cache = FrameCache(budget=frames_budget)
+    dataset = Dataset(name=name, path=path, videos=videos, extraction=extraction)
+    log(
+        f"""Running for:
+    - Dataset: {dataset.name}
+    - Path: {dataset.path}
+    - Videos: {dataset.videos}
+    - Frames: {extraction.to_filter()}\n"""
+    )
+
+    # Loading data to summarize
+    dataset_loader = DatasetLoader(dataset, content_format=content_format)
+
+    # Having the workers extract and analyze the frames of the videos
+    if queue_dir:
+        with report.stage("workers"):
+            distribute_video_features(
+                dataset,
+                dataset_loader,
+                FileJobQueue(queue_dir),
+                frame_cache,
+                cache_dir,
+                quality_mode,
+            )
+
+    # Saving frames as images
+    with report.stage("frames"):
+        frames_dir = dataset_loader.save_video_frames(frame_cache)
+
+    # Loading videos
+    with report.stage("transcripts"):
+        videos = dataset_loader.load_videos()
+
+    # Decoding every frame once for all the image analyses
+    executor = TaskExecutor(scheduler)
+    try:
+        with report.stage("frame_analysis"):
+            frame_features = FrameStream(default_analyzers(quality_mode), executor=executor).process(
+                videos, frames_dir, cache=stage_cache
+            )
+
+        # Creating HSMVideoSumm summarizer object
+        summarizer = HSMVideoSumm(
+            videos=videos,
+            summary_name=dataset.name,
+            frames_path=frames_dir,
+            output_path=output,
+            frame_features=frame_features,
+            stage_cache=stage_cache,
+            executor=executor,
+            compute_engine=compute_engine,
+            quality_mode=quality_mode,
+        )
+
+        # Running summarization, with the per-video work of each stage spread over worker processes
+        with report.stage("summarization"):
+            video_summary = summarizer.summarize()
+
+        # Aligning the summary with the cuts of its sources, before it is saved or rendered
+        if snap_to_cuts:
+            with report.stage("snapping"):
+                moved = summarizer.snap_summary_to_cuts(snap_to_cuts)
+            log(f"Moved {moved} summary segment boundaries to shot cuts")
+    finally:
+        executor.close()
+
+    if stage_cache is not None:
+        hits, misses = stage_cache.get_stats()
+        log(f"Stage cache: {hits} reused, {misses} computed ({stage_cache.get_cache_dir()})")
+
+    if plan:
+        with report.stage("plan"):
+            summarizer.get_summary_plan().save(plan)
+        log(f"Summary plan saved to {plan}")
+
+    if not plan_only:
+        with report.stage("render"):
+            if stream:
+                video_summary.save_stream(stream, cpus=scheduler.get_cpus())
+            else:
+                video_summary.save(cpus=scheduler.get_cpus())
+
+    report.status = "done"
+    return report
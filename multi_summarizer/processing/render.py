@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Callable
+from os import makedirs
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from tempfile import TemporaryDirectory
+from os.path import abspath, dirname, join
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from processing.utils import log
+from processing.hls import HLSPlaylist
+from processing.scheduler import ResourceScheduler
+from components.segment import Segment
+from processing.ffmpeg import VideoStreamInfo, probe_video, run_ffmpeg
+
+# Source codecs that re-encoded boundary pieces can be joined to without re-encoding the rest
+STREAM_COPY_VIDEO_CODECS = {"h264"}
+STREAM_COPY_AUDIO_CODECS = {"aac", None}
+
+
+@dataclass
+class RenderPiece:
+    source: str
+    start: float
+    end: float
+    copy: bool
+    fadein: float = 0.0
+    fadeout: float = 0.0
+
+    def get_duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class RenderChunk:
+    """Group of consecutive pieces encoded independently from the rest of the summary"""
+
+    index: int
+    pieces: list[RenderPiece]
+    output_dir: str
+    threads: int = 0
+    extension: str = "mp4"
+
+
+@dataclass
+class ChunkReport:
+    index: int
+    pieces: int
+    duration: float
+    seconds: float
+    files: list[str] = field(default_factory=list)
+    durations: list[float] = field(default_factory=list)
+
+
+def render_chunk(chunk: RenderChunk, target: VideoStreamInfo) -> ChunkReport:
+    """Renders each piece of the chunk to its own file, in order"""
+    start = perf_counter()
+    files = [
+        SummaryRenderer.render_piece(
+            piece,
+            target,
+            join(chunk.output_dir, f"chunk-{chunk.index}-{i}.{chunk.extension}"),
+            threads=chunk.threads,
+        )
+        for i, piece in enumerate(chunk.pieces)
+    ]
+    return ChunkReport(
+        index=chunk.index,
+        pieces=len(chunk.pieces),
+        duration=sum(piece.get_duration() for piece in chunk.pieces),
+        seconds=perf_counter() - start,
+        files=files,
+        durations=[piece.get_duration() for piece in chunk.pieces],
+    )
+
+
+def plan_segment_pieces(
+    source: str,
+    begin: float,
+    end: float,
+    keyframes: list[float],
+    fadein: float = 0.0,
+    fadeout: float = 0.0,
+    min_copy_duration: float = 1.0,
+) -> list[RenderPiece]:
+    """
+    Splits a segment into a stream-copied middle piece, starting and ending on keyframes,
+    and the re-encoded head and tail pieces around it that hold the fades.
+    Segments with no keyframe-aligned middle piece are entirely re-encoded.
+    """
+    first = bisect_left(keyframes, begin + fadein)
+    last = bisect_right(keyframes, end - fadeout) - 1
+
+    if first >= len(keyframes) or last < 0:
+        return [RenderPiece(source, begin, end, False, fadein, fadeout)]
+
+    copy_start, copy_end = keyframes[first], keyframes[last]
+    if copy_end - copy_start < min_copy_duration:
+        return [RenderPiece(source, begin, end, False, fadein, fadeout)]
+
+    pieces = []
+    if copy_start > begin:
+        pieces.append(RenderPiece(source, begin, copy_start, False, fadein=fadein))
+    pieces.append(RenderPiece(source, copy_start, copy_end, True))
+    if end > copy_end:
+        pieces.append(RenderPiece(source, copy_end, end, False, fadeout=fadeout))
+
+    return pieces
+
+
+class SummaryRenderer:
+    """
+    Renders summary segments with ffmpeg, probing each source video only once.
+    When all sources share a stream-copyable format, only the fade regions at the segments
+    boundaries are re-encoded and the rest is cut with stream copy.
+    Chunks of `segments_per_chunk` segments, each with its own fades, are encoded by
+    `workers` concurrent ffmpeg processes and joined with the concat demuxer.
+    The encoders share a budget of `cpus` threads.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        fadein: float = 0.5,
+        fadeout: float = 0.5,
+        stream_copy: bool = True,
+        workers: int = None,
+        segments_per_chunk: int = 1,
+        cpus: int = None,
+    ) -> None:
+        self.__output_path = output_path
+        self.__fadein = fadein
+        self.__fadeout = fadeout
+        self.__stream_copy = stream_copy
+        self.__scheduler = ResourceScheduler(cpus)
+        self.__workers = workers or self.__scheduler.get_cpus()
+        self.__segments_per_chunk = segments_per_chunk
+
+    def render(self, segments: list[Segment]) -> list[ChunkReport]:
+        """Renders the segments to the output path and returns the timing report of each chunk"""
+        start = perf_counter()
+        target, segments_pieces = self.__prepare(segments)
+
+        with TemporaryDirectory(dir=dirname(abspath(self.__output_path))) as tmp_dir:
+            chunks = self.__plan_chunks(segments_pieces, tmp_dir)
+            reports = self.__render_chunks(chunks, target)
+            self.concat(
+                [file for report in reports for file in report.files],
+                self.__output_path,
+            )
+
+        log(f"Summary rendered in {perf_counter() - start:.2f}s ({len(chunks)} chunks)")
+        return reports
+
+    def render_stream(self, segments: list[Segment], playlist_path: str) -> list[ChunkReport]:
+        """
+        Renders the segments as MPEG-TS files next to a HLS playlist.
+        Chunks are added to the playlist in summary order as soon as they and all the previous ones are done.
+        """
+        start = perf_counter()
+        target, segments_pieces = self.__prepare(segments)
+
+        output_dir = dirname(abspath(playlist_path))
+        makedirs(output_dir, exist_ok=True)
+
+        chunks = self.__plan_chunks(segments_pieces, output_dir, extension="ts")
+        playlist = HLSPlaylist(
+            playlist_path,
+            target_duration=max(p.get_duration() for c in chunks for p in c.pieces),
+        )
+
+        def publish(report: ChunkReport) -> None:
+            for file, duration in zip(report.files, report.durations):
+                playlist.append(file, duration)
+            if report.index == 0:
+                log(f"Summary playable at {playlist_path} after {perf_counter() - start:.2f}s")
+
+        reports = self.__render_chunks(chunks, target, on_ready=publish)
+        playlist.close()
+
+        log(f"Summary stream rendered in {perf_counter() - start:.2f}s ({len(chunks)} chunks)")
+        return reports
+
+    def __prepare(self, segments: list[Segment]) -> tuple[VideoStreamInfo, list[list[RenderPiece]]]:
+        sources = self.__probe_sources(segments)
+        target = sources[segments[0].get_video().get_video_path()]
+        stream_copy = self.__stream_copy and self.__is_stream_copyable(sources)
+
+        segments_pieces = self.__plan_pieces(segments, sources, stream_copy)
+        n_pieces = sum(len(pieces) for pieces in segments_pieces)
+        log(
+            f"Rendering {len(segments)} segments as {n_pieces} pieces "
+            f"({sum(p.copy for pieces in segments_pieces for p in pieces)} stream copied)"
+        )
+        return target, segments_pieces
+
+    def __plan_chunks(
+        self,
+        segments_pieces: list[list[RenderPiece]],
+        output_dir: str,
+        extension: str = "mp4",
+    ) -> list[RenderChunk]:
+        step = self.__segments_per_chunk
+        groups = [
+            [piece for pieces in segments_pieces[i : i + step] for piece in pieces]
+            for i in range(0, len(segments_pieces), step)
+        ]
+        # Splitting encoder threads among the chunks encoded at the same time
+        _, threads = self.__scheduler.split(len(groups), self.__workers)
+        return [
+            RenderChunk(
+                index=i,
+                pieces=pieces,
+                output_dir=output_dir,
+                threads=threads,
+                extension=extension,
+            )
+            for i, pieces in enumerate(groups)
+        ]
+
+    def __render_chunks(
+        self,
+        chunks: list[RenderChunk],
+        target: VideoStreamInfo,
+        on_ready: Callable[[ChunkReport], None] = None,
+    ) -> list[ChunkReport]:
+        """
+        Encodes the chunks concurrently. The encoding work happens in the ffmpeg child processes,
+        so a thread per running chunk is enough to keep them all busy.
+        `on_ready` is called for each chunk, in order, once it and all the previous ones are done.
+        """
+        reports, ready, next_index = [], {}, 0
+        # Running only as many encoders at once as the CPU budget the chunk threads were split for
+        workers, _ = self.__scheduler.split(len(chunks), self.__workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render_chunk, chunk, target) for chunk in chunks]
+            for future in as_completed(futures):
+                report = future.result()
+                reports.append(report)
+                log(
+                    f"Chunk {report.index + 1}/{len(chunks)} rendered in {report.seconds:.2f}s "
+                    f"({report.pieces} pieces, {report.duration:.1f}s of video) "
+                    f"[{len(reports)}/{len(chunks)} done]"
+                )
+
+                ready[report.index] = report
+                while on_ready is not None and next_index in ready:
+                    on_ready(ready.pop(next_index))
+                    next_index += 1
+
+        return sorted(reports, key=lambda report: report.index)
+
+    def __probe_sources(self, segments: list[Segment]) -> dict[str, VideoStreamInfo]:
+        paths = dict.fromkeys(seg.get_video().get_video_path() for seg in segments)
+        return {path: probe_video(path) for path in paths}
+
+    def __is_stream_copyable(self, sources: dict[str, VideoStreamInfo]) -> bool:
+        formats = {info.get_format() for info in sources.values()}
+        info = next(iter(sources.values()))
+        return (
+            len(formats) == 1
+            and info.video_codec in STREAM_COPY_VIDEO_CODECS
+            and info.audio_codec in STREAM_COPY_AUDIO_CODECS
+        )
+
+    def __plan_pieces(
+        self,
+        segments: list[Segment],
+        sources: dict[str, VideoStreamInfo],
+        stream_copy: bool,
+    ) -> list[list[RenderPiece]]:
+        pieces = []
+        for segment in segments:
+            source = segment.get_video().get_video_path()
+            if stream_copy:
+                pieces.append(
+                    plan_segment_pieces(
+                        source,
+                        segment.get_begin(),
+                        segment.get_end(),
+                        sources[source].keyframes,
+                        self.__fadein,
+                        self.__fadeout,
+                    )
+                )
+            else:
+                pieces.append(
+                    [
+                        RenderPiece(
+                            source,
+                            segment.get_begin(),
+                            segment.get_end(),
+                            False,
+                            self.__fadein,
+                            self.__fadeout,
+                        )
+                    ]
+                )
+        return pieces
+
+    @staticmethod
+    def render_piece(
+        piece: RenderPiece, target: VideoStreamInfo, output: str, threads: int = 0
+    ) -> str:
+        """Cuts a piece from its source into a MP4 or MPEG-TS file, either stream copying or re-encoding it"""
+        args = [
+            "-ss", str(piece.start),
+            "-i", piece.source,
+            "-t", str(piece.get_duration()),
+            "-map", "0:v:0",
+        ]
+        if target.has_audio():
+            args += ["-map", "0:a:0?"]
+
+        if piece.copy:
+            args += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+        else:
+            args += ["-vf", SummaryRenderer.video_filters(piece, target)]
+            args += ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18"]
+            args += ["-threads", str(threads)]
+            if target.has_audio():
+                args += ["-c:a", "aac", "-ar", str(target.sample_rate), "-ac", str(target.channels)]
+            else:
+                args += ["-an"]
+
+        output_format = "mpegts" if output.endswith(".ts") else "mp4"
+        run_ffmpeg(args + ["-f", output_format, output])
+        return output
+
+    @staticmethod
+    def video_filters(piece: RenderPiece, target: VideoStreamInfo) -> str:
+        """Scales the piece to the summary format and applies its fades"""
+        filters = [
+            f"scale={target.width}:{target.height}:force_original_aspect_ratio=decrease",
+            f"pad={target.width}:{target.height}:(ow-iw)/2:(oh-ih)/2",
+            "setsar=1",
+            f"fps={target.fps}",
+            f"format={target.pixel_format}",
+        ]
+        if piece.fadein:
+            filters.append(f"fade=t=in:st=0:d={piece.fadein}")
+        if piece.fadeout:
+            filters.append(
+                f"fade=t=out:st={max(piece.get_duration() - piece.fadeout, 0)}:d={piece.fadeout}"
+            )
+        return ",".join(filters)
+
+    @staticmethod
+    def concat(files: list[str], output_path: str) -> None:
+        """
+        Losslessly joins the given files with ffmpeg concat demuxer.
+        The demuxer converts H.264 pieces to Annex B, so each piece keeps its own parameter sets.
+        """
+        list_file = f"{files[0]}.txt"
+        with open(list_file, "w") as f:
+            for file in files:
+                escaped = abspath(file).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        run_ffmpeg(
+            ["-f", "concat", "-safe", "0", "-i", list_file, "-map", "0", "-c", "copy"]
+            + ["-movflags", "+faststart", output_path]
+        )
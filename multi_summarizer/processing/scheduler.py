@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sys
+from os import cpu_count, environ
+from typing import Any, Callable
+
+# Thread pool sizes read by OpenMP and the BLAS backends when they are loaded
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def limit_threads(threads: int) -> None:
+    """
+    Limits the thread pools of OpenCV, BLAS and OpenMP (used by scikit-learn) in the current process.
+    Libraries loaded later pick the limit up from the environment.
+    """
+    for var in THREAD_ENV_VARS:
+        environ[var] = str(threads)
+
+    if "cv2" in sys.modules:
+        sys.modules["cv2"].setNumThreads(threads)
+
+    if "numpy" in sys.modules:
+        # Installed along with scikit-learn
+        from threadpoolctl import threadpool_limits
+
+        threadpool_limits(limits=threads)
+
+
+def run_with_thread_limit(threads: int, function: Callable[..., Any], *args: Any) -> Any:
+    """Runs a task in a worker process after limiting the threads it may use"""
+    limit_threads(threads)
+    return function(*args)
+
+
+class ResourceScheduler:
+    """
+    Owns the CPU budget of the pipeline. Stages ask it how many workers to run, and how many
+    threads each worker may use, so nested thread pools never add up to more than `cpus` threads.
+    """
+
+    def __init__(self, cpus: int = None) -> None:
+        self.__cpus = max(cpus or cpu_count() or 1, 1)
+
+    def get_cpus(self) -> int:
+        return self.__cpus
+
+    def split(self, tasks: int, max_workers: int = None) -> tuple[int, int]:
+        """Gets the number of concurrent workers for the tasks and the threads each one may use"""
+        workers = min(self.__cpus, max(tasks, 1), max_workers or self.__cpus)
+        return workers, max(self.__cpus // workers, 1)
+
+    def apply(self) -> None:
+        """Limits the current process to the whole budget"""
+        limit_threads(self.__cpus)
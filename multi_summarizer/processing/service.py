@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import json
+from uuid import uuid4
+from time import time
+from queue import Queue
+from threading import Lock, Thread
+from typing import Any, Callable
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from processing.utils import log, process_arguments
+
+# Job parameters that are not command line options of `process_arguments`
+LIST_PARAMETERS = ("videos",)
+# Seconds clients are told to wait before sending a job again when the queue is full
+RETRY_AFTER = 30
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue holds as many jobs as it accepts"""
+
+
+def parameters_to_argv(parameters: dict[str, Any]) -> list[str]:
+    """Converts job parameters named like the `process_arguments` options, e.g. `videos_path`, to its arguments"""
+    argv = []
+    for key, value in parameters.items():
+        option = f"--{key.replace('_', '-')}"
+        if value is None or value is False:
+            continue
+        if value is True:
+            argv.append(option)
+        elif key in LIST_PARAMETERS:
+            argv += [option, *[str(item) for item in value]]
+        elif isinstance(value, (list, tuple)):
+            argv += [option, ":".join(str(item) for item in value)]
+        else:
+            argv += [option, str(value)]
+    return argv
+
+
+def run_job(arguments: dict, cpus: int):
+    """Runs a summarization job in a service worker, which keeps its loaded models between jobs"""
+    from processing.tracing import tracing
+    from processing.memory import memory_monitoring
+    from processing.pipeline import PipelineReport, run_pipeline
+
+    arguments = dict(arguments)
+    report = PipelineReport(arguments["name"])
+    try:
+        with tracing(arguments.pop("trace", "")), memory_monitoring(
+            arguments.pop("memory_budget", None), arguments.pop("memory_report", False)
+        ):
+            return run_pipeline(**arguments, cpus=cpus, report=report)
+    except Exception as e:
+        report.status, report.error = "failed", str(e)
+        return report
+
+
+@dataclass
+class Job:
+    id: str
+    arguments: dict
+    status: str = "queued"
+    submitted: float = field(default_factory=time)
+    started: float = None
+    finished: float = None
+    output: str = ""
+    timings: dict[str, float] = field(default_factory=dict)
+    error: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.arguments["name"],
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "output": self.output,
+            "timings": self.timings,
+            "error": self.error,
+        }
+
+
+class SummarizationService:
+    """
+    Queue of summarization jobs run by `workers` long-lived processes, at most one job each.
+    Worker processes load the models once, when they start unless `warm_up` is off, and keep them
+    along with the frame and stage caches on disk for every job they run.
+    Jobs without a cache directory use the service one.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        cpus: int = None,
+        cache_dir: str = "",
+        max_queued: int = 100,
+        run: Callable[[dict, int], Any] = run_job,
+        warm_up: bool = True,
+    ) -> None:
+        from processing.scheduler import ResourceScheduler
+
+        self.__workers = workers
+        self.__job_cpus = max(ResourceScheduler(cpus).get_cpus() // workers, 1)
+        self.__cache_dir = cache_dir
+        self.__max_queued = max_queued
+        self.__run = run
+        self.__warm_up = warm_up
+        self.__jobs: dict[str, Job] = {}
+        self.__queue: Queue[Job | None] = Queue()
+        self.__lock = Lock()
+        self.__pool = None
+        self.__dispatchers: list[Thread] = []
+
+    def get_workers(self) -> int:
+        return self.__workers
+
+    def start(self) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+        from processing.models import warm_up_models
+
+        self.__pool = ProcessPoolExecutor(
+            max_workers=self.__workers,
+            initializer=warm_up_models if self.__warm_up else None,
+        )
+
+        # One dispatcher per worker, so a job is only taken from the queue when a worker is free
+        self.__dispatchers = [
+            Thread(target=self.__dispatch, daemon=True) for _ in range(self.__workers)
+        ]
+        for dispatcher in self.__dispatchers:
+            dispatcher.start()
+
+    def stop(self) -> None:
+        """Waits for the running jobs, queued ones are dropped"""
+        with self.__lock:
+            for job in self.__jobs.values():
+                if job.status == "queued":
+                    job.status, job.error = "cancelled", "Service stopped"
+        for _ in self.__dispatchers:
+            self.__queue.put(None)
+        for dispatcher in self.__dispatchers:
+            dispatcher.join()
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def submit(self, parameters: dict[str, Any]) -> Job:
+        """Validates the job parameters as `process_arguments` would and queues the job"""
+        if not isinstance(parameters, dict):
+            raise Exception("Job parameters must be an object")
+        arguments = process_arguments(parameters_to_argv(parameters))
+        arguments["cache_dir"] = arguments["cache_dir"] or self.__cache_dir
+        arguments.pop("cpus")
+
+        with self.__lock:
+            if self.count("queued") >= self.__max_queued:
+                raise QueueFullError(f"Too many queued jobs ({self.__max_queued})")
+            job = Job(id=uuid4().hex[:12], arguments=arguments)
+            self.__jobs[job.id] = job
+        self.__queue.put(job)
+        log(f"Queued job {job.id} for '{arguments['name']}'")
+        return job
+
+    def get_job(self, job_id: str) -> Job | None:
+        return self.__jobs.get(job_id)
+
+    def get_jobs(self) -> list[Job]:
+        return sorted(list(self.__jobs.values()), key=lambda job: job.submitted)
+
+    def count(self, status: str) -> int:
+        return sum(job.status == status for job in list(self.__jobs.values()))
+
+    def __dispatch(self) -> None:
+        while (job := self.__queue.get()) is not None:
+            with self.__lock:
+                if job.status != "queued":
+                    continue
+                job.status, job.started = "running", time()
+
+            try:
+                report = self.__pool.submit(self.__run, job.arguments, self.__job_cpus).result()
+                job.output, job.timings, job.error = report.output, report.timings, report.error
+                job.status = report.status
+            except Exception as e:
+                job.status, job.error = "failed", str(e)
+            job.finished = time()
+            log(
+                f"Job {job.id} {job.status} in {job.finished - job.started:.1f}s"
+                + (f": {job.error}" if job.error else ""),
+                log_type="ERROR" if job.status == "failed" else "INFO",
+            )
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of the service:
+    `POST /jobs` queues a job, `GET /jobs` and `GET /jobs/<id>` get their status and stage timings,
+    `GET /health` gets the queue state.
+    """
+
+    service: SummarizationService = None
+
+    def do_GET(self) -> None:
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self.__send(
+                200,
+                {
+                    "workers": self.service.get_workers(),
+                    "queued": self.service.count("queued"),
+                    "running": self.service.count("running"),
+                },
+            )
+        elif path == "/jobs":
+            self.__send(200, [job.to_dict() for job in self.service.get_jobs()])
+        elif path.startswith("/jobs/") and (job := self.service.get_job(path[6:])):
+            self.__send(200, job.to_dict())
+        else:
+            self.__send(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            self.__send(404, {"error": f"Not found: {self.path}"})
+            return
+
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            job = self.service.submit(json.loads(body or b"{}"))
+        except QueueFullError as e:
+            # Not an invalid job, clients should send it again later
+            self.__send(503, {"error": str(e)}, {"Retry-After": str(RETRY_AFTER)})
+            return
+        except Exception as e:
+            self.__send(400, {"error": str(e)})
+            return
+        self.__send(202, job.to_dict())
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Requests are only logged with the jobs they create
+        pass
+
+    def __send(self, code: int, content: Any, headers: dict[str, str] = None) -> None:
+        body = json.dumps(content).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(service: SummarizationService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    handler = type("Handler", (ServiceRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
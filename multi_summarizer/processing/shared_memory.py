@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+from numpy import ndarray, dtype as np_dtype, empty, concatenate, array
+
+# Offsets of arrays stored in a buffer are aligned to cache lines
+ALIGNMENT = 64
+
+# Shared memory blocks kept open by each process to read arrays from
+MAX_ATTACHED_BUFFERS = 32
+
+_attached_buffers: OrderedDict[str, SharedMemory] = OrderedDict()
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Handle of an array stored in a shared memory block, cheap to send to other processes"""
+
+    buffer: str
+    offset: int
+    shape: tuple[int, ...]
+    dtype: str
+
+    def get_nbytes(self) -> int:
+        size = np_dtype(self.dtype).itemsize
+        for dim in self.shape:
+            size *= dim
+        return size
+
+
+@dataclass(frozen=True)
+class SharedArrayList:
+    """Arrays with the same columns and dtype returned through shared memory as one stacked block"""
+
+    stacked: SharedArray
+    rows: tuple[int, ...]
+
+
+def _attach_buffer(name: str) -> SharedMemory:
+    if name in _attached_buffers:
+        _attached_buffers.move_to_end(name)
+        return _attached_buffers[name]
+
+    if len(_attached_buffers) >= MAX_ATTACHED_BUFFERS:
+        detach(next(iter(_attached_buffers)))
+    _attached_buffers[name] = SharedMemory(name=name)
+    return _attached_buffers[name]
+
+
+def attach(handle: SharedArray) -> ndarray:
+    """Gets a read-only view of a shared array, without copying it"""
+    buffer = _attach_buffer(handle.buffer)
+    view = ndarray(handle.shape, dtype=handle.dtype, buffer=buffer.buf, offset=handle.offset)
+    view.flags.writeable = False
+    return view
+
+
+def detach(name: str) -> None:
+    if name in _attached_buffers:
+        try:
+            _attached_buffers.pop(name).close()
+        except BufferError:
+            # Views of the block are still alive, it is unmapped once they are collected
+            pass
+
+
+def share_arrays(arrays: list[ndarray | None]) -> SharedArrayList:
+    """
+    Stacks arrays with the same columns in a new shared memory block, for workers to return them without pickling.
+    `None` items are kept as -1 rows. The block is freed by the process that calls `take_arrays`.
+    """
+    present = [a for a in arrays if a is not None]
+    stacked = concatenate(present) if present else empty((0,), dtype="float32")
+
+    block = SharedMemory(create=True, size=max(stacked.nbytes, 1))
+    ndarray(stacked.shape, dtype=stacked.dtype, buffer=block.buf)[...] = stacked
+    handle = SharedArray(block.name, 0, stacked.shape, stacked.dtype.str)
+    block.close()
+
+    return SharedArrayList(
+        stacked=handle,
+        rows=tuple(len(a) if a is not None else -1 for a in arrays),
+    )
+
+
+def take_arrays(shared: SharedArrayList) -> list[ndarray | None]:
+    """Copies the arrays out of a block created by `share_arrays` and frees it"""
+    block = SharedMemory(name=shared.stacked.buffer)
+    try:
+        stacked = array(
+            ndarray(shared.stacked.shape, dtype=shared.stacked.dtype, buffer=block.buf)
+        )
+    finally:
+        block.close()
+        block.unlink()
+
+    arrays, start = [], 0
+    for rows in shared.rows:
+        if rows < 0:
+            arrays.append(None)
+            continue
+        arrays.append(stacked[start : start + rows])
+        start += rows
+    return arrays
+
+
+class SharedBufferPool:
+    """
+    Shared memory blocks where arrays, such as decoded frames, are written once and read in place
+    by worker processes through `SharedArray` handles. `reset` reuses the blocks for the next batch.
+    """
+
+    def __init__(self, block_size: int = 64 * 1024 * 1024) -> None:
+        self.__block_size = block_size
+        self.__blocks: list[SharedMemory] = []
+        self.__current = 0
+        self.__offset = 0
+
+    def get_size(self) -> int:
+        return sum(block.size for block in self.__blocks)
+
+    def put(self, data: ndarray) -> SharedArray:
+        block, offset = self.__allocate(data.nbytes)
+        ndarray(data.shape, dtype=data.dtype, buffer=block.buf, offset=offset)[...] = data
+        return SharedArray(block.name, offset, data.shape, data.dtype.str)
+
+    def get(self, handle: SharedArray) -> ndarray:
+        return attach(handle)
+
+    def reset(self) -> None:
+        """Makes the whole pool available again, previous handles must not be used anymore"""
+        self.__current, self.__offset = 0, 0
+
+    def close(self) -> None:
+        for block in self.__blocks:
+            detach(block.name)
+            block.close()
+            block.unlink()
+        self.__blocks = []
+        self.reset()
+
+    def __allocate(self, nbytes: int) -> tuple[SharedMemory, int]:
+        # Using the first block from the current one with enough free space, or a new one
+        while self.__current < len(self.__blocks):
+            block = self.__blocks[self.__current]
+            if self.__offset + nbytes <= block.size:
+                offset = self.__offset
+                self.__offset += -(-nbytes // ALIGNMENT) * ALIGNMENT
+                return block, offset
+            self.__current, self.__offset = self.__current + 1, 0
+
+        self.__blocks.append(
+            SharedMemory(create=True, size=max(self.__block_size, nbytes, 1))
+        )
+        return self.__allocate(nbytes)
+
+    def __enter__(self) -> SharedBufferPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from numpy import (
+    abs as np_abs,
+    asarray,
+    float64,
+    flatnonzero,
+    maximum,
+    median,
+    minimum,
+    ndarray,
+    pad,
+    searchsorted,
+    where,
+)
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def histogram_intersections(histograms: ndarray) -> ndarray:
+    """Intersection of each normalized frame histogram with the next one, for all the frames at once"""
+    histograms = asarray(histograms).reshape(len(histograms), -1)
+    return minimum(histograms[:-1], histograms[1:]).sum(axis=1, dtype=float64)
+
+
+def adaptive_thresholds(
+    intersections: ndarray, window: int = 9, sensitivity: float = 3.0, min_drop: float = 0.1
+) -> ndarray:
+    """
+    Intersection under which each pair of frames is a cut, given the intersections around it: `sensitivity`
+    median absolute deviations under their median, and at least `min_drop` under it, over `window` pairs
+    """
+    if not len(intersections):
+        return intersections
+
+    half = window // 2
+    windows = sliding_window_view(pad(intersections, half, mode="edge"), 2 * half + 1)
+    local = median(windows, axis=1)
+    deviation = median(np_abs(windows - local[:, None]), axis=1)
+    return local - maximum(sensitivity * deviation, min_drop)
+
+
+def snap_to_cuts(seconds: ndarray, cut_seconds: ndarray, tolerance: float) -> ndarray:
+    """Moves each second to the nearest cut at most `tolerance` seconds away, leaving the others as they are"""
+    seconds = asarray(seconds, dtype=float64)
+    if not len(cut_seconds):
+        return seconds
+
+    cut_seconds = asarray(cut_seconds, dtype=float64)
+    after = searchsorted(cut_seconds, seconds).clip(max=len(cut_seconds) - 1)
+    before = (after - 1).clip(min=0)
+    nearest = where(
+        np_abs(cut_seconds[before] - seconds) <= np_abs(cut_seconds[after] - seconds),
+        cut_seconds[before],
+        cut_seconds[after],
+    )
+    return where(np_abs(nearest - seconds) <= tolerance, nearest, seconds)
+
+
+class ShotBoundaries:
+    """
+    Shot cuts of a video, detected in one pass over the intersections of its consecutive frame histograms.
+    A shot ends on a frame whose intersection with the next one is under a fixed threshold or, `adaptive`,
+    well under the intersections around it, which also finds the cuts between shots of similar tones.
+    """
+
+    def __init__(
+        self,
+        seconds: ndarray,
+        histograms: ndarray,
+        threshold: float = 0.7,
+        window: int = 9,
+        sensitivity: float = 3.0,
+        min_drop: float = 0.1,
+    ) -> None:
+        self.__seconds = asarray(seconds)
+        self.__threshold = threshold
+        self.__intersections = histogram_intersections(histograms)
+        self.__adaptive = adaptive_thresholds(self.__intersections, window, sensitivity, min_drop)
+
+    def get_seconds(self) -> ndarray:
+        return self.__seconds
+
+    def get_intersections(self) -> ndarray:
+        return self.__intersections
+
+    def get_cuts(self, threshold: float = None, adaptive: bool = True) -> ndarray:
+        """Indexes of the frames ending a shot, under `threshold`, the detector one when not given"""
+        threshold = self.__threshold if threshold is None else threshold
+        thresholds = maximum(self.__adaptive, threshold) if adaptive else threshold
+        return flatnonzero(self.__intersections < thresholds)
+
+    def get_cut_seconds(self, threshold: float = None, adaptive: bool = True) -> ndarray:
+        """Seconds of the first frame of every shot after the first one"""
+        return self.__seconds[self.get_cuts(threshold, adaptive) + 1]
+
+    def get_first_shot_end(self, threshold: float = None, adaptive: bool = False) -> float:
+        """Second of the last frame of the first shot, the last frame of the video when it has a single shot"""
+        cuts = self.get_cuts(threshold, adaptive)
+        return float(self.__seconds[cuts[0]] if len(cuts) else self.__seconds[-1])
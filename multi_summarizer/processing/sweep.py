@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import json
+from math import ceil
+from itertools import product
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from processing.utils import log
+from processing.cache import fingerprint
+from summarizers.hsmvideosumm import SummaryParameters
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from processing.dataset import Dataset
+    from processing.frame_stream import FrameFeatureTable
+
+# Columns of the sweep table, as (SummaryParameters field, header)
+PARAMETER_COLUMNS = (
+    ("intro_threshold", "intro"),
+    ("keypoints_diff_ratio", "kp ratio"),
+    ("descriptors_diff_ratio", "desc ratio"),
+    ("dict_size", "dict"),
+    ("base_threshold", "threshold"),
+    ("reference_duration", "ref dur"),
+)
+
+# Inputs of the combinations evaluated by the current process, set once per worker
+_context: SweepContext | None = None
+
+
+@dataclass
+class SweepContext:
+    """Inputs shared by every combination of a sweep: the video set, its frame features and the stage cache"""
+
+    dataset: Dataset
+    content_format: str
+    frames_dir: str
+    frame_features: FrameFeatureTable
+    cache_dir: str
+    compute_engine: str = "reference"
+    quality_mode: str = "bovw"
+
+
+@dataclass
+class SweepResult:
+    """Summary plan given by a combination of parameters and the seconds it took"""
+
+    parameters: SummaryParameters
+    seconds: float = 0.0
+    plan: dict = field(default_factory=dict)
+    status: str = "done"
+    error: str = ""
+
+    def get_plan_id(self) -> str:
+        """Short hash of the selected segments, the same for combinations giving the same summary"""
+        if not self.plan:
+            return "-"
+        return fingerprint(
+            [(entry["video"], entry["begin"], entry["end"]) for entry in self.plan["segments"]]
+        )[:8]
+
+    def to_dict(self) -> dict:
+        return {
+            "parameters": self.parameters.to_dict(),
+            "seconds": self.seconds,
+            "plan_id": self.get_plan_id(),
+            "plan": self.plan,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+def parameter_grid(**values: list) -> list[SummaryParameters]:
+    """
+    Every combination of the given values of `SummaryParameters` fields, the other fields keeping their defaults.
+    Combinations sharing their first parameters are next to each other, so they share more cached results.
+    """
+    names = list(values)
+    return [
+        SummaryParameters(**dict(zip(names, combination)))
+        for combination in product(*values.values())
+    ]
+
+
+def set_sweep_context(context: SweepContext, cpus: int = None) -> None:
+    """Sets up a process evaluating combinations: its inputs, CPU budget and models"""
+    from processing.models import warm_up_models
+    from processing.scheduler import ResourceScheduler
+
+    global _context
+    _context = context
+    if cpus is not None:
+        ResourceScheduler(cpus).apply()
+    warm_up_models()
+
+
+def evaluate_parameters(parameters: SummaryParameters) -> SweepResult:
+    """
+    Summarizes the video set of the sweep with a combination of parameters, from the shared frame features.
+    Stage results are shared with the other combinations through the stage cache, so only the stages whose
+    parameters changed run again. A failure is recorded in the result instead of stopping the sweep.
+    """
+    from processing.cache import StageCache
+    from processing.dataset import DatasetLoader
+    from summarizers.hsmvideosumm import HSMVideoSumm
+
+    result = SweepResult(parameters)
+    start = perf_counter()
+    try:
+        summarizer = HSMVideoSumm(
+            # Stages remove segments from the videos, so every combination starts from fresh ones
+            videos=DatasetLoader(_context.dataset, content_format=_context.content_format).load_videos(),
+            summary_name=_context.dataset.name,
+            frames_path=_context.frames_dir,
+            frame_features=_context.frame_features,
+            stage_cache=StageCache(_context.cache_dir),
+            compute_engine=_context.compute_engine,
+            quality_mode=_context.quality_mode,
+            parameters=parameters,
+        )
+        summarizer.summarize()
+        result.plan = summarizer.get_summary_plan().to_dict()
+    except Exception as e:
+        log(f"Summarizing with {parameters} failed: {e}", log_type="ERROR")
+        result.status, result.error = "failed", str(e)
+    result.seconds = perf_counter() - start
+    return result
+
+
+def format_sweep_table(results: list[SweepResult]) -> str:
+    lines = [
+        "".join(f"{header:>11}" for _, header in PARAMETER_COLUMNS)
+        + f"{'plan':>10}{'segments':>10}{'duration':>10}{'seconds':>10}  status"
+    ]
+    for result in results:
+        parameters = result.parameters.to_dict()
+        lines.append(
+            "".join(f"{parameters[name]:>11g}" for name, _ in PARAMETER_COLUMNS)
+            + f"{result.get_plan_id():>10}"
+            + f"{len(result.plan.get('segments', [])):>10}"
+            + f"{result.plan.get('duration', 0):>10}"
+            + f"{result.seconds:>10.1f}  {result.status}"
+        )
+    return "\n".join(lines)
+
+
+def run_sweep(
+    name: str,
+    path: str,
+    videos: list[str],
+    grid: list[SummaryParameters],
+    output: str = "",
+    content_format: str = "json",
+    jobs: int = 1,
+    cpus: int = None,
+    cache_dir: str = "",
+    sample_fps: float = 1.0,
+    compute_engine: str = "reference",
+    quality_mode: str = "bovw",
+) -> list[SweepResult]:
+    """
+    Summarizes a video set with every combination of parameters of the `grid`, `jobs` combinations at a time.
+    Frames are extracted and analyzed once for all of them, and each stage result is computed once for all the
+    combinations sharing the parameters it depends on, through the stage cache in `cache_dir`, a temporary one
+    when not given. Saves the plans and timings of every combination to `output` as JSON.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from processing.cache import StageCache
+    from processing.executor import TaskExecutor
+    from processing.scheduler import ResourceScheduler
+    from components.frame import ExtractionSettings
+    from processing.frame_cache import FrameCache
+    from processing.dataset import Dataset, DatasetLoader
+    from processing.frame_stream import FrameStream, default_analyzers
+
+    scheduler = ResourceScheduler(cpus)
+    scheduler.apply()
+    jobs = min(jobs, len(grid))
+    dataset = Dataset(name=name, path=path, videos=videos, extraction=ExtractionSettings(fps=sample_fps))
+    log(f"Sweeping {len(grid)} parameter combinations on {name}, {jobs} at a time")
+
+    with TemporaryDirectory() if not cache_dir else nullcontext(cache_dir) as cache_dir:
+        # Computing the features every combination is evaluated from once
+        start = perf_counter()
+        dataset_loader = DatasetLoader(dataset, content_format=content_format)
+        frames_dir = dataset_loader.save_video_frames(FrameCache())
+        with TaskExecutor(scheduler) as executor:
+            frame_features = FrameStream(default_analyzers(quality_mode), executor=executor).process(
+                dataset_loader.load_videos(), frames_dir, cache=StageCache(cache_dir)
+            )
+        features_seconds = perf_counter() - start
+        log(f"Frame features computed in {features_seconds:.1f}s")
+
+        context = SweepContext(
+            dataset,
+            content_format,
+            frames_dir,
+            frame_features,
+            cache_dir,
+            compute_engine,
+            quality_mode,
+        )
+        start = perf_counter()
+        if jobs == 1:
+            set_sweep_context(context)
+            results = [evaluate_parameters(parameters) for parameters in grid]
+        else:
+            # Handing each worker a run of neighbouring combinations, which share most of their stages
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=set_sweep_context,
+                initargs=(context, max(scheduler.get_cpus() // jobs, 1)),
+            ) as pool:
+                results = list(
+                    pool.map(evaluate_parameters, grid, chunksize=ceil(len(grid) / jobs))
+                )
+        sweep_seconds = perf_counter() - start
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "name": name,
+                    "features_seconds": features_seconds,
+                    "sweep_seconds": sweep_seconds,
+                    "jobs": jobs,
+                    "results": [result.to_dict() for result in results],
+                },
+                f,
+                ensure_ascii=False,
+                indent=4,
+            )
+
+    log(f"Sweep results:\n{format_sweep_table(results)}")
+    plans = len({result.get_plan_id() for result in results if result.status == "done"})
+    log(
+        f"Evaluated {len(grid)} combinations giving {plans} different plans in {sweep_seconds:.1f}s, "
+        f"after {features_seconds:.1f}s of shared frame features"
+        + (f", results saved to {output}" if output else "")
+    )
+    return results
@@ -1,14 +1,22 @@
 from __future__ import annotations
 
-import nltk
 from re import sub
 from math import log10
 from typing import Any
 from itertools import chain
 from abc import ABC, abstractmethod
-from pandas import read_pickle, DataFrame, MultiIndex
-from sklearn.feature_extraction.text import TfidfVectorizer
-from google.cloud.language_v1.types import AnalyzeSentimentResponse
+from pandas import read_pickle, DataFrame, MultiIndex, Series
+
+from processing.tracing import traced
+from processing.models import load_stemmer, load_stopwords
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.cloud.language_v1.types import AnalyzeSentimentResponse
+
+# Characters that make the words `str.count` looks for match more than themselves
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
 
 
 class BagOfWordsProcessing:
@@ -18,10 +26,10 @@ class BagOfWordsProcessing:
         self.__stemmer = None
 
     def __load_nltk_stopwords(self, language="portuguese") -> None:
-        self.__stopwords = nltk.corpus.stopwords.words(language)
+        self.__stopwords = load_stopwords(language)
 
     def __load_nltk_stemmer(self) -> None:
-        self.__stemmer = nltk.stem.RSLPStemmer()
+        self.__stemmer = load_stemmer()
 
     def __replace_pattern(self, pattern: str = "", replace: str = "") -> None:
         self.__text = sub(pattern, replace, self.__text)
@@ -69,6 +77,7 @@ class BagOfWords:
             self.__items[key] = BagOfWordsProcessing(text).base_text_processing()
         return self
 
+    @traced("bow_dataframe", "compute")
     def generate_bow_dataframe(self, index_names: list) -> BagOfWords:
         # Generating list of words among all sentences
         self.__calc_words_list()
@@ -111,7 +120,107 @@ class BagOfWords:
 
         return self.__bow_df
 
+    @traced("bow_dataframe_fast", "compute")
+    def generate_bow_dataframe_fast(self, index_names: list) -> DataFrame:
+        """
+        Same TF-IDF weights as `generate_bow_dataframe`, counting the words of all the sentences in one pass.
+        Words hold no spaces, so the count of a word in a sentence is the sum of its counts in the sentence
+        tokens, and only the substrings of each distinct token need to be looked up among the words.
+        """
+        from numpy import array, zeros
+
+        self.__calc_words_list()
+
+        # `str.count` takes words as regular expressions, which only match literally without metacharacters
+        if any(REGEX_METACHARACTERS.intersection(word) for word in self.__word_list):
+            return self.generate_bow_dataframe(index_names)
+
+        words = sorted(self.__word_list)
+        word_indexes = {word: i for i, word in enumerate(words)}
+        token_counts = {}
+
+        def count_token_words(token: str) -> list[tuple[int, int]]:
+            substrings = {
+                token[start:end]
+                for start in range(len(token))
+                for end in range(start + 1, len(token) + 1)
+            }
+            return [(word_indexes[word], token.count(word)) for word in substrings if word in word_indexes]
+
+        # Counting the occurrences of every word in every sentence
+        sentences = list(self.__items.values())
+        term_freq = zeros((len(sentences), len(words)), dtype=int)
+        for row, sentence in enumerate(sentences):
+            for token in sentence.split():
+                if token not in token_counts:
+                    token_counts[token] = count_token_words(token)
+                for column, occurrences in token_counts[token]:
+                    term_freq[row, column] += occurrences
+
+        # Calculating TF-IDF weight
+        n_sentences = len(sentences)
+        term_idf = array([log10(n_sentences / doc_freq) for doc_freq in (term_freq > 0).sum(axis=0)])
+        weights = term_freq * term_idf
+
+        # Normalizing values, replacing 0 magnitudes with 1 to avoid 0 division
+        sentences_magnitude = (weights**2).sum(axis=1) ** 0.5
+        sentences_magnitude[sentences_magnitude == 0] = 1
+
+        self.__bow_df = DataFrame(
+            weights / sentences_magnitude[:, None],
+            index=MultiIndex.from_tuples(list(self.__items.keys()), names=index_names),
+            columns=words,
+        )
+        return self.__bow_df
+
+    def estimate_dataframe_size(self) -> int:
+        """Bytes of the dense DataFrame `generate_bow_dataframe` builds, a float per (item, word)"""
+        self.__calc_words_list()
+        return len(self.__items) * len(self.__word_list) * 8
+
+    @traced("bow_dataframe_sparse", "compute")
+    def generate_sparse_bow_dataframe(self, index_names: list) -> DataFrame:
+        """
+        Same TF-IDF weights as `generate_bow_dataframe`, computed one word at a time into a sparse
+        DataFrame, so only the nonzero weights are ever held instead of an (items x words) matrix
+        """
+        from numpy import concatenate, sqrt
+        from scipy.sparse import csc_matrix
+
+        self.__calc_words_list()
+        sentences = Series(list(self.__items.values()), dtype=object)
+        n_sentences = len(sentences)
+        words = sorted(self.__word_list)
+
+        # Calculating TF-IDF weight as the columns of a sparse matrix
+        data, rows, pointers = [], [], [0]
+        for w in words:
+            term_freq = sentences.str.count(w).to_numpy()
+            in_sentences = term_freq.nonzero()[0]
+            if len(in_sentences):
+                data.append(term_freq[in_sentences] * log10(n_sentences / len(in_sentences)))
+                rows.append(in_sentences)
+            pointers.append(pointers[-1] + len(in_sentences))
+        matrix = csc_matrix(
+            (concatenate(data or [[]]), concatenate(rows or [[]]), pointers),
+            shape=(n_sentences, len(words)),
+        )
+
+        # Normalizing values, replacing 0 magnitudes with 1 to avoid 0 division
+        sentences_magnitude = sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+        sentences_magnitude[sentences_magnitude == 0] = 1
+        matrix.data = matrix.data / sentences_magnitude[matrix.indices]
+
+        self.__bow_df = DataFrame.sparse.from_spmatrix(
+            matrix,
+            index=MultiIndex.from_tuples(list(self.__items.keys()), names=index_names),
+            columns=words,
+        )
+        return self.__bow_df
+
     def generate_bow_dataframe_tfidfvectorizer(self, index_names: list) -> BagOfWords:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
         vectorizer = TfidfVectorizer(use_idf=True, smooth_idf=False)
 
         sentences = list(chain(self.__items.values()))
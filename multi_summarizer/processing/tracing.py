@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import json
+from os import getpid
+from os.path import splitext
+from functools import wraps
+from threading import Lock, get_ident, local
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from time import perf_counter_ns, time_ns
+from typing import Any, Callable, Iterator
+
+from processing.utils import log
+
+# Tracer of the current process, spans and counters are only recorded while it is set
+_tracer: Tracer | None = None
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    category: str
+    stack: str
+    start: int
+    duration: int
+    self_time: int
+    pid: int
+    tid: int
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer:
+    """
+    Nested wall time spans and named counters of a run, exportable as a Chrome trace
+    (chrome://tracing, Perfetto or speedscope) and as folded stacks for flamegraph tools.
+    Times are in nanoseconds, span starts on the wall clock so spans of worker processes line up.
+    """
+
+    def __init__(self, parents: tuple[str, ...] = ()) -> None:
+        self.__parents = tuple(parents)
+        self.__spans: list[SpanRecord] = []
+        self.__counters: dict[str, int] = {}
+        self.__samples: list[tuple[int, int, str, int]] = []
+        self.__lock = Lock()
+        self.__local = local()
+
+    def __get_stack(self) -> list[list]:
+        if not hasattr(self.__local, "stack"):
+            self.__local.stack = []
+        return self.__local.stack
+
+    def get_path(self) -> tuple[str, ...]:
+        """Names of the open spans of the calling thread, from the outermost one"""
+        parents = getattr(self.__local, "parents", self.__parents)
+        return parents + tuple(name for name, _ in self.__get_stack())
+
+    def adopt(self, path: tuple[str, ...]) -> None:
+        """Nests the spans of the calling thread, e.g. a new one, under the given span path"""
+        self.__local.parents = tuple(path)
+
+    def get_spans(self) -> list[SpanRecord]:
+        return self.__spans
+
+    def get_counters(self) -> dict[str, int]:
+        return self.__counters
+
+    @contextmanager
+    def span(self, name: str, category: str, args: dict[str, Any]) -> Iterator[None]:
+        stack = self.__get_stack()
+        path = ";".join(self.get_path() + (name,))
+        stack.append([name, 0])
+        start, begin = time_ns(), perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = perf_counter_ns() - begin
+            _, children = stack.pop()
+            if stack:
+                stack[-1][1] += duration
+            record = SpanRecord(
+                name, category, path, start, duration, duration - children, getpid(), get_ident(), args
+            )
+            with self.__lock:
+                self.__spans.append(record)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.__lock:
+            total = self.__counters.get(name, 0) + value
+            self.__counters[name] = total
+            self.__samples.append((time_ns(), getpid(), name, total))
+
+    def drain(self) -> tuple[list[SpanRecord], dict[str, int]]:
+        """Takes the recorded spans and counters, e.g. to send them from a worker process"""
+        with self.__lock:
+            spans, counters = self.__spans, self.__counters
+            self.__spans, self.__counters, self.__samples = [], {}, []
+        return spans, counters
+
+    def merge(self, spans: list[SpanRecord], counters: dict[str, int]) -> None:
+        with self.__lock:
+            self.__spans.extend(spans)
+        for name, value in counters.items():
+            self.count(name, value)
+
+    def to_chrome_trace(self) -> dict:
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start / 1000,
+                "dur": span.duration / 1000,
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": span.args,
+            }
+            for span in self.__spans
+        ]
+        events += [
+            {"name": name, "ph": "C", "ts": ts / 1000, "pid": pid, "tid": 0, "args": {name: total}}
+            for ts, pid, name, total in self.__samples
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"counters": self.__counters}}
+
+    def export_chrome_trace(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def export_folded(self, path: str) -> None:
+        """Writes the self time of each stack in microseconds, the input of flamegraph.pl and speedscope"""
+        stacks: dict[str, int] = {}
+        for span in self.__spans:
+            stacks[span.stack] = stacks.get(span.stack, 0) + span.self_time
+        with open(path, "w") as f:
+            for stack, self_time in sorted(stacks.items()):
+                f.write(f"{stack} {self_time // 1000}\n")
+
+    def summary(self, limit: int = 30) -> str:
+        """Table of the spans with the most total time, with their calls and self time, and the counters"""
+        totals: dict[tuple[str, str], list] = {}
+        for span in self.__spans:
+            total = totals.setdefault((span.category, span.name), [0, 0, 0, 0])
+            total[0] += 1
+            total[1] += span.duration
+            total[2] += span.self_time
+            total[3] = max(total[3], span.duration)
+
+        lines = [f"{'span':40} {'category':10} {'calls':>7} {'total s':>9} {'self s':>9} {'max s':>8}"]
+        for (category, name), (calls, total, self_time, longest) in sorted(
+            totals.items(), key=lambda item: -item[1][1]
+        )[:limit]:
+            lines.append(
+                f"{name[:40]:40} {category:10} {calls:>7} {total / 1e9:>9.2f} "
+                f"{self_time / 1e9:>9.2f} {longest / 1e9:>8.2f}"
+            )
+        lines += [f"{name:51} {value:>16}" for name, value in sorted(self.__counters.items())]
+        return "\n".join(lines)
+
+
+def enable_tracing(parents: tuple[str, ...] = ()) -> Tracer:
+    global _tracer
+    _tracer = Tracer(parents)
+    return _tracer
+
+
+def disable_tracing() -> None:
+    global _tracer
+    _tracer = None
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+@contextmanager
+def tracing(path: str) -> Iterator[Tracer | None]:
+    """
+    Traces the block when a path is given, then saves the Chrome trace to it, the folded stacks
+    next to it and logs the summary table, also when the block fails
+    """
+    if not path:
+        yield None
+        return
+
+    tracer = enable_tracing()
+    try:
+        yield tracer
+    finally:
+        disable_tracing()
+        folded_path = f"{splitext(path)[0]}.folded"
+        tracer.export_chrome_trace(path)
+        tracer.export_folded(folded_path)
+        log(f"Trace saved to {path} and {folded_path}\n{tracer.summary()}")
+
+
+@contextmanager
+def span(name: str, category: str = "function", **args: Any) -> Iterator[None]:
+    """Records the wall time of the block as a span, nested in the open spans of the thread"""
+    if _tracer is None:
+        yield
+        return
+    with _tracer.span(name, category, args):
+        yield
+
+
+def traced(name: str = None, category: str = "function") -> Callable:
+    """Decorator recording every call of the function as a span"""
+
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.span(span_name, category, {}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_path() -> tuple[str, ...]:
+    return _tracer.get_path() if _tracer is not None else ()
+
+
+def adopt_path(path: tuple[str, ...]) -> None:
+    if _tracer is not None:
+        _tracer.adopt(path)
+
+
+def count(name: str, value: int = 1) -> None:
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def run_traced(
+    parents: tuple[str, ...], function: Callable[..., Any], *args: Any
+) -> tuple[Any, tuple[list[SpanRecord], dict[str, int]]]:
+    """Runs a task in a worker process with its own tracer, returning the result along with what it recorded"""
+    global _tracer
+    previous, _tracer = _tracer, Tracer(parents)
+    try:
+        return function(*args), _tracer.drain()
+    finally:
+        _tracer = previous
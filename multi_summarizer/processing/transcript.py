@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+from re import sub
+from typing import IO, Any, Iterator
+from os.path import getsize, splitext
+from concurrent.futures import ThreadPoolExecutor
+
+from processing.tracing import span
+from processing.utils import parse_timestamp
+
+# Transcript lines are (begin second, end second, content) tuples
+TranscriptLine = tuple[int, int, str]
+
+# Content files bigger than this are parsed item by item instead of with a single `json.load`
+STREAMING_THRESHOLD = 8 * 1024 * 1024
+
+
+def iter_json_array(file: IO[str], chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """Yields the items of a top-level JSON array one at a time, reading the file in chunks"""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def read_more() -> None:
+        nonlocal buffer, position, eof
+        chunk = file.read(chunk_size)
+        buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+
+    def next_char(skip: str) -> str:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in skip:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if eof:
+                raise Exception("Unexpected end of transcript JSON")
+            read_more()
+
+    if next_char(" \t\r\n") != "[":
+        raise Exception("Transcript JSON must be an array")
+    position += 1
+
+    while next_char(" \t\r\n,") != "]":
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+
+        # Items ending exactly at the buffer limit may still continue in the next chunk
+        if end == len(buffer) and not eof:
+            read_more()
+            continue
+
+        position = end
+        yield item
+
+
+def read_json_transcript(path: str) -> Iterator[TranscriptLine]:
+    with open(path, encoding="utf-8") as f:
+        items = iter_json_array(f) if getsize(path) > STREAMING_THRESHOLD else json.load(f)
+        for obj in items:
+            yield (
+                parse_timestamp(obj.get("begin")),
+                parse_timestamp(obj.get("end")),
+                obj.get("content"),
+            )
+
+
+def iter_cues(file: IO[str]) -> Iterator[list[str]]:
+    """Yields the non-empty lines of each blank-line separated block of a subtitle file"""
+    block = []
+    for line in file:
+        line = line.strip().lstrip("\ufeff")
+        if line:
+            block.append(line)
+        elif block:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def parse_cue(block: list[str]) -> TranscriptLine | None:
+    """Parses a SRT/WebVTT cue block, ignoring its optional identifier line and cue settings"""
+    for i, line in enumerate(block):
+        if "-->" in line:
+            begin, end = line.split("-->")
+            content = " ".join(block[i + 1 :])
+            return (
+                parse_timestamp(begin),
+                parse_timestamp(end.split()[0]),
+                sub("<[^>]+>", "", content),
+            )
+    return None
+
+
+def read_subtitle_transcript(path: str) -> Iterator[TranscriptLine]:
+    with open(path, encoding="utf-8") as f:
+        for block in iter_cues(f):
+            # Skipping WebVTT header, notes and style blocks
+            if block[0].startswith(("WEBVTT", "NOTE", "STYLE", "REGION")):
+                continue
+            cue = parse_cue(block)
+            if cue is not None:
+                yield cue
+
+
+TRANSCRIPT_READERS = {
+    "json": read_json_transcript,
+    "srt": read_subtitle_transcript,
+    "vtt": read_subtitle_transcript,
+}
+
+
+def read_transcript(path: str) -> list[TranscriptLine]:
+    """Reads a transcript file, choosing the reader by the file extension"""
+    file_ext = splitext(path)[1].lstrip(".").lower()
+    if file_ext not in TRANSCRIPT_READERS:
+        raise Exception(f"Unsupported transcript format '{file_ext}'")
+    return list(TRANSCRIPT_READERS[file_ext](path))
+
+
+def load_transcripts(paths: list[str], max_workers: int = 8) -> list[list[TranscriptLine]]:
+    """Reads many transcript files concurrently, keeping the results in the given order"""
+    with span("load_transcripts", "io", files=len(paths)):
+        if len(paths) < 2 or max_workers < 2:
+            return [read_transcript(path) for path in paths]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+            return list(executor.map(read_transcript, paths))
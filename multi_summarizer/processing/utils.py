@@ -1,9 +1,14 @@
 import time
 import argparse
 from typing import Iterable
-from os import listdir, mkdir
+from functools import lru_cache
+from os import listdir, makedirs, mkdir
 from datetime import datetime, timedelta
-from os.path import join, exists, normpath, basename, dirname
+from os.path import join, exists, normpath, basename, dirname, splitext
+
+# Implementations of the similarity computations, the fast ones giving the same results up to rounding
+COMPUTE_ENGINES = ["reference", "fast"]
+QUALITY_MODES = ["bovw", "frames"]
 
 
 def log(message: str, log_type: str = "INFO", log_file: str = "logs.txt") -> None:
@@ -20,9 +25,18 @@ def custom_cosine(v1: Iterable, v2: Iterable):
     return sum(v1[i] * v2[i] for i in range(len(v1)))
 
 
-def process_arguments() -> tuple[str, str, list[str]]:
-    """Parses project call parameters"""
-    parser = argparse.ArgumentParser()
+def raise_argument_error(message: str) -> None:
+    raise Exception(f"Invalid arguments: {message}")
+
+
+def process_arguments(argv: list[str] = None) -> dict:
+    """Parses project call parameters, from the command line or from `argv` when given"""
+    # Arguments given by a caller, e.g. for jobs sent to the service, must name options exactly and can't
+    # ask for the help, which would print it and exit
+    parser = argparse.ArgumentParser(add_help=argv is None, allow_abbrev=argv is None)
+    if argv is not None:
+        # Reporting errors to the caller instead of exiting
+        parser.error = raise_argument_error
 
     parser.add_argument(
         "-vp",
@@ -43,50 +57,691 @@ def process_arguments() -> tuple[str, str, list[str]]:
         help="Output file name of the summarized video",
     )
     parser.add_argument("-v", "--videos", action="append", nargs="+")
-    args = parser.parse_args()
+    parser.add_argument(
+        "-cf",
+        "--content-format",
+        default="json",
+        choices=["json", "srt", "vtt"],
+        help="Transcript file format of the videos. Default is json",
+    )
+    parser.add_argument(
+        "-p",
+        "--plan",
+        default="",
+        help="Saves the summary plan (selected segments) to this JSON or .edl file",
+    )
+    parser.add_argument(
+        "--plan-only",
+        action="store_true",
+        help="Only saves the summary plan, skipping the video rendering",
+    )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Renders the summary as a HLS playlist, playable while the next segments are rendered",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache-dir",
+        default="",
+        help="Directory where stage results are cached, so reruns resume from the first changed stage",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="Number of CPUs shared by all the pipeline stages. Default is all the CPUs",
+    )
+    parser.add_argument(
+        "--sample-fps",
+        type=float,
+        default=1.0,
+        help="Frames per second extracted from the videos for image analysis. Default is 1",
+    )
+    parser.add_argument(
+        "--analysis-height",
+        type=int,
+        default=None,
+        help="Height the extracted frames are scaled to. Default is the video height",
+    )
+    parser.add_argument(
+        "--roi",
+        default="",
+        help="Region of the videos frames are extracted from, as x:y:width:height in pixels",
+    )
+    parser.add_argument(
+        "--frames-budget",
+        default="",
+        help="Disk budget of the extracted frames cache, as bytes or with a K/M/G/T suffix. "
+        "Least recently used videos are evicted to keep under it",
+    )
+    parser.add_argument(
+        "-q",
+        "--queue-dir",
+        default="",
+        help="Shared job queue directory. The frames of every video are extracted and analyzed by the "
+        "worker.py processes serving it, the stage cache defaults to its cache folder",
+    )
+    parser.add_argument(
+        "--trace",
+        default="",
+        help="Saves a Chrome trace JSON of the run (chrome://tracing, Perfetto), folded stacks for "
+        "flamegraphs next to it, and logs a table of the slowest spans",
+    )
+    parser.add_argument(
+        "--compute-engine",
+        default="reference",
+        choices=COMPUTE_ENGINES,
+        help="Implementation of the text and keyframe similarity computations and of the chronological "
+        "ordering. The fast one is checked against the reference one by benchmarks/equivalence.py. "
+        "Default is reference",
+    )
+    parser.add_argument(
+        "--quality-mode",
+        default="bovw",
+        choices=QUALITY_MODES,
+        help="How the best segment of each redundancy cluster is chosen: bovw ranks the Bag of Visual Words "
+        "of the SIFT keyframes, frames the sharpness, exposure and motion of the frames, much faster. "
+        "Default is bovw",
+    )
+    parser.add_argument(
+        "--snap-to-cuts",
+        type=float,
+        default=0.0,
+        help="Moves the begin and end of the summary segments to the shot cuts of their videos at most "
+        "this many seconds away, so the summary cuts where its sources do. Default is 0, not moving them",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        default="",
+        help="Memory budget of the run, as bytes or with a K/M/G/T suffix. Stages switch to their "
+        "chunked or sparse variants to keep under it, and fail with a report when they cannot",
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help="Logs the peak memory of every stage and the size of its largest structures, "
+        "tracing Python allocations too (slower)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.cpus is not None and args.cpus < 1:
+        raise Exception("The number of CPUs must be at least 1")
+
+    if args.sample_fps <= 0:
+        raise Exception("The frame sampling rate must be positive")
+
+    if args.analysis_height is not None and args.analysis_height < 1:
+        raise Exception("The analysis height must be at least 1 pixel")
+
+    if args.snap_to_cuts < 0:
+        raise Exception("The shot cuts snapping tolerance must not be negative")
+
+    try:
+        roi = tuple(int(value) for value in args.roi.split(":")) if args.roi else None
+    except ValueError:
+        roi = ()
+    if roi is not None and (len(roi) != 4 or min(roi[2:]) < 1 or min(roi[:2]) < 0):
+        raise Exception(f"Invalid region of interest '{args.roi}', expected x:y:width:height")
 
     video_set_name = args.name if args.name else basename(normpath(args.videos_path))
     output = args.output if args.output else join("results", f"{video_set_name}.mp4")
+    plan = args.plan
+    if args.plan_only and not plan:
+        plan = f"{splitext(output)[0]}.plan.json"
 
     # Creating output directory if not exists
     output_directory = dirname(output)
     if not exists(output_directory):
         mkdir(output_directory)
 
+    videos_list = list_dataset_videos(args.videos_path, args.videos[0] if args.videos else None)
+
+    return {
+        "name": video_set_name,
+        "path": (args.videos_path),
+        "videos": videos_list,
+        "output": output,
+        "content_format": args.content_format,
+        "plan": plan,
+        "plan_only": args.plan_only,
+        "stream": join(splitext(output)[0], "index.m3u8") if args.stream else "",
+        "cache_dir": args.cache_dir,
+        "cpus": args.cpus,
+        "sample_fps": args.sample_fps,
+        "analysis_height": args.analysis_height,
+        "roi": roi,
+        "frames_budget": parse_size(args.frames_budget) if args.frames_budget else None,
+        "queue_dir": args.queue_dir,
+        "trace": args.trace,
+        "compute_engine": args.compute_engine,
+        "quality_mode": args.quality_mode,
+        "snap_to_cuts": args.snap_to_cuts,
+        "memory_budget": parse_size(args.memory_budget) if args.memory_budget else None,
+        "memory_report": args.memory_report,
+    }
+
+
+def list_dataset_videos(videos_path: str, videos: list[str] = None) -> list[str]:
+    """Validates a video set folder and the videos to summarize from it, all of them when none are given"""
     # Checking for videos dataset path
-    if not exists(args.videos_path):
-        raise Exception(f"Video dataset '{args.videos_path}' not found")
+    if not exists(videos_path):
+        raise Exception(f"Video dataset '{videos_path}' not found")
 
     # Using all videos in directory if none passed by parameter
     videos_list = (
-        args.videos[0]
-        if args.videos
-        else [video for video in listdir(args.videos_path) if not video.startswith(".")]
+        videos
+        if videos
+        else [video for video in listdir(videos_path) if not video.startswith(".")]
     )
 
     # Validating if there're at least two videos to summarize
     if len(videos_list) < 2:
         raise Exception(
-            f"Not enough videos to summarize. At least two videos are required"
+            f"Not enough videos to summarize in '{videos_path}'. At least two videos are required"
         )
 
     # Validating if all videos passed exist in directory
-    if any(
-        not exists(join(args.videos_path, video, f"{video}.mp4"))
-        for video in videos_list
-    ):
-        raise Exception(f"Non existing video passed")
+    if any(not exists(join(videos_path, video, f"{video}.mp4")) for video in videos_list):
+        raise Exception(f"Non existing video passed for '{videos_path}'")
+
+    return videos_list
+
+
+def read_dataset_manifest(manifest: str) -> list[str]:
+    """Reads a batch manifest, one video set folder per line, relative to the manifest folder"""
+    if not exists(manifest):
+        raise Exception(f"Batch manifest '{manifest}' not found")
+
+    with open(manifest) as f:
+        lines = [line.split("#", 1)[0].strip() for line in f]
+    return [normpath(join(dirname(manifest), line)) for line in lines if line]
+
+
+def process_batch_arguments() -> dict:
+    """Parses batch entry point call parameters"""
+    parser = argparse.ArgumentParser(
+        description="Summarizes many video sets, reusing the loaded models between them"
+    )
+
+    parser.add_argument(
+        "datasets",
+        nargs="*",
+        help="Paths of the video set folders to summarize",
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        default="",
+        help="File listing a video set folder per line, '#' starts a comment",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        default="results",
+        help="Directory of the summaries, named after their video sets. Default is results",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of video sets summarized at the same time. Default is 1",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="Number of CPUs shared by all the jobs. Default is all the CPUs",
+    )
+    parser.add_argument(
+        "-cf",
+        "--content-format",
+        default="json",
+        choices=["json", "srt", "vtt"],
+        help="Transcript file format of the videos. Default is json",
+    )
+    parser.add_argument(
+        "--plan-only",
+        action="store_true",
+        help="Only saves the summary plans, skipping the video rendering",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache-dir",
+        default="",
+        help="Directory where stage results are cached, shared by every video set",
+    )
+    parser.add_argument(
+        "-r",
+        "--report",
+        default="",
+        help="Aggregate timing report JSON file. Default is batch_report.json in the output directory",
+    )
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        raise Exception("The number of jobs must be at least 1")
+
+    if args.cpus is not None and args.cpus < 1:
+        raise Exception("The number of CPUs must be at least 1")
+
+    paths = args.datasets + (read_dataset_manifest(args.manifest) if args.manifest else [])
+    if not paths:
+        raise Exception("No video sets passed, give their folders or a manifest")
+
+    names = [basename(normpath(path)) for path in paths]
+    if len(set(names)) != len(names):
+        raise Exception("Video sets must have different folder names, their summaries are named after them")
+
+    # Checking every video set before summarizing any of them
+    datasets = []
+    for name, path in zip(names, paths):
+        output = join(args.output_dir, f"{name}.mp4")
+        datasets.append(
+            {
+                "name": name,
+                "path": path,
+                "videos": list_dataset_videos(path),
+                "output": output,
+                "content_format": args.content_format,
+                "plan": f"{splitext(output)[0]}.plan.json",
+                "plan_only": args.plan_only,
+                "cache_dir": args.cache_dir,
+            }
+        )
+
+    if not exists(args.output_dir):
+        makedirs(args.output_dir)
 
     return {
-        "name": video_set_name,
-        "path": (args.videos_path),
-        "videos": videos_list,
+        "datasets": datasets,
+        "jobs": args.jobs,
+        "cpus": args.cpus,
+        "report": args.report or join(args.output_dir, "batch_report.json"),
+    }
+
+
+def process_sweep_arguments() -> dict:
+    """Parses parameter sweep entry point call parameters"""
+    parser = argparse.ArgumentParser(
+        description="Summarizes a video set with every combination of the given parameter values, "
+        "computing the features they share once"
+    )
+
+    parser.add_argument(
+        "-vp",
+        "--videos-path",
+        required=True,
+        help="Path of the folder containing the videos content folders",
+    )
+    parser.add_argument("-v", "--videos", action="append", nargs="+")
+    parser.add_argument(
+        "-cf",
+        "--content-format",
+        default="json",
+        choices=["json", "srt", "vtt"],
+        help="Transcript file format of the videos. Default is json",
+    )
+    parser.add_argument(
+        "--intro-threshold",
+        type=float,
+        nargs="+",
+        default=[0.7],
+        help="Histogram intersections between frames under which the introduction ends. Default is 0.7",
+    )
+    parser.add_argument(
+        "--keypoints-diff-ratio",
+        type=float,
+        nargs="+",
+        default=[0.6],
+        help="Minimum keypoints count difference ratios of a new keyframe. Default is 0.6",
+    )
+    parser.add_argument(
+        "--descriptors-diff-ratio",
+        type=float,
+        nargs="+",
+        default=[0.1],
+        help="Ratios of matching descriptors under which a frame is a new keyframe. Default is 0.1",
+    )
+    parser.add_argument(
+        "--dict-size",
+        type=int,
+        nargs="+",
+        default=[300],
+        help="Visual words dictionary sizes of the quality ranking. Default is 300",
+    )
+    parser.add_argument(
+        "--base-threshold",
+        type=float,
+        nargs="+",
+        default=[0.17],
+        help="Redundancy similarity thresholds of a video set as long as the reference duration. Default is 0.17",
+    )
+    parser.add_argument(
+        "--reference-duration",
+        type=int,
+        nargs="+",
+        default=[785],
+        help="Durations in seconds the redundancy threshold is scaled by. Default is 785",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="",
+        help="Plans and timings JSON file. Default is results/<video set>.sweep.json",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of combinations evaluated at the same time. Default is 1",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="Number of CPUs shared by all the jobs. Default is all the CPUs",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache-dir",
+        default="",
+        help="Directory where stage results are cached, so later sweeps reuse them. Default is a temporary one",
+    )
+    parser.add_argument(
+        "--sample-fps",
+        type=float,
+        default=1.0,
+        help="Frames per second extracted from the videos for image analysis. Default is 1",
+    )
+    parser.add_argument(
+        "--compute-engine",
+        default="reference",
+        choices=COMPUTE_ENGINES,
+        help="Implementation of the text and keyframe similarity computations and of the chronological "
+        "ordering. Default is reference",
+    )
+    parser.add_argument(
+        "--quality-mode",
+        default="bovw",
+        choices=QUALITY_MODES,
+        help="How the best segment of each redundancy cluster is chosen: bovw ranks the Bag of Visual Words "
+        "of the SIFT keyframes, frames the sharpness, exposure and motion of the frames, much faster. "
+        "Default is bovw",
+    )
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        raise Exception("The number of jobs must be at least 1")
+
+    if args.cpus is not None and args.cpus < 1:
+        raise Exception("The number of CPUs must be at least 1")
+
+    if args.sample_fps <= 0:
+        raise Exception("The frame sampling rate must be positive")
+
+    if min(args.dict_size) < 1 or min(args.reference_duration) < 1:
+        raise Exception("Dictionary sizes and reference durations must be at least 1")
+
+    name = basename(normpath(args.videos_path))
+    output = args.output if args.output else join("results", f"{name}.sweep.json")
+    output_directory = dirname(output)
+    if output_directory and not exists(output_directory):
+        makedirs(output_directory)
+
+    return {
+        "name": name,
+        "path": args.videos_path,
+        "videos": list_dataset_videos(args.videos_path, args.videos[0] if args.videos else None),
+        "grid": {
+            "intro_threshold": args.intro_threshold,
+            "keypoints_diff_ratio": args.keypoints_diff_ratio,
+            "descriptors_diff_ratio": args.descriptors_diff_ratio,
+            "dict_size": args.dict_size,
+            "base_threshold": args.base_threshold,
+            "reference_duration": args.reference_duration,
+        },
+        "output": output,
+        "content_format": args.content_format,
+        "jobs": args.jobs,
+        "cpus": args.cpus,
+        "cache_dir": args.cache_dir,
+        "sample_fps": args.sample_fps,
+        "compute_engine": args.compute_engine,
+        "quality_mode": args.quality_mode,
+    }
+
+
+def process_worker_arguments() -> dict:
+    """Parses worker entry point call parameters"""
+    parser = argparse.ArgumentParser(
+        description="Runs the frame features jobs of a shared job queue"
+    )
+
+    parser.add_argument("queue_dir", help="Shared job queue directory")
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="Number of CPUs used by the worker. Default is all the CPUs",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=None,
+        help="Stops after this many seconds without jobs. Default is to wait for jobs forever",
+    )
+    args = parser.parse_args()
+
+    if args.cpus is not None and args.cpus < 1:
+        raise Exception("The number of CPUs must be at least 1")
+
+    if not exists(args.queue_dir):
+        raise Exception(f"Job queue '{args.queue_dir}' not found")
+
+    return {"queue_dir": args.queue_dir, "cpus": args.cpus, "idle_timeout": args.idle_timeout}
+
+
+def process_serve_arguments() -> dict:
+    """Parses service entry point call parameters"""
+    parser = argparse.ArgumentParser(
+        description="Runs a local HTTP service queueing summarization jobs on warm worker processes"
+    )
+
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address the service listens on. Default is 127.0.0.1",
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=8765,
+        help="Port the service listens on. Default is 8765",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of jobs run at the same time. Default is 1",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="Number of CPUs shared by all the workers. Default is all the CPUs",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache-dir",
+        default="",
+        help="Directory where stage results are cached for the jobs that do not set their own",
+    )
+    parser.add_argument(
+        "--max-queued",
+        type=int,
+        default=100,
+        help="Number of waiting jobs over which new ones are rejected. Default is 100",
+    )
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        raise Exception("The number of workers must be at least 1")
+
+    if args.cpus is not None and args.cpus < 1:
+        raise Exception("The number of CPUs must be at least 1")
+
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "cpus": args.cpus,
+        "cache_dir": args.cache_dir,
+        "max_queued": args.max_queued,
+    }
+
+
+def parse_size(size: str) -> int:
+    """Converts a size in bytes, optionally with a K, M, G or T binary suffix, to bytes"""
+    units = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+    value = size.strip().upper().rstrip("IB") or "0"
+    try:
+        if value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise Exception(f"Invalid size '{size}'")
+
+
+def process_frames_arguments() -> dict:
+    """Parses frames cache entry point call parameters"""
+    parser = argparse.ArgumentParser(description="Inspects and prunes the extracted frames cache")
+
+    parser.add_argument("command", choices=["list", "prune"])
+    parser.add_argument(
+        "-r",
+        "--root",
+        default="video_frames",
+        help="Frames cache directory. Default is video_frames",
+    )
+    parser.add_argument(
+        "-b",
+        "--budget",
+        default="",
+        help="Evicts least recently used videos until the cache fits this size (K/M/G/T suffixes allowed)",
+    )
+    parser.add_argument(
+        "--incomplete",
+        action="store_true",
+        help="Evicts every unfinished or corrupted extraction",
+    )
+    parser.add_argument("-d", "--dataset", default=None, help="Evicts every video of this dataset")
+    args = parser.parse_args()
+
+    if not exists(args.root):
+        raise Exception(f"Frames cache '{args.root}' not found")
+
+    return {
+        "command": args.command,
+        "root": args.root,
+        "budget": parse_size(args.budget) if args.budget else None,
+        "incomplete": args.incomplete,
+        "dataset": args.dataset,
+    }
+
+
+def process_render_arguments() -> dict:
+    """Parses render entry point call parameters"""
+    parser = argparse.ArgumentParser(description="Renders a saved summary plan")
+
+    parser.add_argument("plan", help="Summary plan JSON file")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="",
+        help="Output file name of the summarized video. Default is the plan name",
+    )
+    parser.add_argument(
+        "-e",
+        "--engine",
+        default="ffmpeg",
+        choices=["ffmpeg", "moviepy"],
+        help="Rendering engine. Default is ffmpeg",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of concurrent chunk encoders. Default is the number of CPUs",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="Number of CPUs shared by the encoders. Default is all the CPUs",
+    )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Renders the summary as a HLS playlist, playable while the next segments are rendered",
+    )
+    args = parser.parse_args()
+
+    if args.cpus is not None and args.cpus < 1:
+        raise Exception("The number of CPUs must be at least 1")
+
+    if not exists(args.plan):
+        raise Exception(f"Summary plan '{args.plan}' not found")
+
+    plan_name = basename(args.plan).split(".")[0]
+    output = args.output if args.output else join("results", f"{plan_name}.mp4")
+
+    # Creating output directory if not exists
+    output_directory = dirname(output)
+    if output_directory and not exists(output_directory):
+        mkdir(output_directory)
+
+    return {
+        "plan": args.plan,
         "output": output,
+        "engine": args.engine,
+        "workers": args.workers,
+        "stream": join(splitext(output)[0], "index.m3u8") if args.stream else "",
+        "cpus": args.cpus,
     }
 
 
+@lru_cache(maxsize=65536)
+def parse_timestamp(time_str: str) -> int:
+    """
+    Converts a `[HH:]MM:SS[.mmm|,mmm]` timestamp to whole seconds.
+    Hand-rolled and cached because transcripts repeat the same timestamps as begin and end of consecutive lines.
+    """
+    try:
+        fields = time_str.strip().replace(",", ".").split(":")
+        if not 2 <= len(fields) <= 3:
+            raise ValueError
+        seconds = int(float(fields[-1]))
+        minutes = int(fields[-2])
+        hours = int(fields[0]) if len(fields) == 3 else 0
+    except (AttributeError, ValueError, OverflowError):
+        raise Exception(f"Invalid timestamp '{time_str}'")
+
+    return hours * 3600 + minutes * 60 + seconds
+
+
 def get_seconds_from_time(time_str: str, time_format="%H:%M:%S") -> int:
     """Converts time in given format to seconds"""
+    if time_format == "%H:%M:%S":
+        return parse_timestamp(time_str)
+
     time_obj = time.strptime(time_str, time_format)
     return int(
         timedelta(
@@ -0,0 +1,35 @@
+from processing.utils import log, process_render_arguments
+
+
+def render(
+    plan: str,
+    output: str,
+    engine: str = "ffmpeg",
+    workers: int = None,
+    stream: str = "",
+    cpus: int = None,
+) -> None:
+    """Renders the summary video of a plan saved with `--plan`, or its HLS playlist when `stream` is given"""
+    from components.plan import SummaryPlan
+
+    summary_plan = SummaryPlan.load(plan)
+    log(
+        f"Rendering plan '{summary_plan.get_name()}' "
+        f"({len(summary_plan.get_entries())} segments, {summary_plan.get_duration()}s) "
+        f"to {stream or output}"
+    )
+    summary_video = summary_plan.to_video(output)
+
+    if stream:
+        summary_video.save_stream(stream, workers=workers, cpus=cpus)
+    else:
+        summary_video.save(engine=engine, workers=workers, cpus=cpus)
+
+
+if __name__ == "__main__":
+    try:
+        render_args = process_render_arguments()
+    except Exception as e:
+        log(str(e), log_type="ERROR")
+    else:
+        render(**render_args)
@@ -0,0 +1,49 @@
+from signal import SIGTERM, signal
+
+from processing.utils import log, process_serve_arguments
+
+
+def stop_serving(signum: int, frame) -> None:
+    raise SystemExit(0)
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    workers: int = 1,
+    cpus: int = None,
+    cache_dir: str = "",
+    max_queued: int = 100,
+) -> None:
+    """
+    Serves summarization jobs until interrupted. Jobs take the parameters of the command line,
+    named after their long options, e.g. `{"videos_path": "video_sets/bebe", "plan_only": true}`.
+    """
+    from processing.service import SummarizationService, create_server
+
+    service = SummarizationService(
+        workers=workers, cpus=cpus, cache_dir=cache_dir, max_queued=max_queued
+    )
+    server = create_server(service, host, port)
+    service.start()
+
+    # Finishing the running jobs when stopped by a service manager too
+    signal(SIGTERM, stop_serving)
+    log(f"Serving summarization jobs on http://{host}:{server.server_port} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        log("Waiting for the running jobs")
+        service.stop()
+
+
+if __name__ == "__main__":
+    try:
+        serve_args = process_serve_arguments()
+    except Exception as e:
+        log(str(e), log_type="ERROR")
+    else:
+        serve(**serve_args)
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
 from abc import abstractmethod
+from typing import Any, Callable
 
 from components.video import Video
 from components.segment import Segment
+from components.plan import PlanEntry, SummaryPlan
+from processing.tracing import span
+from processing.memory import memory_stage
+from processing.executor import TaskExecutor
+from processing.cache import StageCache, file_fingerprint, fingerprint
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from processing.shots import ShotBoundaries
+    from processing.frame_stream import FrameFeatureTable
 
 
 class BaseSummarizer:
@@ -13,12 +25,24 @@ class BaseSummarizer:
         summary_name: str = "",
         frames_path: str = "",
         output_path: str = "output.mp4",
+        frame_features: FrameFeatureTable = None,
+        stage_cache: StageCache = None,
+        executor: TaskExecutor = None,
+        stage_key: str = None,
     ) -> None:
         self.__videos = videos
         self.__summary_name = summary_name
         self.__frames_path = frames_path
         self.__output_path = output_path
+        self.__frame_features = frame_features
+        self.__stage_cache = stage_cache
+        self.__executor = executor
+        self.__stage_key = stage_key
+        self.__input_key = stage_key
+        self.__shot_boundaries = {}
+        self.__source_segments = []
         self.__summary_video = None
+        self.__summary_plan = None
 
     @abstractmethod
     def summarize(self) -> Video:
@@ -27,6 +51,66 @@ class BaseSummarizer:
     def get_frames_path(self) -> str:
         return self.__frames_path
 
+    def get_frame_features(self) -> FrameFeatureTable:
+        """Per-frame features computed in a single pass over the frames, if any"""
+        return self.__frame_features
+
+    def get_shot_boundaries(self, video_name: str) -> ShotBoundaries | None:
+        """Shot cuts of a video, detected once from its frame histograms, `None` without them"""
+        features = self.__frame_features
+        if features is None or not features.has(video_name, "histogram"):
+            return None
+
+        if video_name not in self.__shot_boundaries:
+            from processing.shots import ShotBoundaries
+
+            self.__shot_boundaries[video_name] = ShotBoundaries(
+                features.get_seconds(video_name), features.get(video_name, "histogram")
+            )
+        return self.__shot_boundaries[video_name]
+
+    def get_stage_cache(self) -> StageCache:
+        return self.__stage_cache
+
+    def get_executor(self) -> TaskExecutor:
+        return self.__executor
+
+    def run_video_tasks(self, function: Callable[..., Any], tasks: list[tuple]) -> list[Any]:
+        """Runs independent per-video tasks on the shared executor, returning the results in task order"""
+        if self.__executor is None:
+            return [function(*args) for args in tasks]
+        return self.__executor.map(function, tasks)
+
+    def run_cached_video_tasks(
+        self, name: str, function: Callable[..., Any], tasks: list[tuple], keys: list[Any]
+    ) -> list[Any]:
+        """
+        Runs the per-video tasks whose results are not in the stage cache yet. Results are keyed by the
+        input of the running stage and the task `keys`, which must hold every parameter the result depends on,
+        so runs of the stage with other parameters reuse them.
+        """
+        if self.__stage_cache is None:
+            return self.run_video_tasks(function, tasks)
+
+        task_keys = [fingerprint(self.__input_key, name, key) for key in keys]
+        missing = [i for i, key in enumerate(task_keys) if not self.__stage_cache.contains(name, key)]
+        computed = dict(zip(missing, self.run_video_tasks(function, [tasks[i] for i in missing])))
+        # Results found in the cache but unreadable when loaded are computed again
+        return [
+            self.__stage_cache.cached(
+                name, key, lambda: computed[i] if i in computed else function(*tasks[i])
+            )
+            for i, key in enumerate(task_keys)
+        ]
+
+    def get_stage_key(self) -> str:
+        """Cache key of the running stage, chaining the summarizer inputs and all previous stages"""
+        return self.__stage_key
+
+    def get_input_key(self) -> str:
+        """Cache key of the input of the running stage, the stage key before its name and parameters"""
+        return self.__input_key
+
     def get_videos(self) -> list[Video]:
         return self.__videos
 
@@ -34,14 +118,111 @@ class BaseSummarizer:
         return self.__videos[index]
 
     def start_summary_video(self) -> None:
-        self.__summary_video = Video(name=self.__summary_name, path=self.__output_path)
+        self.__summary_video = Video(
+            name=self.__summary_name, path=self.__output_path, segments=[]
+        )
+        self.__summary_plan = SummaryPlan(name=self.__summary_name)
+        self.__source_segments = [list(video.get_segments()) for video in self.__videos]
+        self.__stage_key = self.__input_key = fingerprint(
+            self.__summary_name,
+            [
+                [
+                    video.get_name(),
+                    file_fingerprint(video.get_video_path()),
+                    [(s.get_begin(), s.get_end(), s.get_content()) for s in segments],
+                    # Frames the image analyses run on
+                    video.get_frame_sequence(self.__frames_path).get_settings().to_dict()
+                    if self.__frames_path
+                    else None,
+                ]
+                for video, segments in zip(self.__videos, self.__source_segments)
+            ],
+        )
+
+    def run_stage(
+        self, name: str, stage: Callable[[], Any], parameters: dict = None
+    ) -> BaseSummarizer:
+        """
+        Runs a summarization stage, or restores its result from the stage cache when the stage
+        already ran with the same inputs and parameters.
+        """
+        self.__input_key = self.__stage_key
+        self.__stage_key = fingerprint(self.__stage_key, name, parameters or {})
+        with span(name, "stage"), memory_stage(name):
+            if self.__stage_cache is None:
+                stage()
+                return self
 
-    def append_segment_to_summary(self, segment: Segment) -> None:
+            def run() -> dict:
+                stage()
+                return self.get_state()
+
+            self.set_state(self.__stage_cache.cached(name, self.__stage_key, run))
+        return self
+
+    def cached_artifact(
+        self, name: str, compute: Callable[[], Any], *parts: Any, shared: bool = False
+    ) -> Any:
+        """
+        Intermediate result of the running stage, reused from the stage cache when available.
+        A `shared` result is keyed by the stage input and `parts` only, so `parts` must hold every parameter
+        it depends on, and runs of the stage with other parameters reuse it.
+        """
+        with span(name, "artifact"):
+            if self.__stage_cache is None:
+                return compute()
+            key = fingerprint(self.__input_key if shared else self.__stage_key, name, *parts)
+            return self.__stage_cache.cached(name, key, compute)
+
+    def get_state(self) -> dict:
+        """
+        Remaining segments of each video and the summary entries, as indexes of the segments
+        the videos had when the summary was started
+        """
+        indexes = {
+            id(segment): (video_index, segment_index)
+            for video_index, segments in enumerate(self.__source_segments)
+            for segment_index, segment in enumerate(segments)
+        }
+        return {
+            "segments": [
+                [indexes[id(segment)][1] for segment in video.get_segments()]
+                for video in self.__videos
+            ],
+            "summary": [
+                (indexes[id(segment)], entry.reason, entry.cluster)
+                for segment, entry in zip(
+                    self.__summary_video.get_segments(),
+                    self.__summary_plan.get_entries(),
+                )
+            ],
+        }
+
+    def set_state(self, state: dict) -> None:
+        for video, segments, kept in zip(
+            self.__videos, self.__source_segments, state["segments"]
+        ):
+            video.set_segments([segments[i] for i in kept])
+
+        self.__summary_video.set_segments([])
+        self.__summary_plan = SummaryPlan(name=self.__summary_name)
+        for (video_index, segment_index), reason, cluster in state["summary"]:
+            self.append_segment_to_summary(
+                self.__source_segments[video_index][segment_index], reason, cluster
+            )
+
+    def append_segment_to_summary(
+        self, segment: Segment, reason: str = "", cluster: int = None
+    ) -> None:
         self.__summary_video.append_segment(segment)
+        self.__summary_plan.append(PlanEntry.from_segment(segment, reason, cluster))
 
-    def append_segments_to_summary(self, segments: list[Segment]) -> None:
-        for segment in segments:
-            self.append_segment_to_summary(segment)
+    def append_segments_to_summary(
+        self, segments: list[Segment], reason: str = "", clusters: list[int] = None
+    ) -> None:
+        for i, segment in enumerate(segments):
+            cluster = clusters[i] if clusters is not None else None
+            self.append_segment_to_summary(segment, reason, cluster)
 
     def adjust_summary_segments_seconds(self) -> None:
         new_begin = 0
@@ -51,9 +232,44 @@ class BaseSummarizer:
             segment.set_end(new_end)
             new_begin = new_end
 
+    def snap_summary_to_cuts(self, tolerance: float = 1.0) -> int:
+        """
+        Moves the begin and end of the summary segments to the nearest shot cut of their video at most
+        `tolerance` seconds away, so the summary cuts where its sources do. Returns the boundaries moved.
+        """
+        from processing.shots import snap_to_cuts
+
+        moved = 0
+        segments = self.__summary_video.get_segments()
+        for i, (segment, entry) in enumerate(zip(segments, self.__summary_plan.get_entries())):
+            boundaries = self.get_shot_boundaries(segment.get_video().get_name())
+            if boundaries is None:
+                continue
+
+            begin, end = (
+                int(second) if second.is_integer() else float(second)
+                for second in snap_to_cuts(
+                    [segment.get_begin(), segment.get_end()],
+                    boundaries.get_cut_seconds(),
+                    tolerance,
+                ).tolist()
+            )
+            # Keeping segments that would collapse onto a single cut as they are
+            if end <= begin:
+                continue
+
+            moved += (begin != segment.get_begin()) + (end != segment.get_end())
+            # Snapping a copy, as the segment may be the integer seconds row of a transcript `SegmentTable`
+            segments[i] = Segment(begin, end, segment.get_content(), segment.get_video())
+            entry.begin, entry.end = begin, end
+        return moved
+
     def get_summary_video(self) -> Video:
         return self.__summary_video
 
+    def get_summary_plan(self) -> SummaryPlan:
+        return self.__summary_plan
+
     def print_summary(self) -> None:
         self.adjust_summary_segments_seconds()
         for segment in self.__summary_video.get_segments():
@@ -1,16 +1,50 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, asdict
+
 from components.video import Video
-from modules.quality import Quality
-from modules.redundancy import Redundancy
-from modules.introduction import Introduction
-from modules.subjectivity import Subjectivity
 from summarizers.base_summarizer import BaseSummarizer
 
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from modules.modules_base import SelectionCriteria
+
+
+@dataclass(frozen=True)
+class SummaryParameters:
+    """
+    Tunable parameters of the selection criteria: the histogram intersection under which the introduction ends,
+    the minimum keypoints and descriptors difference ratios of a new keyframe, the visual words dictionary
+    size of Quality, and the base and reference duration of the redundancy threshold
+    """
+
+    intro_threshold: float = 0.7
+    keypoints_diff_ratio: float = 0.6
+    descriptors_diff_ratio: float = 0.1
+    dict_size: int = 300
+    base_threshold: float = 0.17
+    reference_duration: int = 785
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
 
 class HSMVideoSumm(BaseSummarizer):
-    def __init__(self, **kwargs):
+    def __init__(
+        self,
+        compute_engine: str = "reference",
+        parameters: SummaryParameters = None,
+        quality_mode: str = "bovw",
+        **kwargs,
+    ):
         super().__init__(**kwargs)
+        self.__compute_engine = compute_engine
+        self.__quality_mode = quality_mode
+        self.__parameters = parameters if parameters is not None else SummaryParameters()
+
+    def get_parameters(self) -> SummaryParameters:
+        return self.__parameters
 
     def summarize(self) -> Video:
         self.start_summary_video()
@@ -22,16 +56,39 @@ class HSMVideoSumm(BaseSummarizer):
         ).get_summary_video()
 
     def __introduction(self, include: bool = True) -> HSMVideoSumm:
-        if include:
-            return Introduction(self).include()
-        return Introduction(self).exclude()
+        # Stage modules are imported on demand to keep their dependencies out of startup
+        from modules.introduction import Introduction
+
+        introduction = Introduction(self, threshold=self.__parameters.intro_threshold)
+        return self.__run_criteria("introduction", introduction, include)
 
     def __subjectivity(self, include: bool = True) -> HSMVideoSumm:
-        if include:
-            return Subjectivity(self).include()
-        return Subjectivity(self).exclude()
+        from modules.subjectivity import Subjectivity
+
+        return self.__run_criteria("subjectivity", Subjectivity(self), include)
 
     def __redundancy(self, include: bool = True) -> HSMVideoSumm:
-        if include:
-            return Redundancy(self).include()
-        return Redundancy(self).exclude()
+        from modules.redundancy import Redundancy
+
+        redundancy = Redundancy(
+            self,
+            base_threshold=self.__parameters.base_threshold,
+            reference_duration=self.__parameters.reference_duration,
+            quality_dict_size=self.__parameters.dict_size,
+            keyframe_ratios=(
+                self.__parameters.keypoints_diff_ratio,
+                self.__parameters.descriptors_diff_ratio,
+            ),
+            engine=self.__compute_engine,
+            quality_mode=self.__quality_mode,
+        )
+        return self.__run_criteria("redundancy", redundancy, include)
+
+    def __run_criteria(
+        self, name: str, criteria: SelectionCriteria, include: bool
+    ) -> HSMVideoSumm:
+        return self.run_stage(
+            name,
+            criteria.include if include else criteria.exclude,
+            {"include": include, **criteria.get_parameters()},
+        )
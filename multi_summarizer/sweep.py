@@ -0,0 +1,17 @@
+from processing.utils import log, process_sweep_arguments
+
+
+def sweep(grid: dict[str, list], **kwargs):
+    """Summarizes a video set with every combination of the `grid` values of each parameter"""
+    from processing.sweep import parameter_grid, run_sweep
+
+    return run_sweep(grid=parameter_grid(**grid), **kwargs)
+
+
+if __name__ == "__main__":
+    try:
+        sweep_args = process_sweep_arguments()
+    except Exception as e:
+        log(str(e), log_type="ERROR")
+    else:
+        sweep(**sweep_args)
@@ -0,0 +1,32 @@
+from processing.utils import log, process_worker_arguments
+
+
+def worker(queue_dir: str, cpus: int = None, idle_timeout: float = None) -> None:
+    """Extracts and analyzes the frames of the videos queued by `--queue-dir` runs, on any node sharing the queue"""
+    from processing.executor import TaskExecutor
+    from processing.job_queue import FileJobQueue, get_worker_id, work
+    from processing.distributed import get_job_handlers
+    from processing.scheduler import ResourceScheduler
+
+    scheduler = ResourceScheduler(cpus)
+    scheduler.apply()
+    worker_id = get_worker_id()
+    log(f"Worker {worker_id} serving {queue_dir} with {scheduler.get_cpus()} CPUs")
+
+    with TaskExecutor(scheduler) as executor:
+        ran = work(
+            FileJobQueue(queue_dir),
+            get_job_handlers(executor),
+            worker_id=worker_id,
+            idle_timeout=idle_timeout,
+        )
+    log(f"Worker {worker_id} stopped after {ran} jobs")
+
+
+if __name__ == "__main__":
+    try:
+        worker_args = process_worker_arguments()
+    except Exception as e:
+        log(str(e), log_type="ERROR")
+    else:
+        worker(**worker_args)
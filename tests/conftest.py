@@ -0,0 +1,37 @@
+import sys
+from os.path import join, dirname, abspath
+
+# The application modules import each other from the package directory (e.g. `from components.video import Video`)
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), "multi_summarizer"))
+
+from typing import Callable
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def index_names() -> list[str]:
+    return ["video_index", "segment_index"]
+
+
+@pytest.fixture
+def random_texts() -> Callable[[int], dict]:
+    """Factory of texts of 3 videos of 12 segments, keyed by (video index, segment index), for a seed"""
+
+    def make(seed: int = 0) -> dict:
+        rng = np.random.default_rng(seed)
+        # Words contained in others, e.g. "word1" in "word12", count as the reference counts them
+        vocabulary = [f"word{i}" for i in range(30)]
+        return {
+            (video, segment): " ".join(rng.choice(vocabulary, rng.integers(0, 10)))
+            for video in range(3)
+            for segment in range(12)
+        }
+
+    return make
@@ -0,0 +1,26 @@
+import json
+
+from components.frame import FRAME_MANIFEST_FILE, ExtractionSettings, Frame, FrameSequence
+
+
+def test_extraction_filter() -> None:
+    assert ExtractionSettings().to_filter() == "fps=1"
+    assert (
+        ExtractionSettings(fps=2.5, height=360, roi=(10, 20, 640, 480)).to_filter()
+        == "fps=2.5,crop=640:480:10:20,scale=-2:360"
+    )
+
+
+def test_frame_seconds_follow_sampling_rate(tmp_path) -> None:
+    for number in (0, 1, 3, 10):
+        (tmp_path / f"image-{number}.jpg").touch()
+    settings = ExtractionSettings(fps=2.0, height=240)
+    manifest = {"settings": settings.to_dict(), "frame_count": 4}
+    (tmp_path / FRAME_MANIFEST_FILE).write_text(json.dumps(manifest))
+
+    frames = FrameSequence(str(tmp_path))
+    assert frames.get_settings() == settings
+    assert frames.get_seconds().tolist() == [0.0, 0.5, 1.5, 5.0]
+    assert [frame.get_video_second() for frame in frames.between(1, 5)] == [1.5]
+    assert Frame(str(tmp_path / "image-3.jpg")).get_video_second() == 1.5
+    assert ExtractionSettings.load(str(tmp_path)) == settings
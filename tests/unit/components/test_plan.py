@@ -0,0 +1,44 @@
+from components.video import Video
+from components.segment import Segment
+from components.plan import PlanEntry, SummaryPlan
+
+
+def test_summary_plan_roundtrip(tmp_path) -> None:
+    video = Video(name="jornal", path="jornal.mp4", segments=[Segment(10, 25, "texto")])
+    plan = SummaryPlan(name="set")
+    plan.append(PlanEntry.from_segment(video.get_segment(0), "redundancy", cluster=2))
+
+    path = str(tmp_path / "set.plan.json")
+    plan.save(path)
+    loaded = SummaryPlan.load(path)
+
+    assert loaded.get_entries() == plan.get_entries()
+    assert loaded.get_duration() == 15
+
+    summary = loaded.to_video("summary.mp4")
+    segment = summary.get_segment(0)
+    assert (segment.get_begin(), segment.get_end()) == (10, 25)
+    assert segment.get_video().get_video_path() == "jornal.mp4"
+
+
+def test_summary_plan_edl() -> None:
+    plan = SummaryPlan(
+        name="set",
+        entries=[
+            PlanEntry("a", "a.mp4", 0, 10, reason="introduction"),
+            PlanEntry("b", "b.mp4", 65, 70, reason="redundancy", cluster=0),
+        ],
+    )
+    lines = plan.to_edl().splitlines()
+
+    assert lines[0] == "TITLE: set"
+    assert "00:01:05:00 00:01:10:00 00:00:10:00 00:00:15:00" in lines[7]
+    assert lines[9] == "* COMMENT: redundancy (cluster 0)"
+
+
+def test_summary_plan_edl_frames() -> None:
+    # Boundaries snapped to shot cuts fall between seconds
+    plan = SummaryPlan(name="set", entries=[PlanEntry("a", "a.mp4", 1.5, 62.2, reason="redundancy")])
+
+    assert "00:00:01:13 00:01:02:05 00:00:00:00 00:01:00:18" in plan.to_edl(fps=25)
+    assert "00:00:01:15 00:01:02:06 00:00:00:00 00:01:00:21" in plan.to_edl()
@@ -0,0 +1,51 @@
+from sys import getsizeof
+
+from components.video import Video
+from components.frame import FrameSequence
+from components.segment import Segment
+from components.segment_table import SegmentTable
+
+
+def test_segment_table_rows() -> None:
+    table = SegmentTable(capacity=1)
+    table.append(0, 10, "first", video_id=0)
+    table.append(10, 25, "second", video_id=0)
+    table.append(0, 7, "first", video_id=1)
+
+    assert len(table) == 3
+    assert table.get_rows()["end"].tolist() == [10, 25, 7]
+    assert table.get_content(2) == "first"
+    assert table.get_video_rows(0).tolist() == [0, 1]
+
+
+def test_segment_row_getters() -> None:
+    table = SegmentTable()
+    table.append(5, 12, "content", video_id=0)
+    segment = table.segments(0)[0]
+
+    assert segment.get_begin() == 5
+    assert segment.get_end() == 12
+    assert segment.get_duration() == 7
+    assert segment.get_content() == "content"
+
+    segment.set_begin(0)
+    assert table.get_begin(0) == 0
+    assert str(segment) == "[0:00:00 - 0:00:12] content"
+    # Views hold no copy of the values of their row, so they are smaller than segments
+    assert not hasattr(segment, "__dict__")
+    assert getsizeof(segment) < getsizeof(Segment(5, 12, "content"))
+
+
+def test_segment_load_frames(tmp_path) -> None:
+    frames_dir = tmp_path / "video"
+    frames_dir.mkdir()
+    for second in (10, 2, 0, 1, 5):
+        (frames_dir / f"image-{second}.jpg").touch()
+
+    table = SegmentTable()
+    table.append(1, 5, video_id=0)
+    video = Video(name="video", segments=table.segments(0))
+
+    frames = video.get_segment(0).load_frames(str(tmp_path))
+    assert [frame.get_video_second() for frame in frames] == [1, 2]
+    assert FrameSequence(str(frames_dir)).get_seconds().tolist() == [0, 1, 2, 5, 10]
@@ -0,0 +1,68 @@
+from os import listdir
+from multiprocessing import Pool
+
+from components.video import Video
+from components.segment import Segment
+from processing.cache import StageCache
+from summarizers.base_summarizer import BaseSummarizer
+
+
+def make_summarizer(cache: StageCache) -> BaseSummarizer:
+    videos = [
+        Video(name=f"video{v}", segments=[Segment(i, i + 1, f"{v}-{i}") for i in range(3)])
+        for v in range(2)
+    ]
+    summarizer = BaseSummarizer(videos=videos, summary_name="summary", stage_cache=cache)
+    summarizer.start_summary_video()
+    return summarizer
+
+
+def save_artifacts(cache_dir: str) -> None:
+    cache = StageCache(cache_dir)
+    for i in range(300):
+        cache.save("shared", f"key{i}", list(range(i)))
+
+
+def test_processes_save_the_same_artifacts_at_once(tmp_path) -> None:
+    with Pool(4) as pool:
+        pool.map(save_artifacts, [str(tmp_path)] * 4)
+
+    cache = StageCache(str(tmp_path))
+    assert all(cache.load("shared", f"key{i}") == list(range(i)) for i in range(300))
+    assert sorted(listdir(tmp_path / "shared")) == sorted(f"key{i}.pkl" for i in range(300))
+
+
+def test_stage_results_are_restored_from_cache(tmp_path) -> None:
+    calls = []
+
+    def stage(summarizer: BaseSummarizer) -> None:
+        calls.append(summarizer)
+        video = summarizer.get_video_at(1)
+        summarizer.append_segment_to_summary(video.get_segment(2), "last", cluster=0)
+        video.delete_segment_at(0)
+
+    for _ in range(2):
+        summarizer = make_summarizer(StageCache(str(tmp_path)))
+        summarizer.run_stage("stage", lambda: stage(summarizer), {"param": 1})
+
+        assert [s.get_content() for s in summarizer.get_video_at(1).get_segments()] == ["1-1", "1-2"]
+        assert summarizer.get_summary_video().get_segment(0).get_content() == "1-2"
+        assert summarizer.get_summary_plan().get_entries()[0].reason == "last"
+    assert len(calls) == 1
+
+    # Changing a stage parameter invalidates its cached result
+    summarizer = make_summarizer(StageCache(str(tmp_path)))
+    summarizer.run_stage("stage", lambda: stage(summarizer), {"param": 2})
+    assert len(calls) == 2
+
+
+def test_artifacts_chain_the_stage_key(tmp_path) -> None:
+    cache = StageCache(str(tmp_path))
+    summarizer = make_summarizer(cache)
+    summarizer.run_stage("first", lambda: None)
+    assert summarizer.cached_artifact("artifact", lambda: 1) == 1
+    assert summarizer.cached_artifact("artifact", lambda: 2) == 1
+
+    summarizer.run_stage("second", lambda: None)
+    assert summarizer.cached_artifact("artifact", lambda: 2) == 2
+    assert cache.get_stats() == (1, 4)
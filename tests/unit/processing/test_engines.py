@@ -0,0 +1,68 @@
+import numpy as np
+
+from processing.text import BagOfWords
+from processing.image import Keyframe
+from modules.chronology import Chronology, order_by_similarity_cluster_fast
+from modules.redundancy import Redundancy
+from components.video import Video
+from processing.memory import memory_monitoring
+from summarizers.base_summarizer import BaseSummarizer
+
+
+def test_fast_bow_dataframe_matches_reference(random_texts, index_names) -> None:
+    for seed in range(3):
+        reference = BagOfWords(random_texts(seed)).generate_bow_dataframe(index_names)
+        fast = BagOfWords(random_texts(seed)).generate_bow_dataframe_fast(index_names)
+        assert list(reference.columns) == list(fast.columns)
+        assert reference.index.equals(fast.index)
+        assert np.allclose(reference.to_numpy(), fast.to_numpy(), rtol=0, atol=1e-12)
+
+
+def test_engines_include_nothing_from_videos_without_segments() -> None:
+    # With and without a memory budget, which sizes the chunks of the fast engine
+    for budget in (None, 2**30):
+        for engine in ("reference", "fast"):
+            summarizer = BaseSummarizer(videos=[Video(name="a", segments=[]), Video(name="b", segments=[])])
+            summarizer.start_summary_video()
+            with memory_monitoring(budget):
+                Redundancy(summarizer, engine=engine).include()
+            assert summarizer.get_summary_plan().get_entries() == []
+
+
+def test_fast_matches_count_matches_reference(rng) -> None:
+    for _ in range(10):
+        descriptors = rng.random((60, 16))
+        descriptors /= np.linalg.norm(descriptors, axis=1, keepdims=True)
+
+        # Another frame of the scene: some descriptors slightly moved, others replaced
+        other = descriptors[rng.permutation(60)[:45]] + rng.normal(0, 0.01, (45, 16))
+        other /= np.linalg.norm(other, axis=1, keepdims=True)
+        other = np.concatenate([other, rng.random((10, 16))])
+
+        first, second = Keyframe(descriptor=descriptors), Keyframe(descriptor=other)
+        assert first.num_matches_fast(second) == first.num_matches(second)
+        assert second.num_matches_fast(first) == second.num_matches(first)
+        assert first.is_keyframe([second], engine="fast") == first.is_keyframe([second])
+
+
+def test_fast_chronology_order_matches_reference(rng) -> None:
+    # Small blocks and long orders split blocks and insert items across them
+    for items_count, segments, block_size in [(40, 15, 64), (40, 15, 2), (400, 100, 4), (400, 100, 64)]:
+        for _ in range(200 if items_count < 100 else 10):
+            videos = rng.integers(1, 6)
+            items = {
+                (int(rng.integers(videos)), int(rng.integers(segments)))
+                for _ in range(rng.integers(1, items_count))
+            }
+            # Clusters may hold several segments of a video, or none of some videos
+            items_cluster = {
+                item: {item}
+                | {
+                    (int(rng.integers(videos)), int(rng.integers(segments)))
+                    for _ in range(rng.integers(0, 6))
+                }
+                for item in items
+            }
+            expected = Chronology.order_by_similarity_cluster(items_cluster)
+            assert order_by_similarity_cluster_fast(items_cluster, block_size) == expected
+            assert Chronology.order_by_similarity_cluster(items_cluster, engine="fast") == expected
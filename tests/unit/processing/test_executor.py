@@ -0,0 +1,21 @@
+from processing.executor import TaskExecutor
+from processing.scheduler import ResourceScheduler
+
+
+def test_results_keep_task_order() -> None:
+    tasks = [(base, 2) for base in range(10)]
+    expected = [base**2 for base in range(10)]
+
+    assert TaskExecutor(ResourceScheduler(cpus=1)).map(pow, tasks) == expected
+    with TaskExecutor(ResourceScheduler(cpus=3)) as executor:
+        assert executor.map(pow, tasks) == expected
+        assert executor.map(pow, tasks[:1]) == expected[:1]
+
+
+def test_scheduler_splits_cpus_between_workers() -> None:
+    scheduler = ResourceScheduler(cpus=32)
+    assert scheduler.split(10) == (10, 3)
+    assert scheduler.split(64) == (32, 1)
+    assert scheduler.split(1) == (1, 32)
+    assert scheduler.split(10, max_workers=4) == (4, 8)
+    assert ResourceScheduler(cpus=1).split(10) == (1, 1)
@@ -0,0 +1,47 @@
+import os
+
+from processing.ffmpeg import run_ffmpeg
+from processing.utils import parse_size
+from processing.frame_cache import FrameCache
+from components.frame import ExtractionSettings, FrameSequence
+
+
+def make_video(path: str) -> str:
+    run_ffmpeg(
+        ["-f", "lavfi", "-i", "testsrc=size=160x120:rate=10", "-t", "4"]
+        + ["-c:v", "libx264", "-pix_fmt", "yuv420p", path]
+    )
+    return path
+
+
+def test_frames_are_reused_repaired_and_evicted(tmp_path) -> None:
+    video = make_video(str(tmp_path / "video.mp4"))
+    cache = FrameCache(str(tmp_path / "frames"))
+    settings = ExtractionSettings(fps=2, height=60)
+
+    frames_dir = cache.get_frames_dir("dataset", "video")
+    manifest = cache.ensure(frames_dir, video, settings)
+    assert manifest.frame_count == len(FrameSequence(frames_dir)) == 8
+    assert cache.is_valid(frames_dir, video, settings)
+    assert not cache.is_valid(frames_dir, video, ExtractionSettings())
+
+    # Touching the video keeps the frames, losing a frame makes them incomplete
+    os.utime(video, (0, 0))
+    assert cache.is_valid(frames_dir, video, settings)
+    os.remove(os.path.join(frames_dir, "image-3.jpg"))
+    assert not cache.is_valid(frames_dir, video, settings)
+    assert cache.ensure(frames_dir, video, settings).frame_count == 8
+
+    other_dir = cache.get_frames_dir("other", "video")
+    cache.ensure(other_dir, video, settings)
+    assert [entry.path for entry in cache.get_entries()] == [frames_dir, other_dir]
+
+    evicted = cache.prune(budget=cache.get_usage() - 1)
+    assert [entry.path for entry in evicted] == [frames_dir]
+    assert cache.prune(budget=0, protect=[other_dir]) == []
+
+
+def test_parse_size() -> None:
+    assert parse_size("512") == 512
+    assert parse_size("1.5K") == 1536
+    assert parse_size("20GiB") == 20 * 2**30
@@ -0,0 +1,134 @@
+import cv2
+import numpy as np
+
+from components.video import Video
+from components.segment import Segment
+from modules.quality import Quality
+from modules.redundancy import Redundancy
+from processing.cache import StageCache
+from processing.tracing import tracing
+from processing.frame_stream import FrameQualityAnalyzer, FrameStream
+from summarizers.base_summarizer import BaseSummarizer
+from processing.frame_quality import (
+    exposure,
+    frame_measures,
+    frame_quality,
+    laplacian_variance,
+    motion,
+    segment_quality_score,
+    segments_quality_scores,
+    stack_frame_measures,
+)
+
+
+def textured_frames(rng: np.random.Generator, frames: int, shift: int = 0) -> np.ndarray:
+    """Frames of a checkerboard with some noise, moved `shift` pixels from one frame to the next"""
+    board = (np.indices((96, 128)) // 8).sum(axis=0) % 2 * 120 + 60
+    frames = [np.roll(board, i * shift, axis=1) + rng.normal(0, 5, board.shape) for i in range(frames)]
+    return np.clip(frames, 0, 255).astype(np.uint8)
+
+
+def test_frame_measures_match_per_frame_computations(rng) -> None:
+    frames = textured_frames(rng, 4, shift=3)
+
+    expected = [cv2.Laplacian(frame, cv2.CV_64F, ksize=1)[1:-1, 1:-1].var() for frame in frames]
+    assert np.allclose(laplacian_variance(frames), expected, rtol=1e-5)
+
+    black, gray = np.zeros((1, 8, 8), np.uint8), np.full((1, 8, 8), 128, np.uint8)
+    assert exposure(black).tolist() == [0.0]
+    assert np.isclose(exposure(gray)[0], 1, atol=0.01)
+
+    assert motion(frames)[0] == 0
+    expected = [np.abs(b / 255 - a / 255).mean() for a, b in zip(frames, frames[1:])]
+    assert np.allclose(motion(frames)[1:], expected)
+    assert frame_quality(frames).shape == (4, 3)
+    assert segment_quality_score(frame_quality(frames[:0])) == 0.0
+
+
+def test_sharp_exposed_steady_segments_score_best(rng) -> None:
+    steady = textured_frames(rng, 6)
+    blurred = np.stack([cv2.GaussianBlur(frame, (9, 9), 3) for frame in steady])
+    scores = {
+        "steady": segment_quality_score(frame_quality(steady)),
+        "blurred": segment_quality_score(frame_quality(blurred)),
+        "dark": segment_quality_score(frame_quality(steady // 6)),
+        "shaky": segment_quality_score(frame_quality(textured_frames(rng, 6, shift=8))),
+    }
+
+    assert all(scores["steady"] > score for name, score in scores.items() if name != "steady")
+
+
+def write_frames(path, rng: np.random.Generator, shots: dict[str, list[str]]) -> None:
+    """Frames of 6 seconds of each shot of each video, sharp, blurred or dark"""
+    steady = textured_frames(rng, 6)
+    looks = {
+        "sharp": steady,
+        "blurred": np.stack([cv2.GaussianBlur(frame, (9, 9), 3) for frame in steady]),
+        "dark": steady // 6,
+    }
+    for video, video_shots in shots.items():
+        (path / video).mkdir()
+        for shot, look in enumerate(video_shots):
+            for second, frame in enumerate(looks[look], start=shot * 6):
+                cv2.imwrite(str(path / video / f"image-{second}.jpg"), frame)
+
+
+def test_frames_mode_ranks_segments_once_per_frame(tmp_path, rng) -> None:
+    write_frames(tmp_path, rng, {"a": ["sharp", "blurred"], "b": ["dark", "sharp"]})
+
+    def best_segments(with_features: bool) -> list[list[tuple[str, int]]]:
+        videos = [Video(name=name, segments=[Segment(0, 6), Segment(6, 12)]) for name in ("a", "b")]
+        features = None
+        if with_features:
+            features = FrameStream([FrameQualityAnalyzer()]).process(videos, str(tmp_path))
+        summarizer = BaseSummarizer(
+            videos=videos,
+            frames_path=str(tmp_path),
+            frame_features=features,
+            stage_cache=StageCache(str(tmp_path / f"cache-{with_features}")),
+        )
+        quality = Quality(summarizer, mode="frames")
+        assert quality.get_segment_quality(videos[0].get_segment(0)) > quality.get_segment_quality(
+            videos[0].get_segment(1)
+        )
+        return [
+            [(segment.get_video().get_name(), segment.get_begin()) for segment in video_segments]
+            for video_segments in quality.best_segments_for_videos(n_segments=2)
+        ]
+
+    # Frames are decoded once by the stream of the frame features, or by the ranking without them, whose
+    # scores are then reused from the cache
+    expected = [[("a", 0), ("a", 6)], [("b", 6), ("b", 0)]]
+    for with_features, decoded in ((True, 24), (True, 24), (False, 24 + 2 * 12), (False, 2 * 12)):
+        with tracing(str(tmp_path / "trace.json")) as tracer:
+            assert best_segments(with_features) == expected
+        assert tracer.get_counters().get("frames.decoded", 0) == decoded
+
+
+def test_streamed_frame_measures_match_the_frames_quality(rng) -> None:
+    frames = textured_frames(rng, 5, shift=3)
+    streamed = stack_frame_measures([frame_measures(frame) for frame in frames])
+    assert np.allclose(streamed, frame_quality(frames), rtol=1e-5)
+
+    seconds, spans = np.arange(5), [(0, 5), (2, 4), (6, 8)]
+    scores = segments_quality_scores(seconds, streamed, spans)
+    expected = [segment_quality_score(frame_quality(frames[begin:end])) for begin, end in spans]
+    assert np.allclose(scores, expected, rtol=1e-5)
+
+
+def test_redundancy_keeps_the_best_frames_of_each_cluster(tmp_path, rng) -> None:
+    write_frames(tmp_path, rng, {"a": ["sharp", "blurred"], "b": ["dark", "sharp"]})
+    texts = [
+        "inflação juros banco central economia mercado",
+        "campeonato futebol gol time torcida estádio",
+    ]
+    videos = [
+        Video(name=name, segments=[Segment(6 * i, 6 * i + 6, text) for i, text in enumerate(texts)])
+        for name in ("a", "b")
+    ]
+    summarizer = BaseSummarizer(videos=videos, frames_path=str(tmp_path))
+    summarizer.start_summary_video()
+
+    Redundancy(summarizer, quality_mode="frames").include()
+    entries = summarizer.get_summary_plan().get_entries()
+    assert sorted((entry.video, entry.begin) for entry in entries) == [("a", 0), ("b", 6)]
@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+
+from components.video import Video
+from processing.image import ImageProcessing
+from processing.tracing import tracing
+from processing.executor import TaskExecutor
+from processing.scheduler import ResourceScheduler
+from processing.frame_stream import FrameStream, HistogramAnalyzer, default_analyzers
+
+
+def test_frame_stream_matches_per_frame_histograms(tmp_path) -> None:
+    frames_dir = tmp_path / "video"
+    frames_dir.mkdir()
+    for second in (1, 2, 3, 10):
+        image = np.full((24, 32, 3), second * 20, dtype=np.uint8)
+        cv2.imwrite(str(frames_dir / f"image-{second}.jpg"), image)
+
+    video = Video(name="video", path=str(tmp_path / "video.mp4"), segments=[])
+    features = FrameStream([HistogramAnalyzer()]).process([video], str(tmp_path))
+
+    assert features.get_seconds("video").tolist() == [1, 2, 3, 10]
+    histograms = features.get("video", "histogram")
+    for frame, histogram in zip(video.load_frames(str(tmp_path)), histograms):
+        expected = ImageProcessing.get_frame_histogram(frame).ravel()
+        assert np.array_equal(histogram, expected)
+
+    assert len(features.between("video", "histogram", 2, 10)) == 2
+    assert not features.has("video", "faces")
+
+
+def test_frames_quality_mode_computes_no_descriptors(tmp_path) -> None:
+    frames_dir = tmp_path / "video"
+    frames_dir.mkdir()
+    for second in range(3):
+        board = (np.indices((48, 64)) // 8).sum(axis=0) % 2 * 200
+        cv2.imwrite(str(frames_dir / f"image-{second}.jpg"), board.astype(np.uint8))
+    video = Video(name="video", path=str(tmp_path / "video.mp4"), segments=[])
+
+    for quality_mode in ("bovw", "frames"):
+        with tracing(str(tmp_path / f"{quality_mode}.json")) as tracer:
+            features = FrameStream(default_analyzers(quality_mode)).process([video], str(tmp_path))
+        computed = "descriptors.computed" in tracer.get_counters()
+        assert features.has("video", "descriptors") == computed == (quality_mode == "bovw")
+
+
+def test_unreadable_frames_are_skipped_with_their_seconds(tmp_path) -> None:
+    frames_dir = tmp_path / "video"
+    frames_dir.mkdir()
+    for second in range(8):
+        cv2.imwrite(str(frames_dir / f"image-{second}.jpg"), np.full((24, 32), second * 20, dtype=np.uint8))
+    (frames_dir / "image-2.jpg").write_bytes(b"not a jpeg")
+    video = Video(name="video", path=str(tmp_path / "video.mp4"), segments=[])
+
+    threaded = FrameStream([HistogramAnalyzer()], queue_size=1).process([video], str(tmp_path))
+    with TaskExecutor(ResourceScheduler(cpus=2)) as executor:
+        shared = FrameStream([HistogramAnalyzer()], executor=executor, window=2).process(
+            [video], str(tmp_path)
+        )
+
+    for features in (threaded, shared):
+        assert features.get_seconds("video").tolist() == [0, 1, 3, 4, 5, 6, 7]
+        assert len(features.get("video", "histogram")) == 7
+    assert np.array_equal(shared.get("video", "histogram"), threaded.get("video", "histogram"))
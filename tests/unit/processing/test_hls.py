@@ -0,0 +1,20 @@
+from processing.hls import HLSPlaylist
+
+
+def test_hls_playlist_is_rewritten_per_segment(tmp_path) -> None:
+    path = tmp_path / "index.m3u8"
+    playlist = HLSPlaylist(str(path), target_duration=9.2)
+    assert "#EXT-X-TARGETDURATION:10" in path.read_text()
+
+    playlist.append(str(tmp_path / "chunk-0-0.ts"), 4.0)
+    assert path.read_text().splitlines()[-2:] == ["#EXTINF:4.000,", "chunk-0-0.ts"]
+    assert "#EXT-X-ENDLIST" not in path.read_text()
+
+    playlist.append(str(tmp_path / "chunk-1-0.ts"), 9.2)
+    playlist.close()
+    assert path.read_text().splitlines()[-4:] == [
+        "#EXT-X-DISCONTINUITY",
+        "#EXTINF:9.200,",
+        "chunk-1-0.ts",
+        "#EXT-X-ENDLIST",
+    ]
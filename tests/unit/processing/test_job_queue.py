@@ -0,0 +1,86 @@
+from os import getpid, rename, utime
+from os.path import join
+from multiprocessing import Process
+
+from processing.job_queue import FileJobQueue, work
+
+
+def record_job(payload: dict) -> int:
+    # Failing if the job already ran, each job must be run exactly once
+    with open(join(payload["output"], payload["name"]), "x") as f:
+        f.write(str(getpid()))
+    if payload["name"] == "broken":
+        raise Exception("broken job")
+    return getpid()
+
+
+def test_workers_claim_each_job_once(tmp_path) -> None:
+    queue = FileJobQueue(str(tmp_path / "queue"), max_attempts=1)
+    output = tmp_path / "output"
+    output.mkdir()
+    job_ids = [
+        queue.put("record", {"name": name, "output": str(output)})
+        for name in [f"job{i}" for i in range(20)] + ["broken"]
+    ]
+
+    workers = [
+        Process(
+            target=work,
+            args=(queue, {"record": record_job}),
+            kwargs={"idle_timeout": 1.0, "poll_interval": 0.05, "heartbeat_interval": 0.1},
+        )
+        for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    states = queue.wait(job_ids, poll_interval=0.05)
+    for worker in workers:
+        worker.join()
+
+    assert sorted(path.name for path in output.iterdir()) == sorted(
+        [f"job{i}" for i in range(20)] + ["broken"]
+    )
+    assert list(states.values()).count("done") == 20
+    broken = queue.load("failed", job_ids[-1])
+    assert broken["error"] == "broken job" and broken["attempts"] == 1
+    assert queue.load("done", job_ids[0])["result"] == int((output / "job0").read_text())
+
+
+def test_stale_jobs_are_given_back(tmp_path) -> None:
+    queue = FileJobQueue(str(tmp_path), heartbeat_timeout=60, max_attempts=2)
+    job_id = queue.put("record", {})
+
+    for attempt, state in [(1, "pending"), (2, "failed")]:
+        job = queue.claim("dead-worker")
+        assert job["attempts"] == attempt and queue.claim("other-worker") is None
+        assert queue.requeue_stale() == []
+
+        # The worker stopped heartbeating long ago
+        utime(join(str(tmp_path), "claimed", f"{job_id}.json"), (0, 0))
+        assert queue.requeue_stale() == [job_id]
+        assert queue.get_state(job_id) == state
+        assert not queue.complete(job)
+
+
+def test_claims_lost_to_a_requeue_are_skipped(tmp_path) -> None:
+    class RequeuingQueue(FileJobQueue):
+        def load(self, state: str, job_id: str) -> dict | None:
+            # A coordinator gives the first job back right after it is claimed
+            if state == "claimed" and job_id == first:
+                claimed, pending = (join(str(tmp_path), state, f"{job_id}.json") for state in ("claimed", "pending"))
+                rename(claimed, pending)
+            return super().load(state, job_id)
+
+    queue = RequeuingQueue(str(tmp_path), heartbeat_timeout=60)
+    first, second = queue.put("record", {}, "a"), queue.put("record", {}, "b")
+    assert queue.claim("worker")["id"] == second
+    assert queue.get_state(first) == "pending"
+
+
+def test_jobs_queued_long_ago_are_not_stale_once_claimed(tmp_path) -> None:
+    queue = FileJobQueue(str(tmp_path), heartbeat_timeout=60)
+    job_id = queue.put("record", {})
+    utime(join(str(tmp_path), "pending", f"{job_id}.json"), (0, 0))
+
+    assert queue.claim("worker")["id"] == job_id
+    assert queue.requeue_stale() == [] and queue.get_state(job_id) == "claimed"
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from processing.text import BagOfWords
+from processing.image import BagOfVisualWords
+from processing.memory import memory_monitoring, memory_stage, require_memory, track_memory
+from modules.redundancy import bow_correlations, bow_correlations_chunked
+
+def test_low_memory_variants_match_dense_correlations(random_texts, index_names) -> None:
+    dense = BagOfWords(random_texts()).generate_bow_dataframe(index_names)
+    sparse = BagOfWords(random_texts()).generate_sparse_bow_dataframe(index_names)
+    assert np.allclose(dense.to_numpy(), sparse.sparse.to_dense().to_numpy())
+    assert list(dense.columns) == list(sparse.columns) and dense.index.equals(sparse.index)
+
+    expected = bow_correlations(dense, 0.2)
+    assert len(expected)
+    for bow_df in [dense, sparse]:
+        for rows_per_chunk in [1, 5, len(dense)]:
+            correlations = bow_correlations_chunked(bow_df, 0.2, rows_per_chunk)
+            assert list(correlations.columns) == list(expected.columns)
+            assert (correlations.iloc[:, :4].to_numpy() == expected.iloc[:, :4].to_numpy()).all()
+            assert np.allclose(correlations["value"], expected["value"])
+
+
+def test_streaming_kmeans_builds_histograms(rng) -> None:
+    items = {segment: rng.random((40, 8), dtype=np.float32) for segment in range(5)}
+    bovw = BagOfVisualWords(items, dict_size=10)
+    bovw.fit_kmeans(streaming=True, batch_size=50, random_state=0)
+
+    assert list(bovw.generate_bovw_dataframe().index) == list(range(5))
+
+
+def test_budget_reports_stages_and_fails_fast() -> None:
+    with memory_monitoring() as monitor:
+        assert monitor is None
+
+    with memory_monitoring(budget=2**50, report=True) as monitor:
+        with memory_stage("summarization"):
+            with memory_stage("redundancy"):
+                track_memory("bow_dataframe", 1024)
+                data = bytearray(2**20)
+        require_memory("small", 1024)
+
+    stages = {stage.name: stage for stage in monitor.get_stages()}
+    assert stages["redundancy"].structures == {"bow_dataframe": 1024}
+    assert stages["summarization"].peak_rss >= stages["redundancy"].peak_rss > 0
+    assert stages["summarization"].traced_peak >= len(data)
+
+    with memory_monitoring(budget=1):
+        with pytest.raises(Exception, match="Memory budget of 1 B exceeded"):
+            require_memory("bow_correlations", 1024)
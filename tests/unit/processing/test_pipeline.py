@@ -0,0 +1,32 @@
+import pytest
+
+from processing.pipeline import PipelineReport
+from processing.utils import list_dataset_videos, read_dataset_manifest
+
+
+def test_report_keeps_timings_of_failed_stages() -> None:
+    report = PipelineReport("summary")
+    with report.stage("frames"):
+        pass
+    with pytest.raises(ValueError):
+        with report.stage("summarization"):
+            raise ValueError()
+
+    assert set(report.timings) == {"frames", "summarization"}
+    assert report.to_dict()["total"] == report.get_total() >= 0
+
+
+def test_manifest_lists_dataset_folders(tmp_path) -> None:
+    for name in ["set1", "set2"]:
+        for video in ["a", "b"]:
+            (tmp_path / name / video).mkdir(parents=True)
+            (tmp_path / name / video / f"{video}.mp4").touch()
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# nightly\nset1\n\n  set2  # second set\n")
+
+    paths = read_dataset_manifest(str(manifest))
+
+    assert paths == [str(tmp_path / "set1"), str(tmp_path / "set2")]
+    assert sorted(list_dataset_videos(paths[0])) == ["a", "b"]
+    with pytest.raises(Exception):
+        list_dataset_videos(paths[1], ["a", "c"])
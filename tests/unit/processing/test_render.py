@@ -0,0 +1,72 @@
+from re import search
+
+from components.video import Video
+from components.segment import Segment
+
+from processing.render import RenderPiece, SummaryRenderer, plan_segment_pieces
+from processing.ffmpeg import probe_video, run_ffmpeg
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+def test_plan_segment_pieces_copies_keyframe_aligned_middle() -> None:
+    assert plan_segment_pieces("a.mp4", 1, 9, KEYFRAMES, fadein=0.5, fadeout=0.5) == [
+        RenderPiece("a.mp4", 1, 2.0, False, fadein=0.5),
+        RenderPiece("a.mp4", 2.0, 8.0, True),
+        RenderPiece("a.mp4", 8.0, 9, False, fadeout=0.5),
+    ]
+
+
+def test_plan_segment_pieces_without_fades_on_keyframes() -> None:
+    assert plan_segment_pieces("a.mp4", 2, 6, KEYFRAMES) == [
+        RenderPiece("a.mp4", 2.0, 6.0, True)
+    ]
+
+
+def test_plan_segment_pieces_reencodes_short_segments() -> None:
+    assert plan_segment_pieces("a.mp4", 0, 3, KEYFRAMES, fadein=0.5, fadeout=0.5) == [
+        RenderPiece("a.mp4", 0, 3, False, fadein=0.5, fadeout=0.5)
+    ]
+
+
+def make_source(path: str) -> str:
+    run_ffmpeg(
+        ["-f", "lavfi", "-i", "testsrc=size=160x120:rate=10", "-f", "lavfi", "-i", "sine"]
+        + ["-t", "12", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", "20", "-c:a", "aac"]
+        + ["-shortest", path]
+    )
+    return path
+
+
+def get_duration(path: str) -> float:
+    output = run_ffmpeg(["-i", path, "-f", "null", "-"])
+    hours, minutes, seconds = search(r"Duration: (\d+):(\d+):([\d.]+)", output).groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def test_video_save(tmp_path) -> None:
+    source = make_source(str(tmp_path / "source.mp4"))
+    video = Video(name="source", path=source, segments=[Segment(1, 9), Segment(10, 12)])
+    summary = Video(
+        path=str(tmp_path / "summary.mp4"),
+        segments=video.get_segments(),
+        assign_to_segments=False,
+    )
+    summary.save()
+
+    info = probe_video(summary.get_video_path())
+    assert (info.width, info.height) == (160, 120)
+    assert info.has_audio()
+
+
+def test_chunks_render_concurrently_in_summary_order(tmp_path) -> None:
+    source = make_source(str(tmp_path / "source.mp4"))
+    video = Video(name="source", path=source, segments=[Segment(1, 4), Segment(5, 8), Segment(9, 11)])
+    output = str(tmp_path / "summary.mp4")
+
+    reports = SummaryRenderer(output, workers=3, cpus=2).render(video.get_segments())
+
+    assert [report.index for report in reports] == [0, 1, 2]
+    assert [report.duration for report in reports] == [3, 3, 2]
+    assert all(sum(report.durations) == report.duration for report in reports)
+    assert abs(get_duration(output) - 8) < 0.2
@@ -0,0 +1,99 @@
+import json
+from time import sleep
+from threading import Thread
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+from processing.pipeline import PipelineReport
+from processing.service import SummarizationService, create_server, parameters_to_argv
+
+
+def fake_run(arguments: dict, cpus: int) -> PipelineReport:
+    report = PipelineReport(arguments["name"], output=arguments["plan"])
+    with report.stage("summarization"):
+        if arguments["name"] == "broken":
+            report.status, report.error = "failed", "broken video set"
+            return report
+    report.status = "done"
+    return report
+
+
+def make_dataset(path) -> None:
+    for video in ["a", "b"]:
+        (path / video).mkdir(parents=True)
+        (path / video / f"{video}.mp4").touch()
+
+
+def request(url: str, data: dict = None) -> tuple[int, object]:
+    body = json.dumps(data).encode() if data is not None else None
+    try:
+        with urlopen(Request(url, data=body, method="POST" if body else "GET")) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_parameters_are_converted_to_arguments() -> None:
+    argv = parameters_to_argv(
+        {"videos_path": "sets/a", "videos": ["v1", "v2"], "plan_only": True, "stream": False, "roi": [0, 0, 8, 8]}
+    )
+    assert argv == ["--videos-path", "sets/a", "--videos", "v1", "v2", "--plan-only", "--roi", "0:0:8:8"]
+
+
+def test_service_runs_queued_jobs(tmp_path) -> None:
+    for name in ["good", "broken"]:
+        make_dataset(tmp_path / name)
+
+    service = SummarizationService(workers=2, cpus=2, run=fake_run, warm_up=False)
+    service.start()
+    server = create_server(service, port=0)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        ids = []
+        for name in ["good", "broken"]:
+            code, job = request(
+                f"{url}/jobs",
+                {"videos_path": str(tmp_path / name), "output": str(tmp_path / f"{name}.mp4"), "plan_only": True},
+            )
+            assert code == 202 and job["name"] == name
+            ids.append(job["id"])
+
+        code, error = request(f"{url}/jobs", {"videos_path": str(tmp_path / "missing")})
+        assert code == 400 and "not found" in error["error"]
+        code, error = request(f"{url}/jobs", {"videos_path": str(tmp_path / "good"), "help": True})
+        assert code == 400 and "unrecognized arguments: --help" in error["error"]
+
+        for _ in range(300):
+            health = request(f"{url}/health")[1]
+            if health["queued"] + health["running"] == 0:
+                break
+            sleep(0.1)
+
+        good, broken = (request(f"{url}/jobs/{job_id}")[1] for job_id in ids)
+        assert good["status"] == "done" and good["output"] == str(tmp_path / "good.plan.json")
+        assert "summarization" in good["timings"]
+        assert broken["status"] == "failed" and broken["error"] == "broken video set"
+        assert request(f"{url}/jobs/unknown")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+
+
+def test_full_queue_asks_clients_to_retry(tmp_path) -> None:
+    make_dataset(tmp_path / "set")
+
+    # Jobs stay queued, as the service has no workers taking them
+    service = SummarizationService(max_queued=1, run=fake_run, warm_up=False)
+    server = create_server(service, port=0)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/jobs"
+    job = {"videos_path": str(tmp_path / "set"), "output": str(tmp_path / "set.mp4"), "plan_only": True}
+    try:
+        assert request(url, job)[0] == 202
+        code, error = request(url, job)
+        assert code == 503 and "Too many queued jobs" in error["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+
+from components.video import Video
+from processing.executor import TaskExecutor
+from processing.scheduler import ResourceScheduler
+from processing.frame_stream import DescriptorAnalyzer, FrameStream, HistogramAnalyzer
+from processing.shared_memory import SharedBufferPool, attach, share_arrays, take_arrays
+
+
+def test_buffer_pool_round_trip() -> None:
+    arrays = [np.arange(i * 100, dtype=np.float32).reshape(-1, 10) for i in range(1, 4)]
+    with SharedBufferPool(block_size=2048) as pool:
+        handles = [pool.put(a) for a in arrays]
+        for handle, expected in zip(handles, arrays):
+            assert np.array_equal(attach(handle), expected)
+        assert pool.get_size() >= sum(a.nbytes for a in arrays)
+
+    shared = share_arrays([arrays[0], None, arrays[1]])
+    taken = take_arrays(shared)
+    assert np.array_equal(taken[0], arrays[0])
+    assert taken[1] is None
+    assert np.array_equal(taken[2], arrays[1])
+
+
+def test_shared_frame_stream_matches_threaded_stream(tmp_path, rng) -> None:
+    frames_dir = tmp_path / "video"
+    frames_dir.mkdir()
+    for second in range(6):
+        image = cv2.GaussianBlur(rng.integers(0, 255, (64, 64, 3), dtype=np.uint8), (3, 3), 0)
+        cv2.imwrite(str(frames_dir / f"image-{second}.jpg"), image)
+
+    video = Video(name="video", path=str(tmp_path / "video.mp4"), segments=[])
+    analyzers = [HistogramAnalyzer(), DescriptorAnalyzer()]
+    threaded = FrameStream(analyzers).process([video], str(tmp_path))
+    with TaskExecutor(ResourceScheduler(cpus=2)) as executor:
+        shared = FrameStream(analyzers, executor=executor, window=4).process(
+            [video], str(tmp_path)
+        )
+
+    assert np.array_equal(shared.get("video", "histogram"), threaded.get("video", "histogram"))
+    for a, b in zip(shared.get("video", "descriptors"), threaded.get("video", "descriptors")):
+        assert (a is None and b is None) or np.array_equal(a, b)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from components.video import Video
+from components.segment_table import SegmentTable
+from processing.image import ImageProcessing
+from processing.frame_stream import FrameFeatureTable
+from processing.shots import ShotBoundaries, snap_to_cuts
+from summarizers.base_summarizer import BaseSummarizer
+
+
+def shot_histograms(rng: np.random.Generator, shots: list[tuple[int, float]]) -> np.ndarray:
+    """Normalized histograms of frames of shots given as (frames, mean tone), with some noise"""
+    histograms = []
+    for frames, tone in shots:
+        base = np.exp(-0.5 * ((np.arange(256) - tone) / 20) ** 2)
+        for _ in range(frames):
+            histogram = (base * rng.uniform(0.95, 1.05, 256)).astype(np.float32)
+            histograms.append(histogram / histogram.sum())
+    return np.stack(histograms)
+
+
+def test_intersections_match_histogram_comparison(rng) -> None:
+    histograms = shot_histograms(rng, [(5, 60), (5, 180)])
+    boundaries = ShotBoundaries(np.arange(len(histograms)), histograms)
+
+    expected = [
+        ImageProcessing.compare_histograms(a, b) for a, b in zip(histograms, histograms[1:])
+    ]
+    assert np.allclose(boundaries.get_intersections(), expected, rtol=0, atol=1e-6)
+
+
+def test_cuts_under_fixed_and_adaptive_thresholds(rng) -> None:
+    # A hard cut to another tone, then a soft cut to a slightly different one
+    histograms = shot_histograms(rng, [(12, 60), (12, 180), (12, 190)])
+    boundaries = ShotBoundaries(np.arange(len(histograms)) * 2.0, histograms)
+
+    assert boundaries.get_cuts(adaptive=False).tolist() == [11]
+    assert boundaries.get_cuts().tolist() == [11, 23]
+    assert boundaries.get_cut_seconds().tolist() == [24.0, 48.0]
+    assert boundaries.get_first_shot_end() == 22.0
+    assert boundaries.get_first_shot_end(threshold=0.0) == 70.0
+
+
+def test_snap_to_cuts_within_tolerance() -> None:
+    cuts = np.array([10.0, 20.0, 30.0])
+    snapped = snap_to_cuts([9, 14, 16, 21.6, 35], cuts, tolerance=1.5)
+
+    assert snapped.tolist() == [10.0, 14.0, 16.0, 21.6, 35.0]
+    assert snap_to_cuts([14, 16], cuts, tolerance=5).tolist() == [10.0, 20.0]
+    assert snap_to_cuts([3], np.array([]), tolerance=5).tolist() == [3.0]
+
+
+def test_summary_snaps_table_segments_to_fractional_cuts(rng) -> None:
+    table = SegmentTable()
+    table.append(0, 10, "first")
+    table.append(10, 20, "second")
+    video = Video(name="video", segments=table.segments(0))
+
+    # Frames sampled every half second, with a cut at 9.5 seconds
+    histograms = shot_histograms(rng, [(19, 60), (21, 180)])
+    features = FrameFeatureTable()
+    features.set_video_features("video", np.arange(len(histograms)) / 2, {"histogram": histograms})
+    summarizer = BaseSummarizer(videos=[video], frame_features=features)
+    summarizer.start_summary_video()
+    summarizer.append_segments_to_summary(video.get_segments())
+
+    assert summarizer.snap_summary_to_cuts(tolerance=1) == 2
+    segments = summarizer.get_summary_video().get_segments()
+    entries = summarizer.get_summary_plan().get_entries()
+    assert [(s.get_begin(), s.get_end()) for s in segments] == [(0, 9.5), (9.5, 20)]
+    assert [(entry.begin, entry.end) for entry in entries] == [(0, 9.5), (9.5, 20)]
+    assert [(s.get_begin(), s.get_end()) for s in video.get_segments()] == [(0, 10), (10, 20)]
@@ -0,0 +1,44 @@
+from processing.cache import StageCache
+from processing.sweep import SweepResult, parameter_grid
+from summarizers.base_summarizer import BaseSummarizer
+from summarizers.hsmvideosumm import SummaryParameters
+
+
+def test_parameter_grid_combines_values() -> None:
+    grid = parameter_grid(intro_threshold=[0.6, 0.7], dict_size=[100, 200, 300])
+
+    assert len(grid) == 6
+    assert grid[0] == SummaryParameters(intro_threshold=0.6, dict_size=100)
+    assert grid[-1] == SummaryParameters(intro_threshold=0.7, dict_size=300)
+    # Combinations sharing the first parameters are next to each other
+    assert [parameters.intro_threshold for parameters in grid] == [0.6] * 3 + [0.7] * 3
+    assert all(parameters.base_threshold == 0.17 for parameters in grid)
+
+
+def test_cached_video_tasks_only_run_missing_results(tmp_path) -> None:
+    calls = []
+
+    def square(value: int) -> int:
+        calls.append(value)
+        return value * value
+
+    summarizer = BaseSummarizer(stage_cache=StageCache(str(tmp_path)), stage_key="input")
+    assert summarizer.run_cached_video_tasks("square", square, [(2,), (3,)], [2, 3]) == [4, 9]
+    assert summarizer.run_cached_video_tasks("square", square, [(3,), (4,)], [3, 4]) == [9, 16]
+    assert calls == [2, 3, 4]
+
+    # Results are keyed by the stage input too
+    other_input = BaseSummarizer(stage_cache=StageCache(str(tmp_path)), stage_key="other")
+    assert other_input.run_cached_video_tasks("square", square, [(2,)], [2]) == [4]
+    assert calls == [2, 3, 4, 2]
+
+
+def test_plan_id_identifies_selected_segments() -> None:
+    def result(segments: list[tuple[str, int, int]], **parameters) -> SweepResult:
+        plan = {"segments": [{"video": v, "begin": b, "end": e, "reason": ""} for v, b, e in segments]}
+        return SweepResult(SummaryParameters(**parameters), plan=plan)
+
+    same = result([("a", 0, 10), ("b", 5, 8)])
+    assert same.get_plan_id() == result([("a", 0, 10), ("b", 5, 8)], dict_size=100).get_plan_id()
+    assert same.get_plan_id() != result([("b", 5, 8), ("a", 0, 10)]).get_plan_id()
+    assert SweepResult(SummaryParameters()).get_plan_id() == "-"
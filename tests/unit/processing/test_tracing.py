@@ -0,0 +1,50 @@
+import json
+from time import sleep
+
+from modules.modules_base import SelectionCriteria
+from processing.executor import TaskExecutor
+from processing.scheduler import ResourceScheduler
+from processing.tracing import count, span, tracing
+
+
+class Criteria(SelectionCriteria):
+    def include(self) -> None:
+        with span("inner"):
+            sleep(0.01)
+
+    def exclude(self) -> None:
+        pass
+
+
+def traced_task(value: int) -> int:
+    with span("task", "compute", value=value):
+        count("tasks")
+    return value * 2
+
+
+def test_spans_nest_across_threads_and_processes(tmp_path) -> None:
+    path = str(tmp_path / "trace.json")
+    with tracing(path) as tracer:
+        with span("stage", "stage"):
+            Criteria().include()
+            count("items", 3)
+            with TaskExecutor(ResourceScheduler(2)) as executor:
+                assert executor.map(traced_task, [(1,), (2,)]) == [2, 4]
+
+    spans = {span.stack: span for span in tracer.get_spans()}
+    assert set(spans) == {"stage", "stage;Criteria.include", "stage;Criteria.include;inner", "stage;task"}
+    include = spans["stage;Criteria.include"]
+    assert include.category == "criteria" and include.self_time < include.duration
+    assert tracer.get_counters() == {"items": 3, "tasks": 2}
+
+    # Spans and counters are recorded only while tracing
+    Criteria().include()
+    count("items")
+    assert len(tracer.get_spans()) == 5
+
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    assert {event["name"] for event in events if event["ph"] == "X"} == {"stage", "Criteria.include", "inner", "task"}
+    assert any(event["ph"] == "C" and event["args"] == {"tasks": 2} for event in events)
+    folded = (tmp_path / "trace.folded").read_text().splitlines()
+    assert [line.rsplit(" ", 1)[0] for line in folded] == sorted(spans)
@@ -0,0 +1,44 @@
+from io import StringIO
+
+import pytest
+
+from processing.utils import parse_timestamp
+from processing.transcript import iter_json_array, read_transcript
+
+
+def test_parse_timestamp() -> None:
+    assert parse_timestamp("00:00:00") == 0
+    assert parse_timestamp("01:02:03") == 3723
+    assert parse_timestamp("00:01:02,900") == 62
+    assert parse_timestamp("01:02.500") == 62
+    for invalid in ["00:00:nan", "00:00:inf", "12", "00:aa:00"]:
+        with pytest.raises(Exception, match="Invalid timestamp"):
+            parse_timestamp(invalid)
+
+
+def test_iter_json_array_small_chunks() -> None:
+    text = '[ {"begin": "00:00:01", "content": "a, [b]"},\n {"end": 12} ]'
+    items = list(iter_json_array(StringIO(text), chunk_size=3))
+    assert items == [{"begin": "00:00:01", "content": "a, [b]"}, {"end": 12}]
+
+
+def test_read_srt_transcript(tmp_path) -> None:
+    path = tmp_path / "video.srt"
+    path.write_text(
+        "1\n00:00:00,000 --> 00:00:10,500\nPrimeira linha\ncontinua\n\n"
+        "2\n00:00:10,500 --> 00:00:25,000\nSegunda linha\n"
+    )
+    assert read_transcript(str(path)) == [
+        (0, 10, "Primeira linha continua"),
+        (10, 25, "Segunda linha"),
+    ]
+
+
+def test_read_vtt_transcript(tmp_path) -> None:
+    path = tmp_path / "video.vtt"
+    path.write_text(
+        "WEBVTT\n\nNOTE comentário\n\n"
+        "00:00.000 --> 00:04.000 align:start\n<v Repórter>Olá</v>\n\n"
+        "intro\n00:00:04.000 --> 00:01:10.000\nBoa noite\n"
+    )
+    assert read_transcript(str(path)) == [(0, 4, "Olá"), (4, 70, "Boa noite")]
@@ -0,0 +1,81 @@
+import sys
+import subprocess
+from os.path import dirname, abspath
+
+ROOT_DIR = dirname(dirname(dirname(abspath(__file__))))
+
+# Dependencies that must only be imported by the pipeline stages that use them
+HEAVY_MODULES = ("moviepy", "sklearn", "pandas", "scipy", "cv2", "google", "nltk", "numpy")
+
+# Import time budget of the CLI argument handling, on top of the interpreter startup imports. Generous, as
+# importing the heavy dependencies takes seconds, and measured as the best of a few runs to ignore noise.
+CLI_IMPORT_TIME_BUDGET_US = 500_000
+IMPORT_TIME_RUNS = 3
+
+
+def import_times(*args: str) -> dict[str, int]:
+    """Runs python with `-X importtime` and returns the microseconds each module took to import by itself"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            own, _, module = line.removeprefix("import time:").split("|")
+            times[module.strip()] = int(own)
+    return times
+
+
+def imported_modules(*args: str) -> set[str]:
+    """Names of every module python imports when run with these arguments"""
+    return set(import_times(*args))
+
+
+def loaded_modules(code: str = "") -> set[str]:
+    """Names of the modules loaded once python has run `code`"""
+    process = subprocess.run(
+        [sys.executable, "-c", f"import sys; {code} print('\\n'.join(sys.modules))"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(process.stdout.split())
+
+
+def heavy_modules(modules: set[str]) -> list[str]:
+    return sorted(module for module in modules if module.split(".")[0] in HEAVY_MODULES)
+
+
+def test_cli_help_imports_no_heavy_modules() -> None:
+    heavy = heavy_modules(imported_modules("multi_summarizer", "--help") - imported_modules("-c", "pass"))
+    assert not heavy, f"Heavy modules imported on CLI startup: {heavy}"
+
+
+def test_cli_help_import_time() -> None:
+    startup = imported_modules("-c", "pass")
+    cli_times = []
+    for _ in range(IMPORT_TIME_RUNS):
+        times = import_times("multi_summarizer", "--help")
+        cli_times.append({module: us for module, us in times.items() if module not in startup})
+    best = min(cli_times, key=lambda times: sum(times.values()))
+    slowest = sorted(best.items(), key=lambda item: -item[1])[:10]
+    assert sum(best.values()) < CLI_IMPORT_TIME_BUDGET_US, f"Slowest CLI imports (us): {slowest}"
+
+
+def test_argument_parsing_imports_no_heavy_modules(tmp_path) -> None:
+    for video in ["a", "b"]:
+        (tmp_path / video).mkdir()
+        (tmp_path / video / f"{video}.mp4").touch()
+
+    # Parsing the arguments of a run, then listing the modules loaded by then
+    parse = (
+        "sys.path.insert(0, 'multi_summarizer');"
+        "from processing.utils import process_arguments;"
+        f"process_arguments(['-vp', {str(tmp_path)!r}, '-o', {str(tmp_path / 'out.mp4')!r}]);"
+    )
+    heavy = heavy_modules(loaded_modules(parse) - loaded_modules())
+    assert not heavy, f"Heavy modules imported when parsing arguments: {heavy}"